@@ -127,9 +127,14 @@ def _resolver_endpoint(agendamento) -> str:
             return "/run_zephyr/"
     return "/run_fluxo/"
 
-def _post_agendamento(base_url: str, endpoint: str, fluxo: str, quantidade: int):
+def _post_agendamento(base_url: str, endpoint: str, fluxo: str, quantidade: int, incremental: bool = False,
+                      portfolio: bool = False):
     url = f"{base_url.rstrip('/')}{endpoint}"
     payload = {"fluxo_name": fluxo, "quantidade": int(quantidade)}
+    if incremental:
+        payload["incremental"] = True
+    if portfolio:
+        payload["portfolio"] = True
     resp = requests.post(url, json=payload, timeout=90)
     resp.raise_for_status()
     return resp
@@ -176,6 +181,8 @@ def scheduler_worker():
                 horario = agendamento.get('horario') or ''
                 dias_semana = agendamento.get('dias_semana') or ["Todos"]
                 quantidade = int(agendamento.get('quantidade') or 1)
+                incremental = bool(agendamento.get('incremental', False))
+                portfolio = bool(agendamento.get('portfolio', False))
 
                 if not fluxo or not horario:
                     # item inválido: continue sem derrubar
@@ -199,7 +206,7 @@ def scheduler_worker():
                     status = "Sucesso"
                     mensagem = ""
                     try:
-                        r = _post_agendamento(base_url, endpoint, fluxo, quantidade)
+                        r = _post_agendamento(base_url, endpoint, fluxo, quantidade, incremental, portfolio)
                         mensagem = (r.text or "")[:800]
                         print(f"[OK] HTTP {r.status_code} para {fluxo}", flush=True)
                     except Exception as e:
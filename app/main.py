@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from pydantic import BaseModel
 from agent.fluxo_cartao_agent import FluxoCartaoAgent
 from agent.validator import MassaValidator
@@ -7,6 +7,7 @@ import threading
 import yaml
 import requests
 import os
+import json
 import tomllib  # Python 3.11+
 import sys, pathlib
 # garante que /app (raiz do projeto no container) está no PYTHONPATH
@@ -38,8 +39,20 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 from extractor.jira.jira_client import (
     run_extracao_jira_sprint,
     run_extracao_jira_bases,
+    run_extracao_jira_portfolio,
+    run_extracao_jira_transitions,
 )
-from extractor.zephyr.zephyr_client import run_extracao_zephyr_diaria
+from extractor.jira.async_jira_client import (
+    run_extracao_jira_sprint_async,
+    run_extracao_jira_bases_async,
+    run_extracao_jira_portfolio_async,
+)
+from extractor.zephyr.zephyr_client import (
+    run_extracao_zephyr_diaria,
+    run_extracao_zephyr_links,
+    run_extracao_zephyr_ciclos,
+)
+from extractor.common.generation import load_manifest
 
 # Inicializa a aplicação FastAPI
 app = FastAPI()
@@ -57,6 +70,9 @@ agent = FluxoCartaoAgent(
 class FluxoRequest(BaseModel):
     fluxo_name: str
     quantidade: int = 1
+    incremental: bool = False   # Jira: só o que mudou desde o watermark; Zephyr: acrescenta execuções novas ao histórico
+    full_history: bool = False  # jira_bases: sem teto de issues por tipo (streaming, memória constante)
+    portfolio: bool = False     # jira_bases/zephyr: todos os projetos de app.projects (ou do Jira/Zephyr), base única com projectKey
 
 @app.get("/")
 def read_root():
@@ -66,6 +82,19 @@ def read_root():
 def health():
     return {"ok": True}
 
+@app.get("/manifest")
+def manifest(request: Request):
+    """
+    Manifesto da última extração publicada (geração, linhas, min/max de datas,
+    watermark, duração por dataset). O id da geração é o ETag: com
+    If-None-Match igual, responde 304 e o cliente reaproveita o que já tem.
+    """
+    m = load_manifest(DATA_DIR)
+    etag = f'"{m.get("generation", "")}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=json.dumps(m, ensure_ascii=False), media_type="application/json", headers={"ETag": etag})
+
 # ====== Endpoint genérico (compatível com scheduler) ======
 @app.post("/run_fluxo/")
 def run_fluxo(request: FluxoRequest):
@@ -73,11 +102,22 @@ def run_fluxo(request: FluxoRequest):
 
     # 1) checa primeiro o fluxo específico "jira_bases"
     if "jira_bases" in name:
-        return run_extracao_jira_bases(
+        extrator = run_extracao_jira_portfolio if request.portfolio else run_extracao_jira_bases
+        return extrator(
             jira_cfg=JIRA, app_cfg=APP,
-            quantidade=request.quantidade, data_dir=DATA_DIR
+            quantidade=request.quantidade, data_dir=DATA_DIR,
+            incremental=request.incremental, full_history=request.full_history,
         )
 
+    if "jira_transitions" in name:
+        return run_extracao_jira_transitions(jira_cfg=JIRA, app_cfg=APP, data_dir=DATA_DIR)
+
+    if "zephyr_cycles" in name:
+        return run_extracao_zephyr_ciclos(zephyr_cfg=ZEPHYR, app_cfg=APP, data_dir=DATA_DIR, portfolio=request.portfolio)
+
+    if "zephyr_links" in name:
+        return run_extracao_zephyr_links(zephyr_cfg=ZEPHYR, app_cfg=APP, data_dir=DATA_DIR, portfolio=request.portfolio)
+
     # 2) depois os fluxos "jira" e "zephyr" genéricos
     if "jira" in name:
         return run_extracao_jira_sprint(
@@ -87,7 +127,8 @@ def run_fluxo(request: FluxoRequest):
     if "zephyr" in name:
         return run_extracao_zephyr_diaria(
             zephyr_cfg=ZEPHYR, app_cfg=APP,
-            quantidade=request.quantidade, data_dir=DATA_DIR
+            quantidade=request.quantidade, data_dir=DATA_DIR,
+            portfolio=request.portfolio, incremental=request.incremental,
         )
 
     # 3) fallback: mantém o comportamento anterior (FluxoCartaoAgent)
@@ -100,17 +141,36 @@ def run_fluxo(request: FluxoRequest):
 
 
 # ====== Endpoints específicos (opcionais) ======
+# Os endpoints Jira são async: rodam no event loop (AsyncJiraClient) sem
+# prender um worker do threadpool durante toda a extração.
 @app.post("/run_jira/")
-def run_jira(request: FluxoRequest):
-    return run_extracao_jira_sprint(jira_cfg=JIRA, app_cfg=APP, quantidade=request.quantidade, data_dir=DATA_DIR)
+async def run_jira(request: FluxoRequest):
+    return await run_extracao_jira_sprint_async(jira_cfg=JIRA, app_cfg=APP, quantidade=request.quantidade, data_dir=DATA_DIR)
 
 @app.post("/run_jira_bases/")
-def run_jira_bases(request: FluxoRequest):
-    return run_extracao_jira_bases(jira_cfg=JIRA, app_cfg=APP, quantidade=request.quantidade, data_dir=DATA_DIR)
+async def run_jira_bases(request: FluxoRequest):
+    if request.portfolio:
+        return await run_extracao_jira_portfolio_async(jira_cfg=JIRA, app_cfg=APP, quantidade=request.quantidade, data_dir=DATA_DIR,
+                                                       incremental=request.incremental, full_history=request.full_history)
+    return await run_extracao_jira_bases_async(jira_cfg=JIRA, app_cfg=APP, quantidade=request.quantidade, data_dir=DATA_DIR,
+                                               incremental=request.incremental, full_history=request.full_history)
+
+@app.post("/run_jira_transitions/")
+def run_jira_transitions(request: FluxoRequest):
+    return run_extracao_jira_transitions(jira_cfg=JIRA, app_cfg=APP, data_dir=DATA_DIR)
 
 @app.post("/run_zephyr/")
 def run_zephyr(request: FluxoRequest):
-    return run_extracao_zephyr_diaria(zephyr_cfg=ZEPHYR, app_cfg=APP, quantidade=request.quantidade, data_dir=DATA_DIR)
+    return run_extracao_zephyr_diaria(zephyr_cfg=ZEPHYR, app_cfg=APP, quantidade=request.quantidade, data_dir=DATA_DIR,
+                                      portfolio=request.portfolio, incremental=request.incremental)
+
+@app.post("/run_zephyr_links/")
+def run_zephyr_links(request: FluxoRequest):
+    return run_extracao_zephyr_links(zephyr_cfg=ZEPHYR, app_cfg=APP, data_dir=DATA_DIR, portfolio=request.portfolio)
+
+@app.post("/run_zephyr_cycles/")
+def run_zephyr_cycles(request: FluxoRequest):
+    return run_extracao_zephyr_ciclos(zephyr_cfg=ZEPHYR, app_cfg=APP, data_dir=DATA_DIR, portfolio=request.portfolio)
 
 # ====== Alertas Teams (mantido) ======
 def send_teams_alert(errors):
@@ -3,10 +3,11 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-from pathlib import Path
 from datetime import datetime, date, timedelta
 
-DATA = Path("config/data")
+from coeqa import store
+from coeqa import manifest
+from coeqa.data import safe_read_csv, safe_read_parquet, derive, flags, date_range
 
 ISSUE_COLS = ["key","summary","status","type","priority","created","resolutiondate","assignee","reporter"]
 PROJ_COLS  = ["id","key","name","projectTypeKey","lead"]
@@ -15,40 +16,13 @@ PROJ_COLS  = ["id","key","name","projectTypeKey","lead"]
 Z_CASES_COLS = ["key","name","status","automated","testType","labels","created","projectKey"]
 Z_EXEC_COLS  = ["executionKey","testKey","status","automated","testType","labels","executedOn","projectKey","issueKey"]
 
-# ----------------- utils -----------------
-def safe_read_csv(name: str, columns=None) -> pd.DataFrame:
-    p = DATA / name
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame(columns=columns or [])
-    try:
-        df = pd.read_csv(p)
-        if columns:
-            # garante colunas esperadas
-            for c in columns:
-                if c not in df.columns:
-                    df[c] = pd.NA
-            # ordena se possível
-            keep = [c for c in columns if c in df.columns]
-            df = df[keep]
-        return df
-    except Exception:
-        return pd.DataFrame(columns=columns or [])
-
-def key_project_prefix(key: str) -> str:
-    if isinstance(key, str) and "-" in key:
-        return key.split("-")[0]
-    return ""
+ISSUE_TABLES = {"story": "jira_issues_story", "epic": "jira_issues_epic",
+                "bug": "jira_issues_bug", "subbug": "jira_issues_subbug"}
 
+# ----------------- utils -----------------
 def pct(a, b):
     return float(a) / float(b) * 100 if b not in (0, None, np.nan) else 0.0
 
-def _normalize_dates(df: pd.DataFrame, col: str, out_prefix: str):
-    if col in df.columns:
-        dt = pd.to_datetime(df[col], errors="coerce")
-        df[f"{out_prefix}_dt"] = dt
-        df[f"{out_prefix}_date"] = dt.dt.date
-        df["month"] = dt.dt.strftime("%Y-%m")
-
 def _as_range(v, fallback):
     # garante (start, end)
     if isinstance(v, (list, tuple)) and len(v) == 2:
@@ -89,45 +63,46 @@ def pagina_dashboard_analytical():
     st.markdown("### Analytical")
 
     # ====== Carrega bases ======
-    df_story  = safe_read_csv("jira_issues_story_latest.csv",  ISSUE_COLS)
-    df_epic   = safe_read_csv("jira_issues_epic_latest.csv",   ISSUE_COLS)
-    df_bug    = safe_read_csv("jira_issues_bug_latest.csv",    ISSUE_COLS)
-    df_subbug = safe_read_csv("jira_issues_subbug_latest.csv", ISSUE_COLS)
+    # com o banco analítico (config/data/coeqa.sqlite), as bases só são lidas
+    # depois dos filtros, já filtradas por Domain/período no banco;
+    # sem ele, carrega tudo e filtra em memória
+    use_db = store.has_tables(*ISSUE_TABLES.values(), "zephyr_testcases", "zephyr_executions")
     df_proj   = safe_read_csv("jira_projetos_latest.csv",      PROJ_COLS)
-    df_zc     = safe_read_csv("zephyr_testcases_latest.csv",   Z_CASES_COLS)
-    df_ze     = safe_read_csv("zephyr_executions_latest.csv",  Z_EXEC_COLS)
+    if use_db:
+        df_story, df_epic, df_bug, df_subbug = (pd.DataFrame(columns=ISSUE_COLS) for _ in range(4))
+        df_zc     = pd.DataFrame(columns=Z_CASES_COLS)
+        df_ze     = pd.DataFrame(columns=Z_EXEC_COLS)
+    else:
+        df_story  = safe_read_parquet("jira_issues_story",             ISSUE_COLS)
+        df_epic   = safe_read_parquet("jira_issues_epic",              ISSUE_COLS)
+        df_bug    = safe_read_parquet("jira_issues_bug",               ISSUE_COLS)
+        df_subbug = safe_read_parquet("jira_issues_subbug",            ISSUE_COLS)
+        df_zc     = safe_read_parquet("zephyr_testcases",              Z_CASES_COLS)
+        df_ze     = safe_read_parquet("zephyr_executions",             Z_EXEC_COLS)
 
     # ====== Normalize/aux ======
-    for d in (df_story, df_epic, df_bug, df_subbug):
-        if not d.empty:
-            if "projectKey" not in d.columns:
-                d["projectKey"] = d["key"].apply(key_project_prefix)
-            _normalize_dates(d, "created", "created")
-
-    if not df_ze.empty:
-        if "projectKey" not in df_ze.columns:
-            df_ze["projectKey"] = df_ze["issueKey"].apply(key_project_prefix)
-        _normalize_dates(df_ze, "executedOn", "executed")
-
-    if not df_zc.empty:
-        if "projectKey" not in df_zc.columns:
-            df_zc["projectKey"] = df_zc.get("key","").apply(key_project_prefix)
-        _normalize_dates(df_zc, "created", "created")
+    # projectKey/month/<prefixo>_date vêm da ingestão (ou do cache de coeqa.data);
+    # derive() só completa os resultados de consulta ao banco
+    def _prep(df_story, df_epic, df_bug, df_subbug, df_ze, df_zc):
+        for d in (df_story, df_epic, df_bug, df_subbug):
+            derive(d, "jira_issues")
+        flags(derive(df_ze, "zephyr_executions"), "zephyr_executions")
+        flags(derive(df_zc, "zephyr_testcases"), "zephyr_testcases")
 
     # ====== Filtros (Data + Domain) ======
     # limite de datas baseado em execuções; se vazio, usa created das issues
-    all_exec_dates = df_ze["executed_date"].dropna().tolist() if "executed_date" in df_ze.columns else []
-    if all_exec_dates:
-        min_d, max_d = min(all_exec_dates), max(all_exec_dates)
+    # (manifesto da extração → banco → linhas carregadas)
+    bounds = manifest.date_bounds(["zephyr_executions"]) or manifest.date_bounds(ISSUE_TABLES.values())
+    if not bounds and use_db:
+        bounds = (store.date_bounds(["zephyr_executions"], "executedOn")
+                  or store.date_bounds(ISSUE_TABLES.values(), "created"))
+    if not bounds:
+        bounds = (date_range([df_ze], "executed")
+                  or date_range([df_story, df_epic, df_bug, df_subbug], "created"))
+    if bounds:
+        min_d, max_d = bounds
     else:
-        pool = []
-        for d in (df_story, df_epic, df_bug, df_subbug):
-            if "created_date" in d.columns:
-                pool += d["created_date"].dropna().tolist()
-        if pool:
-            min_d, max_d = min(pool), max(pool)
-        else:
-            min_d, max_d = date.today() - timedelta(days=180), date.today()
+        min_d, max_d = date.today() - timedelta(days=180), date.today()
 
     # Fonte única do intervalo
     if "analit_periodo_master" not in st.session_state:
@@ -155,6 +130,8 @@ def pagina_dashboard_analytical():
     with c0:
         if not df_proj.empty:
             projects = ["Todos"] + sorted(df_proj["key"].dropna().unique().tolist())
+        elif use_db:
+            projects = ["Todos"] + store.distinct([*ISSUE_TABLES.values(), "zephyr_executions"], "projectKey")
         else:
             pref = []
             for d in (df_story, df_epic, df_bug, df_subbug, df_ze):
@@ -209,12 +186,22 @@ def pagina_dashboard_analytical():
         if df.empty or "executed_date" not in df.columns: return df
         return df[(df["executed_date"] >= d_start) & (df["executed_date"] <= d_end)].copy()
 
-    f_story  = f_proj(f_period_created(df_story))
-    f_epic   = f_proj(f_period_created(df_epic))
-    f_bug    = f_proj(f_period_created(df_bug))
-    f_subbug = f_proj(f_period_created(df_subbug))
-    f_ze     = f_proj(f_period_exec(df_ze))
-    f_zc     = f_proj(f_period_created(df_zc))
+    if use_db:
+        # Domain e período viram WHERE sobre (projectKey, created/executedOn) indexados
+        def q(table, cols, date_col):
+            df = store.select(table, cols, project=sel_project, date_col=date_col, start=d_start, end=d_end)
+            return df if df is not None else pd.DataFrame(columns=cols)
+        f_story, f_epic, f_bug, f_subbug = (q(ISSUE_TABLES[t], ISSUE_COLS, "created") for t in ("story","epic","bug","subbug"))
+        f_ze = q("zephyr_executions", Z_EXEC_COLS, "executedOn")
+        f_zc = q("zephyr_testcases", Z_CASES_COLS, "created")
+        _prep(f_story, f_epic, f_bug, f_subbug, f_ze, f_zc)
+    else:
+        f_story  = f_proj(f_period_created(df_story))
+        f_epic   = f_proj(f_period_created(df_epic))
+        f_bug    = f_proj(f_period_created(df_bug))
+        f_subbug = f_proj(f_period_created(df_subbug))
+        f_ze     = f_proj(f_period_exec(df_ze))
+        f_zc     = f_proj(f_period_created(df_zc))
     f_proj_all = df_proj if sel_project == "Todos" else df_proj[df_proj["key"] == sel_project]
 
     # ====== KPIs ======
@@ -234,14 +221,14 @@ def pagina_dashboard_analytical():
     # Linha 2
     m1, m2, m3, m4 = st.columns(4)
     with m1:
-        if not f_ze.empty and "automated" in f_ze.columns:
-            manual = (~f_ze["automated"].astype(str).str.lower().isin(["1","true","yes"])).sum()
+        if not f_ze.empty:
+            manual = (~f_ze["is_automated"]).sum()
         else:
             manual = 0
         st.metric("# Manual Test Run", int(manual))
     with m2:
-        if not f_ze.empty and "automated" in f_ze.columns:
-            auto = f_ze["automated"].astype(str).str.lower().isin(["1","true","yes"]).sum()
+        if not f_ze.empty:
+            auto = f_ze["is_automated"].sum()
         else:
             auto = 0
         st.metric("# Automated Test Run", int(auto))
@@ -259,6 +246,16 @@ def pagina_dashboard_analytical():
     st.markdown("---")
 
     # ====== Tabela principal (issues) ======
+    # Coverage Tests: proxy — número de execuções no Zephyr por issue (GROUP BY no banco, quando há)
+    runs_by_issue = None
+    if use_db:
+        cnt = store.count_by("zephyr_executions", ["issueKey"], project=sel_project,
+                             date_col="executedOn", start=d_start, end=d_end)
+        if cnt is not None:
+            runs_by_issue = cnt.set_index("issueKey")["n"]
+    if runs_by_issue is None and not f_ze.empty and "issueKey" in f_ze.columns:
+        runs_by_issue = f_ze.groupby("issueKey").size()
+
     # monta df unificado
     def _prep_issues(df: pd.DataFrame, tipo: str) -> pd.DataFrame:
         if df.empty: 
@@ -275,8 +272,7 @@ def pagina_dashboard_analytical():
         out["Sub-domain"]     = tipo
         out["Issue"]          = df["key"]
         # Coverage Tests: proxy — número de execuções no Zephyr para a issue
-        if "key" in df.columns and not f_ze.empty and "issueKey" in f_ze.columns:
-            runs_by_issue = f_ze.groupby("issueKey").size()
+        if "key" in df.columns and runs_by_issue is not None:
             out["Coverage Tests"] = out["Issue"].map(runs_by_issue).fillna(0).astype(int)
         else:
             out["Coverage Tests"] = 0
@@ -314,12 +310,12 @@ def pagina_dashboard_analytical():
 
     with cA:
         st.markdown("#### Execuções por tipo (Regressive × Others)")
-        if f_ze.empty or "testType" not in f_ze.columns:
+        if f_ze.empty:
             st.info("Sem dados suficientes.")
         else:
             z = f_ze.copy()
             z["grp"] = np.where(
-                z["testType"].astype(str).str.lower().str.contains("regress"), "Regressive", "Others"
+                z["is_regression"], "Regressive", "Others"
             )
             df_grp = z.groupby("grp").size().reset_index(name="runs")
             ch = alt.Chart(df_grp).mark_bar().encode(
@@ -335,11 +331,7 @@ def pagina_dashboard_analytical():
             st.info("Sem execuções no período.")
         else:
             z = f_ze.copy()
-            neg = pd.Series(False, index=z.index)
-            if "testType" in z.columns:
-                neg |= z["testType"].astype(str).str.lower().str.contains("negative|negativo")
-            if "labels" in z.columns:
-                neg |= z["labels"].astype(str).str.lower().str.contains("negative|negativo")
+            neg = z["is_negative"]
             df_pn = pd.DataFrame({
                 "class": ["Positive","Negative"],
                 "runs":  [int((~neg).sum()), int(neg.sum())]
@@ -353,10 +345,10 @@ def pagina_dashboard_analytical():
 
     with cC:
         st.markdown("#### Automated × Manual")
-        if f_ze.empty or "automated" not in f_ze.columns:
+        if f_ze.empty:
             st.info("Sem dados suficientes.")
         else:
-            is_auto = f_ze["automated"].astype(str).str.lower().isin(["1","true","yes"])
+            is_auto = f_ze["is_automated"]
             df_am = pd.DataFrame({
                 "tipo": ["Automated","Manual"],
                 "runs": [int(is_auto.sum()), int((~is_auto).sum())]
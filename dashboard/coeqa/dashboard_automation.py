@@ -3,10 +3,10 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-from pathlib import Path
 from datetime import datetime, date, timedelta
 
-DATA = Path("config/data")
+from coeqa import manifest
+from coeqa.data import safe_read_csv, safe_read_parquet, date_range
 
 PROJ_COLS = ["id","key","name","projectTypeKey","lead"]
 
@@ -21,22 +21,6 @@ Z_EXEC_COLS  = [
 ]
 
 # =============== Utils / Helpers ===============
-def safe_read_csv(name: str, columns=None) -> pd.DataFrame:
-    p = DATA / name
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame(columns=columns or [])
-    try:
-        df = pd.read_csv(p)
-        if columns:
-            for c in columns:
-                if c not in df.columns:
-                    df[c] = pd.NA
-            keep = [c for c in columns if c in df.columns]
-            if keep: df = df[keep]
-        return df
-    except Exception:
-        return pd.DataFrame(columns=columns or [])
-
 def to_date(x):
     if isinstance(x, date) and not isinstance(x, datetime): return x
     try:
@@ -62,14 +46,6 @@ def lbl_auto(v):
     if s in ["0","false","no"]: return "Manual"
     return "N/A"
 
-def is_auto(row):
-    # heurística ampla para “automated”
-    fields = []
-    for f in ("automated","testType","labels","name"):
-        if f in row and pd.notna(row[f]): fields.append(str(row[f]).lower())
-    s = " ".join(fields)
-    return ("true" in s) or ("autom" in s)
-
 def map_status(s):
     s = str(s).lower()
     if "pass" in s or "ok" in s or "done" in s: return "Pass"
@@ -80,20 +56,6 @@ def map_status(s):
     if "cancel" in s: return "Canceled"
     return "Others"
 
-def norm_created(df: pd.DataFrame):
-    if df.empty or "created" not in df.columns: return
-    dt = pd.to_datetime(df["created"], errors="coerce")
-    df["created_dt"]   = dt
-    df["created_date"] = dt.dt.date
-    df["created_month"]= dt.dt.strftime("%Y-%m")
-
-def norm_executed(df: pd.DataFrame):
-    if df.empty or "executedOn" not in df.columns: return
-    dt = pd.to_datetime(df["executedOn"], errors="coerce")
-    df["executed_dt"]   = dt
-    df["executed_date"] = dt.dt.date
-    df["executed_month"]= dt.dt.strftime("%Y-%m")
-
 # =============== Página ===============
 def pagina_dashboard_automation():
     try:
@@ -124,19 +86,15 @@ def pagina_dashboard_automation():
 
     # -------- Dados --------
     df_proj = safe_read_csv("jira_projetos_latest.csv", PROJ_COLS)
-    df_cases = safe_read_csv("zephyr_testcases_latest.csv", Z_CASES_COLS)
-    df_exec  = safe_read_csv("zephyr_executions_latest.csv", Z_EXEC_COLS)
-
-    norm_created(df_cases)
-    norm_executed(df_exec)
+    df_cases = safe_read_parquet("zephyr_testcases",            Z_CASES_COLS)
+    df_exec  = safe_read_parquet("zephyr_executions",            Z_EXEC_COLS)
+    # created_*/executed_* (dt, date, month) já vêm derivados da ingestão
 
     # -------- Filtros superiores --------
     # Janela por execuções (se faltar, usa hoje)
-    if not df_exec.empty and "executed_date" in df_exec.columns:
-        pool = [to_date(x) for x in df_exec["executed_date"].dropna().tolist()]
-        min_raw, max_raw = (min(pool), max(pool)) if pool else (date.today(), date.today())
-    else:
-        min_raw, max_raw = (date.today(), date.today())
+    # do manifesto da extração (sem ler linhas); sem ele, das execuções já carregadas
+    bounds = manifest.date_bounds(["zephyr_executions"]) or date_range([df_exec], "executed")
+    min_raw, max_raw = bounds or (date.today(), date.today())
 
     min_d, max_d = to_date(min_raw), to_date(max_raw)
     if min_d == max_d:
@@ -221,26 +179,22 @@ def pagina_dashboard_automation():
     c_filtered = f_cases(df_cases)
     e_filtered = f_exec(df_exec)
 
-    # Marca flag automated/categoria
-    if not c_filtered.empty:
-        c_filtered = c_filtered.copy()
-        c_filtered["auto_flag"] = c_filtered.apply(is_auto, axis=1)
+    # is_automated já vem das bases (coeqa.data → regras de config/test_classification.yaml)
     if not e_filtered.empty:
         e_filtered = e_filtered.copy()
-        e_filtered["auto_flag"] = e_filtered.apply(is_auto, axis=1)
         e_filtered["status_grp"] = e_filtered["status"].apply(map_status)
 
     # -------- KPIs --------
     total_cases = int(c_filtered.shape[0])
-    automated_cases = int(c_filtered["auto_flag"].sum()) if "auto_flag" in c_filtered.columns else 0
+    automated_cases = int(c_filtered["is_automated"].sum()) if "is_automated" in c_filtered.columns else 0
     coverage_cases = pct(automated_cases, total_cases)
 
     total_exec = int(e_filtered.shape[0])
-    auto_exec   = int(e_filtered["auto_flag"].sum()) if "auto_flag" in e_filtered.columns else 0
+    auto_exec   = int(e_filtered["is_automated"].sum()) if "is_automated" in e_filtered.columns else 0
     manual_exec = total_exec - auto_exec
 
-    auto_pass = int(((e_filtered["status_grp"]=="Pass") & (e_filtered["auto_flag"])).sum()) if not e_filtered.empty else 0
-    auto_fail = int(((e_filtered["status_grp"]=="Fail") & (e_filtered["auto_flag"])).sum()) if not e_filtered.empty else 0
+    auto_pass = int(((e_filtered["status_grp"]=="Pass") & (e_filtered["is_automated"])).sum()) if not e_filtered.empty else 0
+    auto_fail = int(((e_filtered["status_grp"]=="Fail") & (e_filtered["is_automated"])).sum()) if not e_filtered.empty else 0
     auto_pass_rate = pct(auto_pass, auto_pass + auto_fail)
 
     backlog_to_automate = max(total_cases - automated_cases, 0)
@@ -248,8 +202,8 @@ def pagina_dashboard_automation():
     # “Estabilidade” (flakiness inversa nos automatizados)
     flaky_auto = 0
     stability_auto = 100.0
-    if not e_filtered.empty and {"testKey","status_grp","auto_flag"}.issubset(e_filtered.columns):
-        g = e_filtered[e_filtered["auto_flag"]].groupby("testKey")["status_grp"].apply(lambda s: set(s))
+    if not e_filtered.empty and {"testKey","status_grp","is_automated"}.issubset(e_filtered.columns):
+        g = e_filtered[e_filtered["is_automated"]].groupby("testKey")["status_grp"].apply(lambda s: set(s))
         flaky_auto = int(sum(1 for v in g.values if ("Pass" in v and "Fail" in v)))
         uniq = g.shape[0] if g.shape[0] else 1
         stability_auto = 100.0 - pct(flaky_auto, uniq)
@@ -274,7 +228,7 @@ def pagina_dashboard_automation():
         if c_filtered.empty:
             st.info("Sem casos no filtro atual.")
         else:
-            dist = c_filtered["auto_flag"].map(lambda x: "Automated" if x else "Manual").value_counts().rename_axis("tipo").reset_index(name="qtd")
+            dist = c_filtered["is_automated"].map(lambda x: "Automated" if x else "Manual").value_counts().rename_axis("tipo").reset_index(name="qtd")
             if "N/A" in c_filtered.get("automated", pd.Series(dtype=str)).astype(str).str.lower().tolist():
                 # tentativa simples de detectar N/A; caso não exista, segue só com 2 fatias
                 pass
@@ -289,7 +243,7 @@ def pagina_dashboard_automation():
             st.info("Sem casos para calcular cobertura.")
         else:
             by_proj_total = c_filtered.groupby("projectKey").size().rename("total")
-            by_proj_auto  = c_filtered[c_filtered["auto_flag"]].groupby("projectKey").size().rename("auto")
+            by_proj_auto  = c_filtered[c_filtered["is_automated"]].groupby("projectKey").size().rename("auto")
             df_cov = pd.concat([by_proj_total, by_proj_auto], axis=1).fillna(0)
             df_cov["coverage_%"] = (df_cov["auto"]/df_cov["total"]*100).round(2)
             df_cov = df_cov.reset_index().rename(columns={"index":"projectKey"})
@@ -311,7 +265,7 @@ def pagina_dashboard_automation():
             st.info("Sem execuções no período.")
         else:
             d = e_filtered.copy()
-            d["kind"] = d["auto_flag"].map(lambda x: "Automated" if x else "Manual")
+            d["kind"] = d["is_automated"].map(lambda x: "Automated" if x else "Manual")
             agg = d.groupby(["executed_month","kind"]).size().reset_index(name="qtd")
             ch = alt.Chart(agg).mark_line(point=True).encode(
                 x=alt.X("executed_month:N", title=None, sort=None),
@@ -325,7 +279,7 @@ def pagina_dashboard_automation():
         if e_filtered.empty:
             st.info("Sem execuções.")
         else:
-            d = e_filtered[~e_filtered["auto_flag"]].copy()
+            d = e_filtered[~e_filtered["is_automated"]].copy()
             if d.empty:
                 st.success("Não há execuções manuais neste período 🎉")
             else:
@@ -345,7 +299,7 @@ def pagina_dashboard_automation():
     if e_filtered.empty:
         st.info("Sem execuções.")
     else:
-        d = e_filtered[e_filtered["auto_flag"]].copy()
+        d = e_filtered[e_filtered["is_automated"]].copy()
         feat = None
         if "component" in d.columns and d["component"].notna().any():
             feat = d["component"].astype(str).str.split("[,;]").str[0].str.strip()
@@ -374,7 +328,7 @@ def pagina_dashboard_automation():
     if e_filtered.empty:
         st.info("Sem execuções.")
     else:
-        d = e_filtered[e_filtered["auto_flag"]].copy()
+        d = e_filtered[e_filtered["is_automated"]].copy()
         if "executed_dt" in d.columns:
             d = d.sort_values("executed_dt", ascending=False)
         cols = [c for c in ["executedOn","projectKey","testKey","status","environment","wave","issueKey","component"] if c in d.columns]
@@ -3,49 +3,17 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-from pathlib import Path
 from datetime import datetime, date, timedelta
 
-DATA = Path("config/data")
+from coeqa import store
+from coeqa import manifest
+from coeqa.data import safe_read_csv, safe_read_parquet, derive, date_range
 
 ISSUE_COLS = ["key","summary","status","type","priority","created","resolutiondate","assignee","reporter"]
 PROJ_COLS  = ["id","key","name","projectTypeKey","lead"]
+TRANS_COLS = ["key","from","to","timestamp"]
 
 # ----------------- utils -----------------
-def safe_read_csv(name: str, columns=None) -> pd.DataFrame:
-    p = DATA / name
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame(columns=columns or [])
-    try:
-        df = pd.read_csv(p)
-        if columns:
-            for c in columns:
-                if c not in df.columns:
-                    df[c] = pd.NA
-            keep = [c for c in columns if c in df.columns]
-            df = df[keep]
-        return df
-    except Exception:
-        return pd.DataFrame(columns=columns or [])
-
-def key_project_prefix(key: str) -> str:
-    if isinstance(key, str) and "-" in key:
-        return key.split("-")[0]
-    return ""
-
-def _normalize_dates(df: pd.DataFrame):
-    # cria created_dt/date e resolved_dt/date
-    if "created" in df.columns:
-        cdt = pd.to_datetime(df["created"], errors="coerce")
-        df["created_dt"] = cdt
-        df["created_date"] = cdt.dt.date
-        df["created_month"] = cdt.dt.strftime("%Y-%m")
-    if "resolutiondate" in df.columns:
-        rdt = pd.to_datetime(df["resolutiondate"], errors="coerce")
-        df["resolved_dt"] = rdt
-        df["resolved_date"] = rdt.dt.date
-        df["resolved_month"] = rdt.dt.strftime("%Y-%m")
-
 def _ensure_range_key(key: str, fallback: tuple[date,date]):
     v = st.session_state.get(key)
     if isinstance(v, (list,tuple)) and len(v)==2:
@@ -78,6 +46,23 @@ def _bucketize_days(d):
     if x <= 60:   return "≤ 60 days"
     return  "> 60 days"
 
+def _time_in_status(tr: pd.DataFrame, issues: pd.DataFrame, now) -> pd.DataFrame:
+    # períodos por status a partir das transições (key, from, to, timestamp) — vetorizado
+    if tr.empty: return pd.DataFrame(columns=["key","status","days"])
+    tr = tr.assign(ts=pd.to_datetime(tr["timestamp"], errors="coerce", utc=True))
+    tr = tr.dropna(subset=["ts"]).sort_values(["key","ts"])
+    end = tr.groupby("key")["ts"].shift(-1).fillna(now)
+    periods = pd.DataFrame({"key": tr["key"], "status": tr["to"], "days": (end - tr["ts"]).dt.total_seconds()/86400})
+    # período inicial: created → primeira transição (status "from")
+    first = tr.drop_duplicates("key")[["key","from","ts"]]
+    created = pd.to_datetime(issues.drop_duplicates("key").set_index("key")["created"], errors="coerce", utc=True)
+    first = first.assign(created=first["key"].map(created)).dropna(subset=["created"])
+    periods = pd.concat([periods, pd.DataFrame({
+        "key": first["key"], "status": first["from"],
+        "days": (first["ts"] - first["created"]).dt.total_seconds()/86400,
+    })], ignore_index=True)
+    return periods[periods["days"] >= 0]
+
 # ----------------- página -----------------
 def pagina_dashboard_bugs():
     try:
@@ -106,28 +91,32 @@ def pagina_dashboard_bugs():
     st.markdown("### Bugs & Sub-bugs")
 
     # ====== Carrega bases ======
-    df_bug    = safe_read_csv("jira_issues_bug_latest.csv",    ISSUE_COLS)
-    df_subbug = safe_read_csv("jira_issues_subbug_latest.csv", ISSUE_COLS)
+    # com o banco analítico (config/data/coeqa.sqlite), bugs/sub-bugs só são
+    # lidos depois dos filtros, já filtrados no banco; sem ele, carrega tudo
+    use_db = store.has_tables("jira_issues_bug", "jira_issues_subbug")
+    if use_db:
+        df_bug, df_subbug = pd.DataFrame(columns=ISSUE_COLS), pd.DataFrame(columns=ISSUE_COLS)
+    else:
+        df_bug    = safe_read_parquet("jira_issues_bug",               ISSUE_COLS)
+        df_subbug = safe_read_parquet("jira_issues_subbug",            ISSUE_COLS)
     df_proj   = safe_read_csv("jira_projetos_latest.csv",      PROJ_COLS)
+    df_trans  = safe_read_parquet("jira_transitions",              TRANS_COLS)
 
-    # prepara projectKey + datas
-    for d in (df_bug, df_subbug):
-        if not d.empty:
-            if "projectKey" not in d.columns:
-                d["projectKey"] = d["key"].apply(key_project_prefix)
-            _normalize_dates(d)
+    # projectKey + created_*/resolved_* (dt, date, month) vêm derivados da
+    # ingestão; derive() só completa os resultados de consulta ao banco
+    def _prep(*dfs):
+        for d in dfs:
+            derive(d, "jira_issues")
 
     # ====== Filtros (Data + Domain) ======
     # usamos intervalo pela data de criação (Created)
-    pool = []
-    for d in (df_bug, df_subbug):
-        if "created_date" in d.columns:
-            pool += [to_date(x) for x in d["created_date"].dropna().tolist()]
-
-    if pool:
-        min_d_raw, max_d_raw = min(pool), max(pool)
-    else:
-        min_d_raw, max_d_raw = date.today(), date.today()
+    # (manifesto da extração → banco → linhas carregadas)
+    bounds = manifest.date_bounds(["jira_issues_bug", "jira_issues_subbug"])
+    if not bounds and use_db:
+        bounds = store.date_bounds(["jira_issues_bug", "jira_issues_subbug"], "created")
+    if not bounds:
+        bounds = date_range([df_bug, df_subbug], "created")
+    min_d_raw, max_d_raw = bounds or (date.today(), date.today())
 
     # Garante date puro e evita min==max no slider
     min_d, max_d = to_date(min_d_raw), to_date(max_d_raw)
@@ -153,6 +142,8 @@ def pagina_dashboard_bugs():
     with c0:
         if not df_proj.empty:
             projects = ["Todos"] + sorted(df_proj["key"].dropna().unique().tolist())
+        elif use_db:
+            projects = ["Todos"] + store.distinct(["jira_issues_bug", "jira_issues_subbug"], "projectKey")
         else:
             pref = []
             for d in (df_bug, df_subbug):
@@ -196,8 +187,16 @@ def pagina_dashboard_bugs():
         return df[(df["created_date"]>=d_start) & (df["created_date"]<=d_end)].copy()
 
     # aplica filtros
-    fb = f_proj(f_period_created(df_bug))
-    fs = f_proj(f_period_created(df_subbug))
+    if use_db:
+        # Domain e período viram WHERE sobre (projectKey, created) indexados
+        def q(table):
+            df = store.select(table, ISSUE_COLS, project=sel_project, date_col="created", start=d_start, end=d_end)
+            return df if df is not None else pd.DataFrame(columns=ISSUE_COLS)
+        fb, fs = q("jira_issues_bug"), q("jira_issues_subbug")
+        _prep(fb, fs)
+    else:
+        fb = f_proj(f_period_created(df_bug))
+        fs = f_proj(f_period_created(df_subbug))
 
     # ====== KPIs ======
     total = int(fb.shape[0] + fs.shape[0])
@@ -368,6 +367,32 @@ def pagina_dashboard_bugs():
                 ).properties(height=260)
                 st.altair_chart(ch, use_container_width=True)
 
+    # ====== Time in Status (changelog)
+    st.markdown("---")
+    st.markdown("#### Time in Status (média de dias por bug)")
+    if df_all.empty or df_trans.empty:
+        st.info("Sem transições de status (rode o fluxo jira_transitions).")
+    else:
+        tr = df_trans[df_trans["key"].isin(df_all["key"])]
+        periods = _time_in_status(tr, df_all, pd.Timestamp.now(tz="UTC"))
+        st_lower = periods["status"].astype(str).str.lower()
+        # status finais (Done/Cancelled) acumulam até hoje: não entram no ciclo
+        final = st_lower.str.contains("done|closed|resolvid|cancel", regex=True)
+        periods = periods[~final]
+        if periods.empty:
+            st.info("Sem transições no período selecionado.")
+        else:
+            per_issue = periods.groupby(["status","key"], as_index=False)["days"].sum()
+            df_tis = (per_issue.groupby("status")["days"]
+                      .agg(bugs="count", avg_days="mean", median_days="median")
+                      .round(2).reset_index().sort_values("avg_days", ascending=False))
+            ch = alt.Chart(df_tis).mark_bar().encode(
+                x=alt.X("avg_days:Q", title="Dias (média)"),
+                y=alt.Y("status:N", title=None, sort="-x"),
+                tooltip=["status","bugs","avg_days","median_days"]
+            ).properties(height=max(160, 28*len(df_tis)))
+            st.altair_chart(ch, use_container_width=True)
+
 # debug
 if __name__ == "__main__":
     pagina_dashboard_bugs()
@@ -3,10 +3,11 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-from pathlib import Path
 from datetime import datetime, date, timedelta
 
-DATA = Path("config/data")
+from coeqa import store
+from coeqa import manifest
+from coeqa.data import safe_read_csv, safe_read_parquet, derive, flags, date_range
 
 ISSUE_COLS = ["key","summary","status","type","priority","created","resolutiondate","assignee","reporter"]
 PROJ_COLS  = ["id","key","name","projectTypeKey","lead"]
@@ -16,33 +17,6 @@ Z_CASES_COLS = ["key","name","status","automated","testType","labels","created",
 Z_EXEC_COLS  = ["executionKey","testKey","status","automated","testType","labels","executedOn","projectKey","issueKey"]
 
 # ---------- utils ----------
-def safe_read_csv(name: str, columns=None) -> pd.DataFrame:
-    p = DATA / name
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame(columns=columns or [])
-    try:
-        df = pd.read_csv(p)
-        if columns:
-            for c in columns:
-                if c not in df.columns:
-                    df[c] = pd.NA
-            df = df[[c for c in columns if c in df.columns]]
-        return df
-    except Exception:
-        return pd.DataFrame(columns=columns or [])
-
-def key_project_prefix(key: str) -> str:
-    if isinstance(key, str) and "-" in key:
-        return key.split("-")[0]
-    return ""
-
-def to_month(dt_str):
-    if pd.isna(dt_str): return None
-    try:
-        return pd.to_datetime(dt_str).strftime("%Y-%m")
-    except Exception:
-        return None
-
 def pct(a, b):
     return float(a) / float(b) * 100 if b not in (0, None, np.nan) else 0.0
 
@@ -77,41 +51,39 @@ def pagina_dashboard_coverage_and_run():
     st.markdown("### Coverage and Run")
 
     # ----- Carrega bases
-    df_story  = safe_read_csv("jira_issues_story_latest.csv",  ISSUE_COLS)
-    df_epic   = safe_read_csv("jira_issues_epic_latest.csv",   ISSUE_COLS)
-    df_bug    = safe_read_csv("jira_issues_bug_latest.csv",    ISSUE_COLS)
-    df_subbug = safe_read_csv("jira_issues_subbug_latest.csv", ISSUE_COLS)
+    # com o banco analítico (config/data/coeqa.sqlite), histórias/épicos/casos/
+    # execuções só são lidos depois dos filtros, já filtrados no banco
+    use_db = store.has_tables("jira_issues_story", "jira_issues_epic", "zephyr_testcases", "zephyr_executions")
     df_proj   = safe_read_csv("jira_projetos_latest.csv",      PROJ_COLS)
-    df_zc     = safe_read_csv("zephyr_testcases_latest.csv",   Z_CASES_COLS)
-    df_ze     = safe_read_csv("zephyr_executions_latest.csv",  Z_EXEC_COLS)
+    if use_db:
+        df_story, df_epic = pd.DataFrame(columns=ISSUE_COLS), pd.DataFrame(columns=ISSUE_COLS)
+        df_zc     = pd.DataFrame(columns=Z_CASES_COLS)
+        df_ze     = pd.DataFrame(columns=Z_EXEC_COLS)
+    else:
+        df_story  = safe_read_parquet("jira_issues_story",             ISSUE_COLS)
+        df_epic   = safe_read_parquet("jira_issues_epic",              ISSUE_COLS)
+        df_zc     = safe_read_parquet("zephyr_testcases",              Z_CASES_COLS)
+        df_ze     = safe_read_parquet("zephyr_executions",             Z_EXEC_COLS)
 
     # ----- Colunas auxiliares
-    for d in (df_story, df_epic, df_bug, df_subbug):
-        if "projectKey" not in d.columns:
-            d["projectKey"] = d["key"].apply(key_project_prefix)
-        if "created" in d.columns:
-            d["created_dt"] = pd.to_datetime(d["created"], errors="coerce")
-            d["created_date"] = d["created_dt"].dt.date
-        d["month"] = d["created"].apply(to_month)
-
-    if not df_ze.empty:
-        if "projectKey" not in df_ze.columns:
-            df_ze["projectKey"] = df_ze["issueKey"].apply(key_project_prefix)
-        df_ze["executed_dt"] = pd.to_datetime(df_ze["executedOn"], errors="coerce")
-        df_ze["executed_date"] = df_ze["executed_dt"].dt.date
-        df_ze["month"] = df_ze["executed_dt"].dt.strftime("%Y-%m")
-
-    if not df_zc.empty:
-        if "projectKey" not in df_zc.columns:
-            df_zc["projectKey"] = df_zc.get("key","").apply(key_project_prefix)
-        if "created" in df_zc.columns:
-            df_zc["created_dt"] = pd.to_datetime(df_zc["created"], errors="coerce")
-            df_zc["created_date"] = df_zc["created_dt"].dt.date
+    # projectKey/month/<prefixo>_date vêm da ingestão (ou do cache de coeqa.data);
+    # derive() só completa os resultados de consulta ao banco
+    def _prep(df_story, df_epic, df_zc, df_ze):
+        for d in (df_story, df_epic):
+            derive(d, "jira_issues")
+        flags(derive(df_ze, "zephyr_executions"), "zephyr_executions")
+        flags(derive(df_zc, "zephyr_testcases"), "zephyr_testcases")
+
 
     # ----- Filtros: intervalo (calendário + slider) e Domain
-    all_exec_dates = df_ze["executed_date"].dropna().tolist() if "executed_date" in df_ze.columns else []
-    if all_exec_dates:
-        min_d, max_d = min(all_exec_dates), max(all_exec_dates)
+    # (manifesto da extração → banco → linhas carregadas)
+    bounds = manifest.date_bounds(["zephyr_executions"])
+    if not bounds and use_db:
+        bounds = store.date_bounds(["zephyr_executions"], "executedOn")
+    if not bounds:
+        bounds = date_range([df_ze], "executed")
+    if bounds:
+        min_d, max_d = bounds
     else:
         min_d, max_d = date.today() - timedelta(days=180), date.today()
 
@@ -148,6 +120,8 @@ def pagina_dashboard_coverage_and_run():
     with c0:
         if not df_proj.empty:
             projects = ["Todos"] + sorted(df_proj["key"].dropna().unique().tolist())
+        elif use_db:
+            projects = ["Todos"] + store.distinct(["jira_issues_story", "jira_issues_epic", "zephyr_executions"], "projectKey")
         else:
             pref = []
             for d in (df_story, df_epic, df_ze):
@@ -202,10 +176,21 @@ def pagina_dashboard_coverage_and_run():
         if df.empty or "created_date" not in df.columns: return df
         return df[(df["created_date"] >= d_start) & (df["created_date"] <= d_end)].copy()
 
-    f_story  = f_proj(f_period_created(df_story))
-    f_epic   = f_proj(f_period_created(df_epic))
-    f_zc     = f_proj(f_period_created(df_zc))
-    f_ze     = f_proj(f_period_exec(df_ze))
+    if use_db:
+        # Domain e período viram WHERE sobre (projectKey, created/executedOn) indexados
+        def q(table, cols, date_col):
+            df = store.select(table, cols, project=sel_project, date_col=date_col, start=d_start, end=d_end)
+            return df if df is not None else pd.DataFrame(columns=cols)
+        f_story  = q("jira_issues_story", ISSUE_COLS, "created")
+        f_epic   = q("jira_issues_epic", ISSUE_COLS, "created")
+        f_zc     = q("zephyr_testcases", Z_CASES_COLS, "created")
+        f_ze     = q("zephyr_executions", Z_EXEC_COLS, "executedOn")
+        _prep(f_story, f_epic, f_zc, f_ze)
+    else:
+        f_story  = f_proj(f_period_created(df_story))
+        f_epic   = f_proj(f_period_created(df_epic))
+        f_zc     = f_proj(f_period_created(df_zc))
+        f_ze     = f_proj(f_period_exec(df_ze))
 
     # ----- Cards
     col1 = st.columns(4)
@@ -225,14 +210,14 @@ def pagina_dashboard_coverage_and_run():
 
     col2 = st.columns(4)
     with col2[0]:
-        if not f_ze.empty and "automated" in f_ze.columns:
-            man = (~f_ze["automated"].astype(str).str.lower().isin(["1","true","yes"])).sum()
+        if not f_ze.empty:
+            man = (~f_ze["is_automated"]).sum()
         else:
             man = 0
         st.metric("Manual Test Run", int(man))
     with col2[1]:
-        if not f_ze.empty and "automated" in f_ze.columns:
-            aut = f_ze["automated"].astype(str).str.lower().isin(["1","true","yes"]).sum()
+        if not f_ze.empty:
+            aut = f_ze["is_automated"].sum()
         else:
             aut = 0
         st.metric("Automated Test Run", int(aut))
@@ -257,7 +242,7 @@ def pagina_dashboard_coverage_and_run():
     if f_zc.empty:
         st.info("Sem dados de casos de teste (Zephyr Test Cases).")
     else:
-        auto_mask = f_zc["automated"].astype(str).str.lower().isin(["1","true","yes"])
+        auto_mask = f_zc["is_automated"]
         n_auto = int(auto_mask.sum())
         n_total = int(len(f_zc))
         n_not_app = int((f_zc.get("status","").astype(str).str.contains("not applic", case=False)).sum()) if "status" in f_zc.columns else 0
@@ -279,12 +264,12 @@ def pagina_dashboard_coverage_and_run():
     # ---------- Regressive × Others
     with cA:
         st.markdown("#### Regressive × Others (Test type)")
-        if f_ze.empty or "testType" not in f_ze.columns:
+        if f_ze.empty:
             st.info("Sem dados suficientes para agrupar por 'testType'.")
         else:
             z = f_ze.copy()
             z["grp"] = np.where(
-                z["testType"].astype(str).str.lower().str.contains("regress"), "Regressive", "Others"
+                z["is_regression"], "Regressive", "Others"
             )
             df_grp = z.groupby("grp").size().reset_index(name="runs")
             ch = alt.Chart(df_grp).mark_bar().encode(
@@ -301,11 +286,7 @@ def pagina_dashboard_coverage_and_run():
             st.info("Sem execuções no período.")
         else:
             z = f_ze.copy()
-            neg = pd.Series(False, index=z.index)
-            if "testType" in z.columns:
-                neg |= z["testType"].astype(str).str.lower().str.contains("negative|negativo")
-            if "labels" in z.columns:
-                neg |= z["labels"].astype(str).str.lower().str.contains("negative|negativo")
+            neg = z["is_negative"]
             df_pn = pd.DataFrame({
                 "class": ["Positive","Negative"],
                 "runs":  [int((~neg).sum()), int(neg.sum())]
@@ -320,10 +301,10 @@ def pagina_dashboard_coverage_and_run():
     # ---------- Automated run × Manual run
     with cC:
         st.markdown("#### Automated run × Manual run")
-        if f_ze.empty or "automated" not in f_ze.columns:
+        if f_ze.empty:
             st.info("Sem dados suficientes para identificar execução automatizada.")
         else:
-            is_auto = f_ze["automated"].astype(str).str.lower().isin(["1","true","yes"])
+            is_auto = f_ze["is_automated"]
             df_am = pd.DataFrame({
                 "tipo": ["Automated","Manual"],
                 "runs": [int(is_auto.sum()), int((~is_auto).sum())]
@@ -343,9 +324,8 @@ def pagina_dashboard_coverage_and_run():
         st.info("Sem execuções no período selecionado.")
     else:
         z = f_ze.copy()
-        z["is_auto"] = z["automated"].astype(str).str.lower().isin(["1","true","yes"]) if "automated" in z.columns else False
-        df_month = z.groupby(["month","is_auto"]).size().reset_index(name="runs")
-        df_month["tipo"] = df_month["is_auto"].map({True:"Automated Run", False:"Manual Run"})
+        df_month = z.groupby(["month","is_automated"]).size().reset_index(name="runs")
+        df_month["tipo"] = df_month["is_automated"].map({True:"Automated Run", False:"Manual Run"})
         try:
             df_month["month_dt"] = pd.to_datetime(df_month["month"] + "-01")
             df_month = df_month.sort_values("month_dt")
@@ -360,12 +340,12 @@ def pagina_dashboard_coverage_and_run():
 
     # ---------- Automation in regressive
     st.markdown("#### Automation in regressive")
-    if f_ze.empty or "testType" not in f_ze.columns:
+    if f_ze.empty:
         st.info("Sem dados suficientes para regressão.")
     else:
         z = f_ze.copy()
-        reg = z["testType"].astype(str).str.lower().str.contains("regress")
-        is_auto = z["automated"].astype(str).str.lower().isin(["1","true","yes"]) if "automated" in df_ze.columns else False
+        reg = z["is_regression"]
+        is_auto = z["is_automated"]
         df_reg = pd.DataFrame({
             "status": ["Automated", "Manual"],
             "runs": [int((reg & is_auto).sum()), int((reg & ~is_auto).sum())]
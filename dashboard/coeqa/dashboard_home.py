@@ -1,81 +1,50 @@
 # coeqa/dashboard_home.py
 import streamlit as st
 import pandas as pd
-from pathlib import Path
 
 # =================== Config de dados ===================
-DATA = Path("config/data")
+from coeqa.data import safe_read_csv
+from coeqa import kpi_cube
+from metrics.score import score_frame   # motor de score em lote (src/metrics/score.py)
 
-ISSUE_COLS = ["key","summary","status","type","priority","created","resolutiondate","assignee","reporter"]
 PROJ_COLS  = ["id","key","name","projectTypeKey","lead"]
 
-def safe_read_csv(name: str, columns=None) -> pd.DataFrame:
-    """
-    Lê CSV com segurança:
-    - se não existir ou tiver 0 bytes, retorna DF vazio com colunas esperadas
-    - se existir mas faltar alguma coluna, cria a coluna vazia
-    - se der erro de parsing, retorna DF vazio com colunas esperadas
-    """
-    p = DATA / name
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame(columns=columns or [])
-    try:
-        df = pd.read_csv(p)
-        if columns:
-            for c in columns:
-                if c not in df.columns:
-                    df[c] = pd.NA
-            df = df[[c for c in columns if c in df.columns]]
-        return df
-    except Exception:
-        return pd.DataFrame(columns=columns or [])
-
-def map_tier(score: float) -> str:
-    if score >= 3.5: return "Diamond 💎"
-    if score >= 3.0: return "Gold 🥇"
-    if score >= 2.0: return "Silver 🥈"
-    return "Bronze 🥉"
-
-def _make_summary(df_proj, df_func, df_story, df_epic, df_bug, df_subbug) -> pd.DataFrame:
+SUMMARY_COLS = [
+    "Domain","Category","Tier","Score","Covering Test","Test AVG",
+    "Created Automation","Automated Runs","Test Regression",
+    "Negative Test","Resolution Bug"
+]
+
+def _fmt(s: pd.Series, pattern: str) -> pd.Series:
+    return s.map(lambda v: pattern.format(v) if pd.notna(v) else "—")
+
+def _make_summary(df_proj, cube) -> pd.DataFrame:
     """
-    Exemplo de resumo por 'Domain' (usa Project Key como domínio).
-    Substitua pelas suas fórmulas reais assim que fechar as métricas.
+    Resumo por 'Domain' (usa Project Key como domínio): KPIs do cubo
+    (coeqa.kpi_cube) somados por projeto e, numa passada só para todos os
+    domínios, notas, Score e faixa (metrics.score.score_frame). Domínio sem
+    dados fica com nota 0 (Bronze) e "—" nas métricas.
     """
     if df_proj.empty:
-        return pd.DataFrame(columns=[
-            "Domain","Category","Score","Covering Test","Test AVG",
-            "Created Automation","Automated Runs","Test Regression",
-            "Negative Test","Resolution Bug"
-        ])
+        return pd.DataFrame(columns=SUMMARY_COLS)
 
     proj = df_proj.rename(columns={"key":"Domain"})[["Domain","name","projectTypeKey"]].copy()
     proj["Category"] = proj["projectTypeKey"].astype(str).str.title()
 
-    # ======= MÉTRICAS DE EXEMPLO (troque pelas suas regras reais) =======
-    counts = {
-        "Func": len(df_func),
-        "Epic": len(df_epic),
-        "Story": len(df_story),
-        "Bug": len(df_bug) + len(df_subbug),
-    }
-    total_tests = max(1, counts["Func"] + counts["Story"])
-    coverage = (total_tests / (total_tests + counts["Epic"])) * 100 if total_tests else 0
-
-    proj["Score"] = round((coverage/100)*3.5, 2)
-    proj["Covering Test"] = round(coverage, 2)
-    proj["Test AVG"] = 3.0                 # coloque sua média real
-    proj["Created Automation"] = "85.7%"   # % automatizado criado (Zephyr)
-    proj["Automated Runs"] = "88.7%"       # % execuções automatizadas (Zephyr)
-    proj["Test Regression"] = "47.4%"      # % regressão (Zephyr)
-    proj["Negative Test"] = "19.3%"        # % testes negativos (Zephyr)
-    proj["Resolution Bug"] = "10.4d"       # lead time bugs (Jira)
-
-    cols = [
-        "Domain","Category","Score","Covering Test","Test AVG",
-        "Created Automation","Automated Runs","Test Regression",
-        "Negative Test","Resolution Bug"
-    ]
-    proj = proj[cols].sort_values("Score", ascending=False).reset_index(drop=True)
+    kpis = kpi_cube.ratios(kpi_cube.rollup(cube, by=["projectKey"])).set_index("projectKey").reindex(proj["Domain"])
+    scores = score_frame(kpis)
+
+    proj["Tier"] = scores["tier"].to_numpy()
+    proj["Score"] = scores["quality"].to_numpy()
+    proj["Covering Test"] = kpis["coverage"].fillna(0.0).round(2).to_numpy()
+    proj["Test AVG"] = kpis["test_avg"].fillna(0.0).round(2).to_numpy()
+    proj["Created Automation"] = _fmt(kpis["created_auto"], "{:.1f}%").to_numpy()   # % automatizado criado (Zephyr)
+    proj["Automated Runs"] = _fmt(kpis["auto_runs"], "{:.1f}%").to_numpy()          # % execuções automatizadas (Zephyr)
+    proj["Test Regression"] = _fmt(kpis["test_reg"], "{:.1f}%").to_numpy()          # % regressão (Zephyr)
+    proj["Negative Test"] = _fmt(kpis["negative"], "{:.1f}%").to_numpy()            # % testes negativos (Zephyr)
+    proj["Resolution Bug"] = _fmt(kpis["bug_days"], "{:.1f}d").to_numpy()           # lead time bugs (Jira)
+
+    proj = proj[SUMMARY_COLS].sort_values("Score", ascending=False).reset_index(drop=True)
     return proj
 
 def pagina_dashboard_home():
@@ -96,12 +65,10 @@ def pagina_dashboard_home():
     </style>
     """, unsafe_allow_html=True)
 
-    # ====== Carregamento das bases (tolerante a vazio) ======
-    df_func   = safe_read_csv("jira_issues_func_latest.csv",   ISSUE_COLS)
-    df_epic   = safe_read_csv("jira_issues_epic_latest.csv",   ISSUE_COLS)
-    df_story  = safe_read_csv("jira_issues_story_latest.csv",  ISSUE_COLS)
-    df_bug    = safe_read_csv("jira_issues_bug_latest.csv",    ISSUE_COLS)
-    df_subbug = safe_read_csv("jira_issues_subbug_latest.csv", ISSUE_COLS)
+    # ====== Carregamento (tolerante a vazio): cubo de KPIs + projetos ======
+    cube = kpi_cube.load()
+    if cube.empty:
+        cube = kpi_cube.from_bases()   # extração anterior ao cubo
     df_proj   = safe_read_csv("jira_projetos_latest.csv",      PROJ_COLS)
 
     # ====== Header ======
@@ -129,18 +96,12 @@ def pagina_dashboard_home():
 
     # ====== Tabela principal ======
     st.markdown("##### Visão por Domínio / Tribo")
-    summary = _make_summary(df_proj, df_func, df_story, df_epic, df_bug, df_subbug)
+    summary = _make_summary(df_proj, cube)
 
     if summary.empty:
         st.info("Sem dados ainda. Execute os extratores (Jira/Zephyr) para popular as bases em config/data/*.csv.")
     else:
-        df_show = summary.copy()
-        df_show["Tier"] = df_show["Score"].apply(map_tier)
-        df_show = df_show[[
-            "Domain","Category","Tier","Score","Covering Test","Test AVG",
-            "Created Automation","Automated Runs","Test Regression","Negative Test","Resolution Bug"
-        ]]
-        st.dataframe(df_show, use_container_width=True, height=480)
+        st.dataframe(summary, use_container_width=True, height=480)
 
 
 # Permite rodar este arquivo sozinho (útil para debug local):
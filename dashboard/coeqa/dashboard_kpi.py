@@ -1,51 +1,15 @@
 # coeqa/dashboard_kpi.py
 import streamlit as st
 import pandas as pd
-import numpy as np
 import altair as alt
-from pathlib import Path
 from datetime import datetime
 
-DATA = Path("config/data")
+from coeqa.data import safe_read_csv
+from coeqa import kpi_cube
+from coeqa.kpi_cube import ALL, NA_DIM
 
-ISSUE_COLS = ["key","summary","status","type","priority","created","resolutiondate","assignee","reporter"]
 PROJ_COLS  = ["id","key","name","projectTypeKey","lead"]
 
-# Zephyr (opcionais)
-Z_CASES_COLS = ["key","name","status","automated","testType","labels","created","projectKey"]
-Z_EXEC_COLS  = ["executionKey","testKey","status","automated","testType","labels","executedOn","projectKey","issueKey"]
-
-# ---------- util ----------
-def safe_read_csv(name: str, columns=None) -> pd.DataFrame:
-    p = DATA / name
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame(columns=columns or [])
-    try:
-        df = pd.read_csv(p)
-        if columns:
-            for c in columns:
-                if c not in df.columns:
-                    df[c] = pd.NA
-            df = df[[c for c in columns if c in df.columns]]
-        return df
-    except Exception:
-        return pd.DataFrame(columns=columns or [])
-
-def key_project_prefix(key: str) -> str:
-    if isinstance(key, str) and "-" in key:
-        return key.split("-")[0]
-    return ""
-
-def to_month(dt_str):
-    if pd.isna(dt_str): return None
-    try:
-        return pd.to_datetime(dt_str).strftime("%Y-%m")
-    except Exception:
-        return None
-
-def pct(a, b):
-    return float(a) / float(b) * 100 if b not in (0, None, np.nan) else 0.0
-
 # =========================================================
 def pagina_dashboard_kpi():
     # set_page_config pode já ter sido chamado no app principal — evitar erro
@@ -86,45 +50,28 @@ def pagina_dashboard_kpi():
 
     st.markdown("### Quality KPI’s")
 
-    # ---- Carrega bases
-    df_func   = safe_read_csv("jira_issues_func_latest.csv",   ISSUE_COLS)
-    df_epic   = safe_read_csv("jira_issues_epic_latest.csv",   ISSUE_COLS)
-    df_story  = safe_read_csv("jira_issues_story_latest.csv",  ISSUE_COLS)
-    df_bug    = safe_read_csv("jira_issues_bug_latest.csv",    ISSUE_COLS)
-    df_subbug = safe_read_csv("jira_issues_subbug_latest.csv", ISSUE_COLS)
-    df_proj   = safe_read_csv("jira_projetos_latest.csv",      PROJ_COLS)
-    df_zc     = safe_read_csv("zephyr_testcases_latest.csv",   Z_CASES_COLS)     # opcional
-    df_ze     = safe_read_csv("zephyr_executions_latest.csv",  Z_EXEC_COLS)      # opcional
-
-    # ---- colunas auxiliares
-    for d in (df_func, df_epic, df_story, df_bug, df_subbug):
-        if "projectKey" not in d.columns:
-            d["projectKey"] = d["key"].apply(key_project_prefix)
-        d["month"] = d["created"].apply(to_month)
-
-    if not df_ze.empty:
-        if "projectKey" not in df_ze.columns:
-            df_ze["projectKey"] = df_ze["issueKey"].apply(key_project_prefix)
-        df_ze["month"] = df_ze["executedOn"].apply(to_month)
-    if not df_zc.empty and "projectKey" not in df_zc.columns:
-        df_zc["projectKey"] = df_zc.get("key","").apply(key_project_prefix)
+    # ---- Carrega o cubo de KPIs (projeto × mês × ambiente × wave), materializado
+    # pelos extratores (src/extractor/common/cube.py); as bases só são lidas se
+    # a extração publicada for anterior ao cubo
+    cube = kpi_cube.load()
+    if cube.empty:
+        cube = kpi_cube.from_bases()
+    df_proj = safe_read_csv("jira_projetos_latest.csv", PROJ_COLS)
 
     # ---- Filtros topo
     if not df_proj.empty:
         projects = sorted(df_proj["key"].dropna().unique().tolist())
     else:
-        pref = pd.concat(
-            [d["projectKey"] for d in (df_func, df_epic, df_story, df_bug, df_subbug) if not d.empty] +
-            ([df_ze["projectKey"]] if not df_ze.empty else []),
-            ignore_index=True
-        )
-        projects = sorted([p for p in pref.dropna().unique().tolist() if p])
+        projects = sorted(p for p in cube["projectKey"].dropna().unique().tolist() if p)
+
+    def options(col):
+        return sorted(v for v in cube[col].unique().tolist() if v and v != NA_DIM)
 
     c1, c2, c3 = st.columns([0.35, 0.3, 0.35])
     with c1:
-        sel_project = st.selectbox("Domain (Projeto)", options=["Todos"] + projects, index=0)
+        sel_project = st.selectbox("Domain (Projeto)", options=[ALL] + projects, index=0)
     with c2:
-        st.caption("")
+        sel_env = st.selectbox("Environment", options=[ALL] + options("environment"), index=0)
     with c3:
         st.caption(datetime.now().strftime("Atualizado: %d/%m/%Y %H:%M"))
 
@@ -132,76 +79,25 @@ def pagina_dashboard_kpi():
     with c1:
         st.caption("Clique em um card abaixo para trocar o gráfico do KPI.")
     with c2:
-        st.caption("")
+        sel_wave = st.selectbox("Wave", options=[ALL] + options("wave"), index=0)
     with c3:
         st.caption("")
 
-    def apply_project(df):
-        if df.empty or sel_project == "Todos": return df
-        return df[df["projectKey"] == sel_project].copy()
-
-    df_func_f   = apply_project(df_func)
-    df_epic_f   = apply_project(df_epic)
-    df_story_f  = apply_project(df_story)
-    df_bug_f    = apply_project(df_bug)
-    df_subbug_f = apply_project(df_subbug)
-    df_ze_f     = apply_project(df_ze)
+    # ---- KPIs principais: razões das somas do recorte (NaN = sem denominador)
+    recorte = dict(project=sel_project, environment=sel_env, wave=sel_wave)
+    total = kpi_cube.ratios(kpi_cube.rollup(cube, **recorte)).iloc[0]
 
-    # ---- KPIs principais
-    cov_num = len(df_func_f) + len(df_story_f)
-    cov_den = cov_num + len(df_epic_f)
-    kpi_coverage = round(pct(cov_num, cov_den), 2)
+    def kpi(name):
+        v = total[name]
+        return round(float(v), 2) if pd.notna(v) else 0.0
 
-    if not df_ze_f.empty:
-        by_issue = df_ze_f.dropna(subset=["issueKey"]).groupby("issueKey").size()
-        kpi_test_avg = round(by_issue.mean(), 2) if not by_issue.empty else 0.0
-    else:
-        kpi_test_avg = 0.0
-
-    if not df_ze_f.empty and "automated" in df_ze_f.columns:
-        auto_runs = df_ze_f["automated"].astype(str).str.lower().isin(["1","true","yes"]).sum()
-        kpi_auto_runs = round(pct(auto_runs, len(df_ze_f)), 2)
-    else:
-        kpi_auto_runs = 0.0
-
-    if not df_ze_f.empty and {"automated","testType"}.issubset(df_ze_f.columns):
-        reg = df_ze_f["testType"].astype(str).str.lower().str.contains("regress")
-        reg_total = int(reg.sum())
-        reg_auto  = int(df_ze_f[reg]["automated"].astype(str).str.lower().isin(["1","true","yes"]).sum())
-        kpi_auto_reg = round(pct(reg_auto, reg_total), 2) if reg_total else 0.0
-    else:
-        kpi_auto_reg = 0.0
-
-    if not df_ze_f.empty and "testType" in df_ze_f.columns:
-        reg_total = int(df_ze_f["testType"].astype(str).str.lower().str.contains("regress").sum())
-        kpi_test_reg = round(pct(reg_total, len(df_ze_f)), 2)
-    else:
-        kpi_test_reg = 0.0
-
-    if not df_ze_f.empty:
-        neg_mask = pd.Series(False, index=df_ze_f.index)
-        if "testType" in df_ze_f.columns:
-            neg_mask |= df_ze_f["testType"].astype(str).str.lower().str.contains("negative|negativo")
-        if "labels" in df_ze_f.columns:
-            neg_mask |= df_ze_f["labels"].astype(str).str.lower().str.contains("negative|negativo")
-        kpi_negative = round(pct(int(neg_mask.sum()), len(df_ze_f)), 2)
-    else:
-        kpi_negative = 0.0
-
-    def avg_bug_days(df_a, df_b):
-        if df_a.empty and df_b.empty: return 0.0
-        d = pd.concat([df_a, df_b], ignore_index=True)
-        if "created" not in d or "resolutiondate" not in d: return 0.0
-        try:
-            c = pd.to_datetime(d["created"], errors="coerce")
-            r = pd.to_datetime(d["resolutiondate"], errors="coerce")
-            valid = (r.notna() & c.notna())
-            days = (r[valid] - c[valid]).dt.total_seconds() / 86400.0
-            return round(float(days.mean()) if not days.empty else 0.0, 2)
-        except Exception:
-            return 0.0
-
-    kpi_bug_days = avg_bug_days(df_bug_f, df_subbug_f)
+    kpi_coverage  = kpi("coverage")    # issues (func + story) com pelo menos 1 test case vinculado
+    kpi_test_avg  = kpi("test_avg")
+    kpi_auto_runs = kpi("auto_runs")
+    kpi_auto_reg  = kpi("auto_reg")
+    kpi_test_reg  = kpi("test_reg")
+    kpi_negative  = kpi("negative")
+    kpi_bug_days  = kpi("bug_days")
 
     KPI_DEFS = {
         "coverage":  {"title": "% Total Coverage",        "value": f"{kpi_coverage:.2f}%"},
@@ -242,99 +138,14 @@ def pagina_dashboard_kpi():
 
     st.markdown("---")
 
-    # ---- séries mensais para cada KPI
-    def monthly_series_coverage():
-        def agg(df): return df.groupby("month").size().rename("n")
-        s_func  = agg(df_func_f)
-        s_story = agg(df_story_f)
-        s_epic  = agg(df_epic_f)
-        idx = sorted(set(s_func.index) | set(s_story.index) | set(s_epic.index))
-        out = []
-        for m in idx:
-            num = int(s_func.get(m,0) + s_story.get(m,0))
-            den = int(num + s_epic.get(m,0))
-            out.append({"month": m, "value": pct(num, den)})
-        return pd.DataFrame(out)
-
-    def monthly_series_test_avg():
-        if df_ze_f.empty or "issueKey" not in df_ze_f.columns:
-            return pd.DataFrame(columns=["month","value"])
-        tmp = df_ze_f.dropna(subset=["issueKey"]).copy()
-        tmp["month"] = tmp["executedOn"].apply(to_month)
-        out = tmp.groupby(["month","issueKey"]).size().reset_index(name="runs")
-        s = out.groupby("month")["runs"].mean().reset_index(name="value")
-        return s
-
-    def monthly_series_auto_runs():
-        if df_ze_f.empty or "automated" not in df_ze_f.columns:
-            return pd.DataFrame(columns=["month","value"])
-        tmp = df_ze_f.copy()
-        tmp["is_auto"] = tmp["automated"].astype(str).str.lower().isin(["1","true","yes"])
-        s = tmp.groupby("month").apply(lambda d: pct(d["is_auto"].sum(), len(d))).reset_index(name="value")
-        return s
-
-    def monthly_series_auto_reg():
-        if df_ze_f.empty or not {"automated","testType"}.issubset(df_ze_f.columns):
-            return pd.DataFrame(columns=["month","value"])
-        tmp = df_ze_f.copy()
-        tmp["is_reg"]  = tmp["testType"].astype(str).str.lower().str.contains("regress")
-        tmp["is_auto"] = tmp["automated"].astype(str).str.lower().isin(["1","true","yes"])
-        def f(d):
-            den = int(d["is_reg"].sum())
-            num = int((d["is_reg"] & d["is_auto"]).sum())
-            return pct(num, den) if den else 0.0
-        s = tmp.groupby("month").apply(f).reset_index(name="value")
-        return s
-
-    def monthly_series_test_reg():
-        if df_ze_f.empty or "testType" not in df_ze_f.columns:
-            return pd.DataFrame(columns=["month","value"])
-        tmp = df_ze_f.copy()
-        tmp["is_reg"] = tmp["testType"].astype(str).str.lower().str.contains("regress")
-        s = tmp.groupby("month").apply(lambda d: pct(int(d["is_reg"].sum()), len(d))).reset_index(name="value")
-        return s
-
-    def monthly_series_negative():
-        if df_ze_f.empty:
-            return pd.DataFrame(columns=["month","value"])
-        tmp = df_ze_f.copy()
-        neg = pd.Series(False, index=tmp.index)
-        if "testType" in tmp.columns:
-            neg |= tmp["testType"].astype(str).str.lower().str.contains("negative|negativo")
-        if "labels" in tmp.columns:
-            neg |= tmp["labels"].astype(str).str.lower().str.contains("negative|negativo")
-        s = tmp.groupby("month").apply(lambda d: pct(int(neg.loc[d.index].sum()), len(d))).reset_index(name="value")
-        return s
-
-    def monthly_series_bug_days():
-        if df_bug_f.empty and df_subbug_f.empty:
-            return pd.DataFrame(columns=["month","value"])
-        d = pd.concat([df_bug_f, df_subbug_f], ignore_index=True)
-        d["c"] = pd.to_datetime(d["created"], errors="coerce")
-        d["r"] = pd.to_datetime(d["resolutiondate"], errors="coerce")
-        d = d[d["c"].notna() & d["r"].notna()].copy()
-        if d.empty:
-            return pd.DataFrame(columns=["month","value"])
-        d["month"] = d["c"].dt.strftime("%Y-%m")
-        d["days"] = (d["r"] - d["c"]).dt.total_seconds() / 86400.0
-        s = d.groupby("month")["days"].mean().reset_index(name="value")
-        return s
-
-    SERIES_FUNCS = {
-        "coverage": monthly_series_coverage,
-        "test_avg": monthly_series_test_avg,
-        "auto_reg": monthly_series_auto_reg,
-        "auto_runs": monthly_series_auto_runs,
-        "test_reg": monthly_series_test_reg,
-        "negative": monthly_series_negative,
-        "bug_days": monthly_series_bug_days,
-    }
+    # ---- séries mensais: o mesmo rollup, agrupado por mês
+    monthly = kpi_cube.ratios(kpi_cube.rollup(cube, by=["month"], **recorte))
 
     sel_key = st.session_state["kpi_selected"]
     title = KPI_DEFS[sel_key]['title']
     st.markdown(f"#### {title}")
 
-    df_series = SERIES_FUNCS[sel_key]()
+    df_series = monthly[["month", sel_key]].dropna().rename(columns={sel_key: "value"})
     if df_series.empty:
         st.info("Sem dados suficientes para este KPI com os filtros atuais.")
         return
@@ -3,10 +3,11 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-from pathlib import Path
 from datetime import datetime, date, timedelta
 
-DATA = Path("config/data")
+from coeqa import manifest
+from coeqa.data import safe_read_csv, safe_read_parquet, read_cycle_partitions, date_range
+from extractor.common.classify import get_classifier   # regras compartilhadas com os extratores (src/extractor/common/classify.py)
 
 Z_CASES_COLS = [
     "key","name","status","automated","testType","labels","created",
@@ -17,24 +18,9 @@ Z_EXEC_COLS = [
     "executedOn","projectKey","issueKey","environment","wave"
 ]
 PROJ_COLS = ["id","key","name","projectTypeKey","lead"]
+CYCLE_COLS = ["cycleKey","name","projectKey","wave","partition"]   # índice zephyr_cycles_latest.csv
 
 # ----------------- utils -----------------
-def safe_read_csv(name: str, columns=None) -> pd.DataFrame:
-    p = DATA / name
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame(columns=columns or [])
-    try:
-        df = pd.read_csv(p)
-        if columns:
-            for c in columns:
-                if c not in df.columns:
-                    df[c] = pd.NA
-            keep = [c for c in columns if c in df.columns]
-            if keep: df = df[keep]
-        return df
-    except Exception:
-        return pd.DataFrame(columns=columns or [])
-
 def to_date(x):
     if isinstance(x, date) and not isinstance(x, datetime): return x
     try:
@@ -57,19 +43,6 @@ def caption_ts():
 def pct(a,b):
     return float(a)/float(b)*100 if b not in (0,None,0.0,np.nan) else 0.0
 
-def norm_exec_dates(df: pd.DataFrame, col="executedOn"):
-    if df.empty or col not in df.columns: return
-    dt = pd.to_datetime(df[col], errors="coerce")
-    df["executed_dt"]   = dt
-    df["executed_date"] = dt.dt.date
-    df["executed_month"]= dt.dt.strftime("%Y-%m")
-
-def label_auto(v):
-    s = str(v).lower()
-    if s in ["1","true","yes"]: return "Automated"
-    if s in ["0","false","no"]: return "Manual"
-    return "N/A"
-
 def map_status(s):
     s = str(s).lower()
     if "pass" in s or "ok" in s or "done" in s: return "Pass"
@@ -80,13 +53,6 @@ def map_status(s):
     if "cancel" in s:                             return "Canceled"
     return "Others"
 
-def detect_regression_row(row, fields=("testType","labels","name","key")):
-    """Heurística: considera regression se 'regress' aparecer em testType/labels/name/key."""
-    for f in fields:
-        if f in row and pd.notna(row[f]) and "regress" in str(row[f]).lower():
-            return True
-    return False
-
 # ----------------- página -----------------
 def pagina_dashboard_regression():
     try:
@@ -117,19 +83,34 @@ def pagina_dashboard_regression():
 
     # === Dados ===
     df_proj = safe_read_csv("jira_projetos_latest.csv", PROJ_COLS)
-    df_cases = safe_read_csv("zephyr_testcases_latest.csv", Z_CASES_COLS)
-    df_exec  = safe_read_csv("zephyr_executions_latest.csv", Z_EXEC_COLS)
-
-    # normaliza datas de execução
-    norm_exec_dates(df_exec)
+    df_cases = safe_read_parquet("zephyr_testcases",            Z_CASES_COLS)
+    df_cycles = safe_read_csv("zephyr_cycles_latest.csv", CYCLE_COLS)
+
+    # com o dataset por ciclo, Wave/Cycle escolhem as partições lidas;
+    # sem ele, lê a base inteira de execuções e filtra a wave em memória
+    if not df_cycles.empty:
+        cw1, cw2, _ = st.columns([0.26, 0.26, 0.48])
+        with cw1:
+            wave_opts = ["Todos"] + sorted(df_cycles["wave"].dropna().astype(str).unique().tolist())
+            sel_wave = st.selectbox("Wave", wave_opts, index=0, key="reg_wave")
+        cyc = df_cycles if sel_wave == "Todos" else df_cycles[df_cycles["wave"].astype(str) == sel_wave]
+        with cw2:
+            sel_cycle = st.selectbox("Cycle", ["Todos"] + sorted(cyc["cycleKey"].dropna().astype(str).tolist()), index=0, key="reg_cycle")
+        if sel_cycle != "Todos":
+            cyc = cyc[cyc["cycleKey"].astype(str) == sel_cycle]
+        df_exec = read_cycle_partitions(cyc, Z_EXEC_COLS)
+    else:
+        df_exec = safe_read_parquet("zephyr_executions",            Z_EXEC_COLS)
+    # executed_* (dt, date, month) já vêm derivados da ingestão
 
     # === Filtros topo ===
     # janela de datas baseada em execuções
-    if not df_exec.empty and "executed_date" in df_exec.columns:
-        pool = [to_date(x) for x in df_exec["executed_date"].dropna().tolist()]
-        min_raw, max_raw = (min(pool), max(pool)) if pool else (date.today(), date.today())
+    # sem partições de ciclo, os limites vêm do manifesto da extração (sem ler linhas)
+    bounds = manifest.date_bounds(["zephyr_executions"]) if df_cycles.empty else None
+    if bounds:
+        min_raw, max_raw = bounds
     else:
-        min_raw, max_raw = (date.today(), date.today())
+        min_raw, max_raw = date_range([df_exec], "executed") or (date.today(), date.today())
 
     min_d, max_d = to_date(min_raw), to_date(max_raw)
     if min_d == max_d:
@@ -171,22 +152,23 @@ def pagina_dashboard_regression():
         ))) if "environment" in df_exec.columns else ["Todos"]
         sel_env = st.selectbox("Environment", env_opts, index=0)
 
-        wave_opts = ["Todos"] + sorted(list(set(
-            df_exec.get("wave", pd.Series(dtype=str)).dropna().astype(str).tolist()
-        ))) if "wave" in df_exec.columns else ["Todos"]
-        sel_wave = st.selectbox("Wave", wave_opts, index=0)
+        if df_cycles.empty:
+            wave_opts = ["Todos"] + sorted(list(set(
+                df_exec.get("wave", pd.Series(dtype=str)).dropna().astype(str).tolist()
+            ))) if "wave" in df_exec.columns else ["Todos"]
+            sel_wave = st.selectbox("Wave", wave_opts, index=0)
 
     with ctop2:
         caption_ts()
 
     d_start, d_end = st.session_state["reg_periodo_master"]
 
-    # Detector de regressão (opções)
-    with st.expander("Configurar detecção de testes regressivos", expanded=False):
-        use_testtype = st.checkbox("Detectar por testType contém 'regress'", value=True)
-        use_labels   = st.checkbox("Detectar por labels contém 'regress'", value=True)
-        use_namekey  = st.checkbox("Detectar por nome/chave contém 'regress'", value=False)
-        st.caption("Marque as heurísticas que valem para identificar casos/execuções de regressão.")
+    # Detector de regressão: is_regression/is_automated já vêm das bases (coeqa.data),
+    # pelas regras de config/test_classification.yaml — as mesmas das demais páginas
+    with st.expander("Regras de detecção de testes regressivos", expanded=False):
+        for r in get_classifier().rules["is_regression"]:
+            st.caption(f"{r.column}: " + (f"contém /{r.regex.pattern}/" if r.regex is not None else ", ".join(sorted(r.values))))
+        st.caption("Edite config/test_classification.yaml para mudar as heurísticas.")
 
     # aplica filtros básicos
     def apply_basic_filters(df: pd.DataFrame) -> pd.DataFrame:
@@ -198,30 +180,17 @@ def pagina_dashboard_regression():
             out = out[out["projectKey"]==sel_domain]
         if sel_env != "Todos" and "environment" in out.columns:
             out = out[out["environment"].astype(str)==sel_env]
-        if sel_wave != "Todos" and "wave" in out.columns:
-            out = out[out["wave"].astype(str)==sel_wave]
+        if df_cycles.empty and sel_wave != "Todos" and "wave" in out.columns:
+            out = out[out["wave"].astype(str)==sel_wave]   # com partições, a wave já veio filtrada
         return out
 
     df_exec_f = apply_basic_filters(df_exec)
 
-    # marca regressivo
-    def mark_regression_df(df: pd.DataFrame) -> pd.DataFrame:
-        if df.empty: return df
-        df = df.copy()
-        fields = []
-        if use_testtype: fields += ["testType"]
-        if use_labels:   fields += ["labels"]
-        if use_namekey:  fields += ["name","key","testKey"]
-        if not fields:   fields = ["testType","labels","name","key","testKey"]
-        df["is_regression"] = df.apply(lambda r: detect_regression_row(r, fields=tuple(fields)), axis=1)
-        return df
-
-    df_exec_f = mark_regression_df(df_exec_f)
-    df_reg = df_exec_f[df_exec_f["is_regression"]] if "is_regression" in df_exec_f.columns else pd.DataFrame(columns=df_exec_f.columns)
+    df_reg = df_exec_f[df_exec_f["is_regression"]]
 
     # === KPIs ===
     total_reg = int(df_reg.shape[0])
-    auto_reg  = df_reg["automated"].apply(lambda v: label_auto(v)=="Automated").sum() if "automated" in df_reg.columns else 0
+    auto_reg  = int(df_reg["is_automated"].sum())
 
     status_map = df_reg["status"].apply(map_status) if "status" in df_reg.columns else pd.Series(dtype=str)
     n_pass = int((status_map=="Pass").sum())
@@ -3,10 +3,10 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-from pathlib import Path
 from datetime import datetime, date, timedelta
 
-DATA = Path("config/data")
+from coeqa import manifest
+from coeqa.data import safe_read_csv, safe_read_parquet, date_range
 
 # Bases Zephyr
 Z_CASES_COLS = [
@@ -20,20 +20,6 @@ Z_EXEC_COLS  = [
 PROJ_COLS = ["id","key","name","projectTypeKey","lead"]
 
 # =================== Utils ===================
-def safe_read_csv(name: str, columns=None) -> pd.DataFrame:
-    p = DATA / name
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame(columns=columns or [])
-    try:
-        df = pd.read_csv(p)
-        if columns:
-            for c in columns:
-                if c not in df.columns:
-                    df[c] = pd.NA
-        return df
-    except Exception:
-        return pd.DataFrame(columns=columns or [])
-
 def to_date(x):
     if isinstance(x, date) and not isinstance(x, datetime): return x
     try:
@@ -69,21 +55,6 @@ def map_status(s):
     if "cancel" in s: return "Canceled"
     return "Others"
 
-def norm_created(df: pd.DataFrame):
-    if df.empty or "created" not in df.columns: return
-    dt = pd.to_datetime(df["created"], errors="coerce")
-    df["created_dt"]   = dt
-    df["created_date"] = dt.dt.date
-    df["created_month"]= dt.dt.strftime("%Y-%m")
-
-def norm_executed(df: pd.DataFrame):
-    if df.empty or "executedOn" not in df.columns: return
-    dt = pd.to_datetime(df["executedOn"], errors="coerce")
-    df["executed_dt"]   = dt
-    df["executed_date"] = dt.dt.date
-    df["executed_month"]= dt.dt.strftime("%Y-%m")
-
-# =================== Página ===================
 def pagina_dashboard_roi():
     try:
         st.set_page_config(page_title="ROI da Qualidade", layout="wide")
@@ -113,19 +84,17 @@ def pagina_dashboard_roi():
 
     # --------- Dados ---------
     df_proj = safe_read_csv("jira_projetos_latest.csv", PROJ_COLS)
-    df_cases = safe_read_csv("zephyr_testcases_latest.csv", Z_CASES_COLS)
-    df_exec  = safe_read_csv("zephyr_executions_latest.csv", Z_EXEC_COLS)
-
-    norm_created(df_cases)
-    norm_executed(df_exec)
+    df_cases = safe_read_parquet("zephyr_testcases",            Z_CASES_COLS)
+    df_exec  = safe_read_parquet("zephyr_executions",            Z_EXEC_COLS)
+    # created_*/executed_* (dt, date, month) já vêm derivados da ingestão
 
     # --------- Filtros superiores ---------
     # Datas via execuções
-    if not df_exec.empty and "executed_date" in df_exec.columns:
-        pool = [to_date(x) for x in df_exec["executed_date"].dropna().tolist()]
-        min_raw, max_raw = (min(pool), max(pool)) if pool else (date.today(), date.today())
+    bounds = manifest.date_bounds(["zephyr_executions"])   # do manifesto da extração, sem ler linhas
+    if bounds:
+        min_raw, max_raw = bounds
     else:
-        min_raw, max_raw = (date.today(), date.today())
+        min_raw, max_raw = date_range([df_exec], "executed") or (date.today(), date.today())
 
     min_d, max_d = to_date(min_raw), to_date(max_raw)
     if min_d == max_d:
@@ -221,16 +190,15 @@ def pagina_dashboard_roi():
 
     e = f_exec(df_exec)
     if not e.empty:
-        # flags
+        # is_automated/is_regression já vêm das bases (regras de config/test_classification.yaml)
         e = e.copy()
-        e["auto_flag"] = e.apply(lambda r: ("autom" in f"{r.get('automated','')}{r.get('testType','')}{r.get('labels','')}".lower()) or (str(r.get("automated")).lower() in ["1","true","yes"]), axis=1)
         e["status_grp"] = e["status"].apply(map_status)
 
     # --------- Métricas de volume ---------
     total_exec     = int(e.shape[0])
-    auto_exec      = int(e["auto_flag"].sum()) if "auto_flag" in e.columns else 0
+    auto_exec      = int(e["is_automated"].sum()) if "is_automated" in e.columns else 0
     manual_exec    = max(total_exec - auto_exec, 0)
-    unique_auto_ts = e[e["auto_flag"]]["testKey"].nunique() if not e.empty and "testKey" in e.columns else 0
+    unique_auto_ts = e[e["is_automated"]]["testKey"].nunique() if not e.empty and "testKey" in e.columns else 0
 
     # --------- CUSTO: cenário 1 (sem automação) ---------
     custo_somente_manual = total_exec * custo_exec_manual
@@ -254,10 +222,7 @@ def pagina_dashboard_roi():
     # --------- Benefício de bugs pegos mais cedo ---------
     # Falhas detectadas nas execuções automatizadas com “perfil regressivo”
     if not e.empty:
-        e_reg = e[e["auto_flag"]].copy()
-        # aproxima regressivo por testType/labels/name
-        is_reg = e_reg.apply(lambda r: any("regress" in str(r.get(c,"")).lower() for c in ["testType","labels","executionKey","testKey","issueKey"]), axis=1)
-        e_reg = e_reg[is_reg] if isinstance(is_reg, pd.Series) else e_reg
+        e_reg = e[e["is_automated"] & e["is_regression"]]
         fails_reg = int(e_reg[e_reg["status_grp"]=="Fail"].shape[0]) if not e_reg.empty else 0
     else:
         fails_reg = 0
@@ -313,7 +278,7 @@ def pagina_dashboard_roi():
         # Para cada mês: estima custo sem automação (exec_total * custo_manual)
         # e custo com automação (manual_rest + manutenção + amortização pró-rata)
         d = e.copy()
-        d["kind"] = d["auto_flag"].map(lambda x: "auto" if x else "manual")
+        d["kind"] = d["is_automated"].map(lambda x: "auto" if x else "manual")
         grp = d.groupby(["executed_month","kind"]).size().unstack(fill_value=0)
         grp = grp.rename(columns={"auto":"auto", "manual":"manual"})
         grp["total"] = grp.sum(axis=1)
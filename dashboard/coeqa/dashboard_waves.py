@@ -3,40 +3,23 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-from pathlib import Path
 from datetime import datetime, date, timedelta
 
-DATA = Path("config/data")
+from coeqa import store
+from coeqa import manifest
+from coeqa.data import safe_read_csv, safe_read_parquet, read_cycle_partitions, derive, date_range
 
 ISSUE_COLS = ["key","summary","status","type","priority","created","resolutiondate","assignee","reporter","labels","components"]
 PROJ_COLS  = ["id","key","name","projectTypeKey","lead"]
 
 Z_CASES_COLS = ["key","name","status","automated","testType","labels","created","projectKey","environment","wave"]
-Z_EXEC_COLS  = ["executionKey","testKey","status","automated","testType","labels","executedOn","projectKey","issueKey","environment","wave"]
+Z_EXEC_COLS  = ["executionKey","testKey","status","automated","testType","labels","executedOn","projectKey","issueKey","environment","wave","cycleKey"]
+CYCLE_COLS   = ["cycleKey","name","projectKey","wave","partition"]   # índice zephyr_cycles_latest.csv
 
-# ============== helpers ==============
-def safe_read_csv(name: str, columns=None) -> pd.DataFrame:
-    p = DATA / name
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame(columns=columns or [])
-    try:
-        df = pd.read_csv(p)
-        if columns:
-            for c in columns:
-                if c not in df.columns:
-                    df[c] = pd.NA
-            keep = [c for c in columns if c in df.columns]
-            if keep:
-                df = df[keep]
-        return df
-    except Exception:
-        return pd.DataFrame(columns=columns or [])
-
-def key_project_prefix(key: str) -> str:
-    if isinstance(key, str) and "-" in key:
-        return key.split("-")[0]
-    return ""
+ISSUE_TABLES = {"story": "jira_issues_story", "epic": "jira_issues_epic",
+                "bug": "jira_issues_bug", "subbug": "jira_issues_subbug"}
 
+# ============== helpers ==============
 def to_date(x):
     if isinstance(x, date) and not isinstance(x, datetime): return x
     try:
@@ -53,26 +36,6 @@ def ensure_range_key(key: str, fallback: tuple[date, date]):
     else:
         st.session_state[key] = fallback
 
-def normalize_issue_dates(df: pd.DataFrame):
-    if df.empty: return
-    if "created" in df.columns:
-        cdt = pd.to_datetime(df["created"], errors="coerce")
-        df["created_dt"] = cdt
-        df["created_date"] = cdt.dt.date
-        df["created_month"] = cdt.dt.strftime("%Y-%m")
-    if "resolutiondate" in df.columns:
-        rdt = pd.to_datetime(df["resolutiondate"], errors="coerce")
-        df["resolved_dt"] = rdt
-        df["resolved_date"] = rdt.dt.date
-        df["resolved_month"] = rdt.dt.strftime("%Y-%m")
-
-def normalize_zephyr_dates(df: pd.DataFrame, col: str = "executedOn"):
-    if df.empty or col not in df.columns: return
-    dt = pd.to_datetime(df[col], errors="coerce")
-    df["executed_dt"] = dt
-    df["executed_date"] = dt.dt.date
-    df["executed_month"] = dt.dt.strftime("%Y-%m")
-
 def coalesce(a, b):
     return a if a else b
 
@@ -112,48 +75,71 @@ def pagina_dashboard_waves():
     st.markdown("### Wave")
 
     # ---------- Bases ----------
-    df_story  = safe_read_csv("jira_issues_story_latest.csv",  ISSUE_COLS)
-    df_epic   = safe_read_csv("jira_issues_epic_latest.csv",   ISSUE_COLS)
-    df_bug    = safe_read_csv("jira_issues_bug_latest.csv",    ISSUE_COLS)
-    df_subbug = safe_read_csv("jira_issues_subbug_latest.csv", ISSUE_COLS)
+    # com o banco analítico (config/data/coeqa.sqlite), issues/casos/execuções
+    # só são lidos depois dos filtros, já filtrados no banco; sem ele, carrega
+    # tudo e filtra em memória
+    use_db = store.has_tables(*ISSUE_TABLES.values(), "zephyr_testcases", "zephyr_executions")
     df_proj   = safe_read_csv("jira_projetos_latest.csv",      PROJ_COLS)
+    if use_db:
+        df_story, df_epic, df_bug, df_subbug = (pd.DataFrame(columns=ISSUE_COLS) for _ in range(4))
+        df_zc     = pd.DataFrame(columns=Z_CASES_COLS)
+    else:
+        df_story  = safe_read_parquet("jira_issues_story",             ISSUE_COLS)
+        df_epic   = safe_read_parquet("jira_issues_epic",              ISSUE_COLS)
+        df_bug    = safe_read_parquet("jira_issues_bug",               ISSUE_COLS)
+        df_subbug = safe_read_parquet("jira_issues_subbug",            ISSUE_COLS)
+        df_zc     = safe_read_parquet("zephyr_testcases",              Z_CASES_COLS)
+    df_cycles = safe_read_csv("zephyr_cycles_latest.csv",      CYCLE_COLS)
+
+    # com o dataset por ciclo, Wave/Cycle escolhem as partições lidas;
+    # sem ele, lê a base inteira de execuções e filtra a wave em memória
+    sel_wave = sel_cycle = "Todos"
+    if not df_cycles.empty:
+        cw1, cw2, _ = st.columns([0.26, 0.26, 0.48])
+        with cw1:
+            wave_opts = ["Todos"] + sorted(df_cycles["wave"].dropna().astype(str).unique().tolist())
+            sel_wave = st.selectbox("Wave", wave_opts, index=0, key="wave_wave")
+        cyc = df_cycles if sel_wave == "Todos" else df_cycles[df_cycles["wave"].astype(str) == sel_wave]
+        with cw2:
+            sel_cycle = st.selectbox("Cycle", ["Todos"] + sorted(cyc["cycleKey"].dropna().astype(str).tolist()), index=0, key="wave_cycle")
+        if sel_cycle != "Todos":
+            cyc = cyc[cyc["cycleKey"].astype(str) == sel_cycle]
+        df_ze = read_cycle_partitions(cyc, Z_EXEC_COLS)
+    elif use_db:
+        df_ze = pd.DataFrame(columns=Z_EXEC_COLS)
+    else:
+        df_ze = safe_read_parquet("zephyr_executions",             Z_EXEC_COLS)
+    ze_db = use_db and df_cycles.empty   # execuções também filtradas no banco
 
-    df_zc     = safe_read_csv("zephyr_testcases_latest.csv",   Z_CASES_COLS)
-    df_ze     = safe_read_csv("zephyr_executions_latest.csv",  Z_EXEC_COLS)
-
-    for d in (df_story, df_epic, df_bug, df_subbug):
-        if not d.empty:
-            if "projectKey" not in d.columns:
-                d["projectKey"] = d["key"].apply(key_project_prefix)
-            normalize_issue_dates(d)
-
-    if not df_zc.empty:
-        if "projectKey" not in df_zc.columns:
-            df_zc["projectKey"] = df_zc.get("key","").apply(key_project_prefix)
-        normalize_issue_dates(df_zc.rename(columns={"created":"_created"}))  # ignora datas se não quiser
-        if "created" in df_zc.columns:
-            dt = pd.to_datetime(df_zc["created"], errors="coerce")
-            df_zc["created_date"] = dt.dt.date
+    # projectKey/month/<prefixo>_date vêm da ingestão (ou do cache de coeqa.data);
+    # derive() só completa os resultados de consulta ao banco
+    def prep(df_story, df_epic, df_bug, df_subbug, df_zc, df_ze):
+        for d in (df_story, df_epic, df_bug, df_subbug):
+            derive(d, "jira_issues")
+        derive(df_zc, "zephyr_testcases")
+        derive(df_ze, "zephyr_executions")
 
-    if not df_ze.empty:
-        if "projectKey" not in df_ze.columns:
-            df_ze["projectKey"] = df_ze["issueKey"].apply(key_project_prefix)
-        normalize_zephyr_dates(df_ze, "executedOn")
 
     # ---------- Filtros superiores ----------
     # Datas de referência
-    exec_dates = df_ze["executed_date"].dropna().tolist() if "executed_date" in df_ze.columns else []
-    if exec_dates:
-        min_raw, max_raw = min(exec_dates), max(exec_dates)
+    # (manifesto da extração → banco → linhas carregadas); com partições de
+    # ciclo, a janela é a das execuções dos ciclos escolhidos
+    bounds = None
+    if df_cycles.empty:
+        bounds = manifest.date_bounds(["zephyr_executions"]) or manifest.date_bounds(ISSUE_TABLES.values())
+        if not bounds and ze_db:
+            bounds = (store.date_bounds(["zephyr_executions"], "executedOn")
+                      or store.date_bounds(ISSUE_TABLES.values(), "created"))
+    exec_bounds = date_range([df_ze], "executed") if not bounds else None
+    if bounds:
+        min_raw, max_raw = bounds
+    elif exec_bounds:
+        min_raw, max_raw = exec_bounds
+    elif use_db and (issue_bounds := store.date_bounds(ISSUE_TABLES.values(), "created")):
+        min_raw, max_raw = issue_bounds
     else:
-        pool = []
-        for d in (df_story, df_epic, df_bug, df_subbug):
-            if "created_date" in d.columns:
-                pool += d["created_date"].dropna().tolist()
-        if pool:
-            min_raw, max_raw = min(pool), max(pool)
-        else:
-            min_raw, max_raw = date.today(), date.today()
+        min_raw, max_raw = (date_range([df_story, df_epic, df_bug, df_subbug], "created")
+                            or (date.today(), date.today()))
 
     min_d, max_d = to_date(min_raw), to_date(max_raw)
     if min_d == max_d:
@@ -191,6 +177,8 @@ def pagina_dashboard_waves():
         # Domain
         if not df_proj.empty:
             projects = ["Todos"] + sorted(df_proj["key"].dropna().unique().tolist())
+        elif use_db:
+            projects = ["Todos"] + store.distinct([*ISSUE_TABLES.values(), "zephyr_executions", "zephyr_testcases"], "projectKey")
         else:
             pref = []
             for d in (df_story, df_epic, df_bug, df_subbug, df_ze, df_zc):
@@ -200,25 +188,26 @@ def pagina_dashboard_waves():
         sel_proj = st.selectbox("Domain", projects, index=0)
 
         # Environment (a partir de execuções/casos)
-        env_src = []
+        env_src = store.distinct(["zephyr_testcases"] + (["zephyr_executions"] if ze_db else []), "environment") if use_db else []
         if "environment" in df_ze.columns: env_src += df_ze["environment"].dropna().astype(str).tolist()
         if "environment" in df_zc.columns: env_src += df_zc["environment"].dropna().astype(str).tolist()
         env_opts = ["Todos"] + sorted(list(set(env_src))) if env_src else ["Todos"]
         sel_env = st.selectbox("Environment", env_opts, index=0)
 
         # Test type
-        tt_src = []
+        tt_src = store.distinct(["zephyr_testcases"] + (["zephyr_executions"] if ze_db else []), "testType") if use_db else []
         if "testType" in df_ze.columns: tt_src += df_ze["testType"].dropna().astype(str).tolist()
         if "testType" in df_zc.columns: tt_src += df_zc["testType"].dropna().astype(str).tolist()
         tt_opts = ["Todos"] + sorted(list(set(tt_src))) if tt_src else ["Todos"]
         sel_tt = st.selectbox("Test type", tt_opts, index=0)
 
-        # Wave
-        wave_src = []
-        if "wave" in df_ze.columns: wave_src += df_ze["wave"].dropna().astype(str).tolist()
-        if "wave" in df_zc.columns: wave_src += df_zc["wave"].dropna().astype(str).tolist()
-        wave_opts = ["Todos"] + sorted(list(set(wave_src))) if wave_src else ["Todos"]
-        sel_wave = st.selectbox("Wave", wave_opts, index=0)
+        # Wave (sem o dataset por ciclo; com ele, o filtro fica na linha de cima)
+        if df_cycles.empty:
+            wave_src = store.distinct(["zephyr_testcases", "zephyr_executions"], "wave") if use_db else []
+            if "wave" in df_ze.columns: wave_src += df_ze["wave"].dropna().astype(str).tolist()
+            if "wave" in df_zc.columns: wave_src += df_zc["wave"].dropna().astype(str).tolist()
+            wave_opts = ["Todos"] + sorted(list(set(wave_src))) if wave_src else ["Todos"]
+            sel_wave = st.selectbox("Wave", wave_opts, index=0)
 
     with ctop2:
         st.caption(datetime.now().strftime("Atualizado: %d/%m/%Y %H:%M"))
@@ -250,12 +239,25 @@ def pagina_dashboard_waves():
             out = out[out["wave"].astype(str) == sel_wave]
         return out
 
-    f_story  = f_env_tt_wave(f_proj(f_period_created(df_story)))
-    f_epic   = f_env_tt_wave(f_proj(f_period_created(df_epic)))
-    f_bug    = f_env_tt_wave(f_proj(f_period_created(df_bug)))
-    f_subbug = f_env_tt_wave(f_proj(f_period_created(df_subbug)))
-    f_ze     = f_env_tt_wave(f_proj(f_period_exec(df_ze)))
-    f_zc     = f_env_tt_wave(f_proj(f_period_created(df_zc)))
+    if use_db:
+        # Domain, período e Environment/Test type/Wave viram WHERE sobre colunas indexadas
+        equals = {"environment": sel_env, "testType": sel_tt, "wave": sel_wave}
+        def q(table, cols, date_col):
+            df = store.select(table, cols, project=sel_proj, date_col=date_col, start=d_start, end=d_end, equals=equals)
+            return df if df is not None else pd.DataFrame(columns=cols)
+        f_story, f_epic, f_bug, f_subbug = (q(ISSUE_TABLES[t], ISSUE_COLS, "created") for t in ("story","epic","bug","subbug"))
+        f_zc = q("zephyr_testcases", Z_CASES_COLS, "created")
+        f_ze = q("zephyr_executions", Z_EXEC_COLS, "executedOn") if ze_db else pd.DataFrame(columns=Z_EXEC_COLS)
+        prep(f_story, f_epic, f_bug, f_subbug, f_zc, f_ze)
+        if not ze_db:
+            f_ze = f_env_tt_wave(f_proj(f_period_exec(df_ze)))   # partições de ciclo: filtra em memória
+    else:
+        f_story  = f_env_tt_wave(f_proj(f_period_created(df_story)))
+        f_epic   = f_env_tt_wave(f_proj(f_period_created(df_epic)))
+        f_bug    = f_env_tt_wave(f_proj(f_period_created(df_bug)))
+        f_subbug = f_env_tt_wave(f_proj(f_period_created(df_subbug)))
+        f_ze     = f_env_tt_wave(f_proj(f_period_exec(df_ze)))
+        f_zc     = f_env_tt_wave(f_proj(f_period_created(df_zc)))
 
     # ---------- Métricas Top ----------
     total_func = len(pd.unique(f_zc["labels"])) if ("labels" in f_zc.columns and not f_zc.empty) else 0
@@ -310,7 +312,10 @@ def pagina_dashboard_waves():
     cA, cB, cC = st.columns([0.36, 0.32, 0.32])
 
     # Total cycles / total test
-    total_cycles = f_ze["executed_month"].nunique() if not f_ze.empty and "executed_month" in f_ze.columns else 0
+    if not f_ze.empty and f_ze["cycleKey"].notna().any():
+        total_cycles = f_ze["cycleKey"].nunique()
+    else:
+        total_cycles = f_ze["executed_month"].nunique() if not f_ze.empty and "executed_month" in f_ze.columns else 0
     total_test   = int(f_ze.shape[0]) if not f_ze.empty else 0
     with cA:
         kcol1, kcol2 = st.columns(2)
@@ -349,7 +354,13 @@ def pagina_dashboard_waves():
                 if "fail" in s or "error" in s: return "Fail"
                 if "cancel" in s:    return "Canceled"
                 return "Others"
-            d = f_ze["status"].apply(map_status).value_counts().reset_index()
+            # com o banco, conta por status lá (GROUP BY) e só mapeia os poucos status distintos
+            cnt = store.count_by("zephyr_executions", ["status"], project=sel_proj, date_col="executedOn",
+                                 start=d_start, end=d_end, equals=equals) if ze_db else None
+            if cnt is not None:
+                d = cnt.assign(status=cnt["status"].apply(map_status)).groupby("status", as_index=False)["n"].sum()
+            else:
+                d = f_ze["status"].apply(map_status).value_counts().reset_index()
             d.columns = ["status","qtd"]
             base = alt.Chart(d).encode(theta="qtd:Q", color=alt.Color("status:N", title=None))
             chart = base.mark_arc(innerRadius=60)
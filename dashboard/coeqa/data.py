@@ -0,0 +1,271 @@
+# coeqa/data.py
+"""
+Acesso a dados compartilhado pelas páginas do dashboard.
+
+Cada base é lida do disco uma vez por geração (manifest.json) e por versão do
+arquivo (inode/mtime/tamanho) e fica num cache único do processo, comum a
+todas as sessões: trocar de página, de card ou de filtro não relê nada.
+
+- safe_read_csv(): <name> (ex.: "zephyr_links_latest.csv") pelo arquivo da
+  geração publicada, só com as colunas pedidas;
+- safe_read_parquet(): config/data/parquet/<name>/ com poda de partições
+  (projectKey/month), caindo no CSV quando não há dataset tipado;
+- read_cycle_partitions(): execuções só dos ciclos pedidos (fluxo zephyr_cycles);
+- derive(): colunas derivadas (projectKey, month, <prefixo>_dt/_date/_month);
+- date_range(): limites de data dos frames já carregados, sem montar listas;
+- flags(): is_automated/is_regression/is_negative das bases Zephyr
+  (regras de config/test_classification.yaml, via extractor.common.classify).
+
+A cópia em cache é compartilhada e nunca é alterada: quem chama recebe uma
+cópia rasa, e com Copy-on-Write o pandas só duplica a coluna que a página
+modificar. Colunas de baixa cardinalidade (status, tipo, ambiente...) viram
+category já na leitura do CSV, como no Parquet.
+
+As derivadas vêm prontas do Parquet (src/extractor/common/columnar.py);
+derive() só calcula, de forma vetorizada, o que a fonte não trouxe (CSV,
+Parquet antigo, consulta ao banco), e dentro do cache isso é uma vez por
+geração. O mesmo vale para as flags de classificação: lidas as colunas das
+regras, as flags entram no frame em cache e as colunas extras saem. As
+execuções herdam as flags do seu test case (pelo testKey): testType/labels
+são atributos do test case.
+"""
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+import os
+
+import pandas as pd
+import streamlit as st
+
+from coeqa import manifest
+from coeqa.manifest import resolve
+from extractor.common import classify
+
+DATA = manifest.DATA
+PARQUET = DATA / "parquet"   # datasets tipados gravados pelos extratores
+
+DATA_CACHE_ENTRIES = int(os.getenv("DATA_CACHE_ENTRIES", "128"))   # bases (arquivo × colunas) mantidas em memória
+
+# mesmas colunas category de src/extractor/common/columnar.py (SCHEMAS), por família
+CATEGORIES = {
+    "jira_issues": ["status", "type", "priority"],
+    "jira_transitions": ["from", "to"],
+    "zephyr_testcases": ["status", "folder", "automated", "testType", "environment", "wave"],
+    "zephyr_executions": ["status", "automated", "environment", "wave", "cycleKey"],
+    "zephyr_links": ["linkType"],
+}
+
+# mesmas derivadas de columnar.SCHEMAS: chave do projectKey, coluna de `month`
+# e, por coluna de data, o prefixo de <prefixo>_dt/_date/_month
+DERIVED = {
+    "jira_issues": {"key": "key", "month": "created", "days": {"created": "created", "resolutiondate": "resolved"}},
+    "jira_transitions": {"key": "key", "month": "timestamp", "days": {}},
+    "zephyr_testcases": {"key": "key", "month": "created", "days": {"created": "created"}},
+    "zephyr_executions": {"key": "testKey", "month": "executedOn", "days": {"executedOn": "executed"}},
+}
+SEM_DATA = "none"   # partição `month` das linhas sem data
+
+CLASSIFIED = ("zephyr_testcases", "zephyr_executions")   # famílias com as flags de extractor.common.classify
+
+if int(pd.__version__.split(".")[0]) < 3:
+    # pandas 3 já é sempre Copy-on-Write; no 2.x é opt-in
+    pd.set_option("mode.copy_on_write", True)
+
+def family(name: str) -> Optional[str]:
+    """Família do dataset pelo nome ("jira_issues_bug_latest.csv" → "jira_issues")."""
+    if name.startswith("zephyr_cycles/"):
+        return "zephyr_executions"   # partições por ciclo são execuções
+    base = Path(name).name
+    for fam in sorted(CATEGORIES, key=len, reverse=True):
+        if base.startswith(fam):
+            return fam
+    return None
+
+def _derived_columns(fam: Optional[str], columns) -> list:
+    spec = DERIVED.get(fam)
+    if not spec:
+        return []
+    out = ["projectKey", "month"]
+    for col, prefix in spec["days"].items():
+        if not columns or col in columns:
+            out += [f"{prefix}_date", f"{prefix}_month"]
+    return out
+
+def derive(df: pd.DataFrame, fam: Optional[str]) -> pd.DataFrame:
+    """
+    Acrescenta (em df) as colunas derivadas da família, tudo vetorizado:
+    - projectKey: prefixo da chave ("ABC-12" → "ABC"), se a base não trouxe;
+    - <prefixo>_dt: a coluna de data como timestamp UTC;
+    - <prefixo>_date / <prefixo>_month: dia e AAAA-MM;
+    - month: AAAA-MM da coluna de data da família (NaN sem data).
+    O que já veio pronto da ingestão é só reaproveitado.
+    """
+    spec = DERIVED.get(fam)
+    if not spec:
+        return df
+    key = spec["key"]
+    if ("projectKey" not in df.columns or df["projectKey"].isna().all()) and key in df.columns:
+        df["projectKey"] = df[key].astype("string").str.extract(r"^([^-]+)-", expand=False).fillna("").astype(object)
+    for col, prefix in spec["days"].items():
+        if col not in df.columns:
+            continue
+        dt = df[col]
+        if not pd.api.types.is_datetime64_any_dtype(dt):
+            dt = pd.to_datetime(dt, errors="coerce", utc=True, format="ISO8601")
+        df[f"{prefix}_dt"] = dt
+        if f"{prefix}_date" not in df.columns or pd.api.types.is_string_dtype(df[f"{prefix}_date"]):
+            df[f"{prefix}_date"] = dt.dt.date
+        if f"{prefix}_month" not in df.columns:
+            df[f"{prefix}_month"] = dt.dt.strftime("%Y-%m")
+    month_col = spec["month"]
+    if "month" in df.columns:
+        m = df["month"].astype(object)
+        df["month"] = m.where(m != SEM_DATA)
+    elif month_col in spec["days"] and f"{spec['days'][month_col]}_month" in df.columns:
+        df["month"] = df[f"{spec['days'][month_col]}_month"]
+    elif month_col in df.columns:
+        df["month"] = pd.to_datetime(df[month_col], errors="coerce", utc=True, format="ISO8601").dt.strftime("%Y-%m")
+    return df
+
+def _rule_columns(fam: Optional[str]) -> list:
+    """Colunas de que as flags dependem: as das regras (test cases) ou o testKey (execuções)."""
+    if fam == "zephyr_executions":
+        return ["testKey"]
+    return classify.get_classifier().columns if fam in CLASSIFIED else []
+
+def _case_flags() -> pd.DataFrame:
+    """Flags de cada test case (índice = key), da base já em cache."""
+    return classify.case_flags(safe_read_parquet("zephyr_testcases", ["key"]))
+
+def _masks(df: pd.DataFrame, fam: Optional[str]) -> pd.DataFrame:
+    # as regras leem atributos do test case: a execução herda as flags dele pelo testKey
+    if fam == "zephyr_executions":
+        return classify.by_test(df, _case_flags())
+    return classify.get_classifier().masks(df)
+
+def flags(df: pd.DataFrame, fam: Optional[str]) -> pd.DataFrame:
+    """Acrescenta (em df) as flags de classificação, se a família as tem (consultas ao banco)."""
+    if fam in CLASSIFIED:
+        for flag, m in _masks(df, fam).items():
+            df[flag] = m
+    return df
+
+def date_range(frames: Iterable[pd.DataFrame], prefix: str) -> Optional[Tuple]:
+    """Menor e maior dia de <prefixo>_dt nos frames (limites dos widgets de data)."""
+    lo, hi = [], []
+    for df in frames:
+        col = f"{prefix}_dt"
+        if col in df.columns and df[col].notna().any():
+            lo.append(df[col].min())
+            hi.append(df[col].max())
+    if not lo:
+        return None
+    return min(lo).date(), max(hi).date()
+
+def _token(path: Path) -> Optional[Tuple]:
+    """Versão do arquivo/diretório: muda a cada publicação (os.replace troca o inode)."""
+    try:
+        s = path.stat()
+    except OSError:
+        return None
+    return (str(path), s.st_ino, s.st_mtime_ns, s.st_size, manifest.generation(), classify.version())
+
+def _ensure(df: pd.DataFrame, columns) -> pd.DataFrame:
+    if columns:
+        for c in columns:
+            if c not in df.columns:
+                df[c] = pd.NA
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+def _ensure_flagged(df: pd.DataFrame, columns, fam: Optional[str]) -> pd.DataFrame:
+    """_ensure, com as flags calculadas antes de as colunas das regras saírem."""
+    if fam not in CLASSIFIED:
+        return _ensure(df, columns)
+    return pd.concat([_ensure(df, columns), _masks(df, fam)], axis=1)
+
+@st.cache_resource(max_entries=DATA_CACHE_ENTRIES, show_spinner=False)
+def _load_csv(name: str, columns: Optional[Tuple[str, ...]], token) -> pd.DataFrame:
+    p = resolve(name)
+    fam = family(name)
+    empty = flags(pd.DataFrame(columns=list(columns or [])), fam)
+    if token is None or p.stat().st_size == 0:
+        return empty
+    try:
+        # só as colunas pedidas (e as das regras de classificação) trafegam do disco
+        # (as bases seguem config/extraction_profiles.yaml)
+        wanted = set(columns) | set(_rule_columns(fam)) if columns else None
+        df = pd.read_csv(p, usecols=(lambda c: c in wanted) if wanted else None)
+        for c in CATEGORIES.get(fam, []):
+            if c in df.columns:
+                df[c] = df[c].astype("category")
+        return derive(_ensure_flagged(df, columns, fam), fam)
+    except Exception:
+        return empty
+
+@st.cache_resource(max_entries=DATA_CACHE_ENTRIES, show_spinner=False)
+def _load_parquet(name: str, path: str, columns: Optional[Tuple[str, ...]], projects: Optional[Tuple[str, ...]],
+                  months: Optional[Tuple[str, ...]], token) -> Optional[pd.DataFrame]:
+    try:
+        import pyarrow.dataset as ds
+        dset = ds.dataset(path, format="parquet", partitioning="hive")
+        expr = None
+        for col, values in (("projectKey", projects), ("month", months)):
+            if values:
+                cond = ds.field(col).isin(list(values))
+                expr = cond if expr is None else expr & cond
+        fam = family(name)
+        cols = [c for c in columns if c in dset.schema.names] if columns else None
+        extra = [c for c in _derived_columns(fam, columns) if c in dset.schema.names and c not in (cols or [])]
+        rules = [c for c in _rule_columns(fam) if c in dset.schema.names and c not in (cols or []) + extra]
+        df = dset.to_table(columns=cols + extra + rules if cols is not None else None, filter=expr).to_pandas()
+        for c in ("projectKey", "month"):   # partições chegam como dicionário em pyarrow/pandas antigos
+            if c in df.columns and isinstance(df[c].dtype, pd.CategoricalDtype):
+                df[c] = df[c].astype(object)
+        derived = df[extra] if extra else None
+        df = _ensure_flagged(df, columns, fam)
+        if derived is not None:
+            df = pd.concat([df, derived], axis=1)
+        return derive(df, fam)
+    except Exception:
+        return None
+
+def _tuple(values: Optional[Iterable]) -> Optional[Tuple]:
+    return tuple(values) if values else None
+
+def safe_read_csv(name: str, columns=None) -> pd.DataFrame:
+    """
+    Lê CSV com segurança:
+    - se não existir ou tiver 0 bytes, retorna DF vazio com colunas esperadas
+    - se existir mas faltar alguma coluna, cria a coluna vazia
+    - se der erro de parsing, retorna DF vazio com colunas esperadas
+    """
+    df = _load_csv(name, _tuple(columns), _token(resolve(name)))
+    return df.copy(deep=False)
+
+def safe_read_parquet(name: str, columns=None, projects=None, months=None) -> pd.DataFrame:
+    """
+    Contraparte tipada de safe_read_csv: lê config/data/parquet/<name>/
+    (particionado por projectKey/month) só com as colunas e partições pedidas;
+    datas já chegam como timestamp e status/tipo/prioridade como category.
+    Sem o dataset (extração antiga ou pyarrow ausente), cai no <name>_latest.csv.
+    <name> é um symlink para a versão publicada (columnar.write_parquet):
+    resolvido uma vez, a leitura inteira fica nessa versão mesmo que o
+    extrator troque o link no meio.
+    """
+    path = (PARQUET / name).resolve()
+    token = _token(path)
+    df = None
+    if token is not None:
+        df = _load_parquet(name, str(path), _tuple(columns), _tuple(sorted(projects or [])),
+                           _tuple(sorted(months or [])), token)
+    if df is None:
+        return safe_read_csv(f"{name}_latest.csv", columns)
+    return df.copy(deep=False)
+
+def read_cycle_partitions(df_cycles: pd.DataFrame, columns=None) -> pd.DataFrame:
+    """Execuções só dos ciclos de df_cycles: uma partição por ciclo (fluxo zephyr_cycles)."""
+    parts = [safe_read_csv(p, columns) for p in df_cycles["partition"].dropna().unique()]
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return flags(pd.DataFrame(columns=columns or []), "zephyr_executions")
+    return pd.concat(parts, ignore_index=True)
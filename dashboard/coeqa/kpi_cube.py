@@ -0,0 +1,84 @@
+# coeqa/kpi_cube.py
+"""
+Cubo de KPIs (config/data/kpi_cube_latest.csv), materializado pelos
+extratores ao fim de cada extração (src/extractor/common/cube.py):
+projeto × mês × ambiente × wave, com o numerador e o denominador de cada KPI.
+
+- load(): o cubo (lido uma vez por geração, via coeqa.data);
+- rollup(): soma as células do recorte (Domain/Environment/Wave), por `by`;
+- ratios(): os KPIs de cada linha somada — qualquer recorte sai das somas,
+  sem voltar às bases.
+Medidas de issues (cobertura, bugs) têm ambiente/wave "*" e entram em
+qualquer filtro de ambiente/wave. Sem o cubo (extração anterior a ele),
+from_bases() roda o mesmo build_kpi_cube do extrator sobre as bases 'latest'.
+"""
+from typing import Iterable
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from coeqa import manifest
+from coeqa.data import safe_read_csv
+from extractor.common import classify
+from extractor.common.columnar import SEM_DATA   # mês das linhas sem data
+from extractor.common.cube import DIMS, MEASURES, NA_DIM, build_kpi_cube
+
+ALL = "Todos"
+
+# KPI → (numerador, denominador, fator)
+KPIS = {
+    "coverage":     ("issues_covered", "issues",        100.0),
+    "test_avg":     ("runs_linked",    "issues_run",    1.0),
+    "created_auto": ("cases_auto",     "cases",         100.0),
+    "auto_runs":    ("runs_auto",      "runs",          100.0),
+    "auto_reg":     ("runs_reg_auto",  "runs_reg",      100.0),
+    "test_reg":     ("runs_reg",       "runs",          100.0),
+    "negative":     ("runs_neg",       "runs",          100.0),
+    "bug_days":     ("bug_days",       "bugs_resolved", 1.0),
+}
+
+def load() -> pd.DataFrame:
+    """kpi_cube_latest.csv da geração publicada (vazio se a extração não o gerou)."""
+    cube = safe_read_csv("kpi_cube_latest.csv", DIMS + MEASURES)
+    cube[["environment", "wave"]] = cube[["environment", "wave"]].fillna("").astype(str)
+    cube[MEASURES] = cube[MEASURES].fillna(0)
+    return cube
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _build(token) -> pd.DataFrame:
+    cube = build_kpi_cube(manifest.DATA)
+    cube[["environment", "wave"]] = cube[["environment", "wave"]].astype("string").fillna("").astype(str)
+    return cube
+
+def from_bases() -> pd.DataFrame:
+    """Cubo montado das bases (fallback sem kpi_cube_latest.csv), uma vez por geração e versão das regras."""
+    return _build((manifest.generation(), classify.version())).copy(deep=False)
+
+def rollup(cube: pd.DataFrame, by: Iterable[str] = (), project=None, environment=None, wave=None) -> pd.DataFrame:
+    """Somas das medidas no recorte; com `by`, uma linha por grupo (mês sem data fica de fora)."""
+    by = list(by)
+    mask = pd.Series(True, index=cube.index)
+    if project not in (None, ALL):
+        mask &= cube["projectKey"] == project
+    for col, value in (("environment", environment), ("wave", wave)):
+        if value not in (None, ALL):
+            mask &= cube[col].isin([value, NA_DIM])
+    if "month" in by:
+        mask &= cube["month"] != SEM_DATA
+    c = cube[mask]
+    if not by:
+        return c[MEASURES].sum().to_frame().T
+    return c.groupby(by)[MEASURES].sum().reset_index()
+
+def ratios(sums: pd.DataFrame) -> pd.DataFrame:
+    """
+    KPIs (KPIS) das somas, vetorizado; NaN onde o denominador é 0.
+    A coluna bug_days passa de soma de dias a média por bug resolvido.
+    """
+    out = sums.copy()
+    for kpi, (num, den, factor) in KPIS.items():
+        d = out[den].to_numpy(dtype=float)
+        n = out[num].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[kpi] = np.where(d > 0, n / d * factor, np.nan)
+    return out
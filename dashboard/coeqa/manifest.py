@@ -0,0 +1,58 @@
+# coeqa/manifest.py
+"""
+Manifesto das extrações (config/data/manifest.json), publicado de uma vez
+pelos extratores ao fim de cada extração (src/extractor/common/generation.py).
+
+- generation(): id da última geração — chave de cache dos dados das páginas;
+- resolve(): "<dataset>_latest.csv" → arquivo imutável da geração do dataset
+  (o extrator pode estar reescrevendo o 'latest' enquanto a página lê);
+- date_bounds(): limites dos widgets de data sem ler nenhuma linha.
+Sem manifesto (extrações antigas), tudo cai no comportamento anterior.
+"""
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+import json
+
+DATA = Path("config/data")
+MANIFEST = DATA / "manifest.json"
+
+_cache = {"mtime": None, "data": {}}
+
+def load_manifest() -> dict:
+    """Manifesto atual; relido só quando o arquivo muda (os.replace troca o mtime)."""
+    try:
+        mtime = MANIFEST.stat().st_mtime_ns
+    except OSError:
+        return {}
+    if _cache["mtime"] != mtime:
+        try:
+            with open(MANIFEST, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return _cache["data"]
+        _cache.update(mtime=mtime, data=data if isinstance(data, dict) else {})
+    return _cache["data"]
+
+def generation() -> Optional[str]:
+    return load_manifest().get("generation")
+
+def dataset(name: str) -> dict:
+    return (load_manifest().get("datasets") or {}).get(name) or {}
+
+def resolve(name: str) -> Path:
+    """Caminho de leitura de `name` (ex.: "zephyr_links_latest.csv")."""
+    if name.endswith("_latest.csv"):
+        entry = dataset(name[:-len("_latest.csv")])
+        if entry.get("file") and (DATA / entry["file"]).exists():
+            return DATA / entry["file"]
+    return DATA / name
+
+def date_bounds(names: Iterable[str]) -> Optional[Tuple[date, date]]:
+    """Menor min_date e maior max_date dos datasets (datas em UTC)."""
+    entries = [dataset(n) for n in names]
+    lo = [e["min_date"][:10] for e in entries if e.get("min_date")]
+    hi = [e["max_date"][:10] for e in entries if e.get("max_date")]
+    if not lo or not hi:
+        return None
+    return date.fromisoformat(min(lo)), date.fromisoformat(max(hi))
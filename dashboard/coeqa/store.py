@@ -0,0 +1,136 @@
+# coeqa/store.py
+"""
+Consulta ao banco analítico local (config/data/coeqa.sqlite), populado pelos
+extratores junto com o Parquet (src/extractor/common/store.py).
+
+Os filtros das páginas — Domain (projectKey), período (created/executedOn) e
+Environment/Test type/Wave — viram WHERE sobre colunas indexadas, e contagens
+viram GROUP BY no SQLite: uma interação custa uma consulta indexada em vez
+de varrer o DataFrame inteiro.
+
+"Todos" (ou None) em qualquer filtro = sem filtro. Sem o banco ou sem a
+tabela, as funções devolvem None e a página segue pelo caminho em memória.
+"""
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import sqlite3
+
+import pandas as pd
+
+DB = Path(os.getenv("DATA_STORE_PATH", "config/data/coeqa.sqlite"))
+ALL = "Todos"
+
+def _connect() -> Optional[sqlite3.Connection]:
+    if not DB.exists():
+        return None
+    try:
+        return sqlite3.connect(f"file:{DB.as_posix()}?mode=ro", uri=True, timeout=10)
+    except sqlite3.Error:
+        return None
+
+def _columns(con: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in con.execute(f'PRAGMA table_info("{table}")')]
+
+def has_tables(*tables: str) -> bool:
+    con = _connect()
+    if con is None:
+        return False
+    try:
+        return all(_columns(con, t) for t in tables)
+    finally:
+        con.close()
+
+def _where(cols: List[str], project=None, date_col: Optional[str] = None, start: Optional[date] = None,
+           end: Optional[date] = None, equals: Optional[Dict[str, object]] = None) -> Tuple[str, list]:
+    conds, params = [], []
+    if project not in (None, ALL) and "projectKey" in cols:
+        conds.append('"projectKey" = ?'); params.append(project)
+    if date_col and date_col in cols:
+        # datas gravadas em ISO/UTC: comparar texto é comparar datas
+        if start is not None:
+            conds.append(f'"{date_col}" >= ?'); params.append(start.isoformat())
+        if end is not None:
+            conds.append(f'"{date_col}" < ?'); params.append((end + timedelta(days=1)).isoformat())
+    for col, value in (equals or {}).items():
+        if value not in (None, ALL) and col in cols:
+            conds.append(f'"{col}" = ?'); params.append(str(value))
+    return (" WHERE " + " AND ".join(conds)) if conds else "", params
+
+def select(table: str, columns: Optional[List[str]] = None, **filters) -> Optional[pd.DataFrame]:
+    """Linhas de `table` já filtradas no banco; só as colunas pedidas (as ausentes vêm vazias)."""
+    con = _connect()
+    if con is None:
+        return None
+    try:
+        cols = _columns(con, table)
+        if not cols:
+            return None
+        wanted = [c for c in (columns or cols) if c in cols]
+        where, params = _where(cols, **filters)
+        sel = ", ".join(f'"{c}"' for c in wanted) or "*"
+        df = pd.read_sql_query(f'SELECT {sel} FROM "{table}"{where}', con, params=params)
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        return None
+    finally:
+        con.close()
+    for c in columns or []:
+        if c not in df.columns:
+            df[c] = pd.NA
+    return df[columns] if columns else df
+
+def count_by(table: str, by: Iterable[str], **filters) -> Optional[pd.DataFrame]:
+    """GROUP BY `by` com as mesmas regras de filtro de select(); colunas `by` + "n"."""
+    by = list(by)
+    con = _connect()
+    if con is None:
+        return None
+    try:
+        cols = _columns(con, table)
+        if not cols or any(c not in cols for c in by):
+            return None
+        where, params = _where(cols, **filters)
+        keys = ", ".join(f'"{c}"' for c in by)
+        return pd.read_sql_query(f'SELECT {keys}, COUNT(*) AS n FROM "{table}"{where} GROUP BY {keys}', con, params=params)
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        return None
+    finally:
+        con.close()
+
+def date_bounds(tables: Iterable[str], date_col: str) -> Optional[Tuple[date, date]]:
+    """Menor e maior data de `date_col` nas tabelas (MIN/MAX pelo índice, sem ler linhas)."""
+    con = _connect()
+    if con is None:
+        return None
+    lo, hi = [], []
+    try:
+        for t in tables:
+            if date_col not in _columns(con, t):
+                continue
+            mn, mx = con.execute(f'SELECT MIN("{date_col}"), MAX("{date_col}") FROM "{t}"').fetchone()
+            if mn: lo.append(mn[:10])
+            if mx: hi.append(mx[:10])
+    except sqlite3.Error:
+        return None
+    finally:
+        con.close()
+    if not lo or not hi:
+        return None
+    return date.fromisoformat(min(lo)), date.fromisoformat(max(hi))
+
+def distinct(tables: Iterable[str], col: str) -> List[str]:
+    """Valores distintos de `col` nas tabelas que a têm (opções dos selectbox)."""
+    con = _connect()
+    if con is None:
+        return []
+    out = set()
+    try:
+        for t in tables:
+            if col in _columns(con, t):
+                out.update(str(r[0]) for r in con.execute(f'SELECT DISTINCT "{col}" FROM "{t}" WHERE "{col}" IS NOT NULL'))
+    except sqlite3.Error:
+        return []
+    finally:
+        con.close()
+    return sorted(out)
@@ -0,0 +1,115 @@
+# extractor/common/checkpoint.py
+from typing import Dict, Any, Iterable, List, Optional
+from pathlib import Path
+import csv
+import hashlib
+import json
+import os
+import re
+
+class PageCheckpoint:
+    """
+    Gravação retomável de uma listagem paginada (Jira nextPageToken, Zephyr startAt).
+    Mesma interface do CsvStreamWriter (path, rows, write_rows, close, abort), mais:
+    - as linhas vão em append para <state_dir>/<name>.csv; commit(cursor) fecha
+      a página: flush + fsync e, só depois, o estado <name>.json (cursor da
+      próxima página, páginas/linhas já gravadas, tamanho do arquivo, `meta`);
+    - se a extração cair no meio (restart do container, rajada de 5xx), arquivo
+      e estado ficam; a próxima tentativa com o mesmo `name` e a mesma
+      `fingerprint` (jql/params/colunas) trunca o arquivo no último commit —
+      descartando página gravada pela metade — e segue de `cursor`;
+    - close() (fim normal) move o arquivo para `path` (os.replace) e apaga o estado.
+    Fingerprint diferente (jql, perfil ou watermark mudou) → recomeça do zero.
+    """
+    def __init__(self, path: Path | str, columns: List[str], name: str, state_dir: Path | str, fingerprint: Dict[str, Any]):
+        self.path = Path(path)
+        self.columns = list(columns)
+        state_dir = Path(state_dir)
+        state_dir.mkdir(parents=True, exist_ok=True)
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        self._part = state_dir / f"{safe}.csv"
+        self._state = state_dir / f"{safe}.json"
+        self.fingerprint = hashlib.sha256(
+            json.dumps({"columns": self.columns, **fingerprint}, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+        state = self._load()
+        self.resumed = state is not None
+        self.cursor: Any = state["cursor"] if state else None
+        self.pages: int = state["pages"] if state else 0
+        self.rows: int = state["rows"] if state else 0
+        self.meta: Dict[str, Any] = state.get("meta") or {} if state else {}
+        if state:
+            with open(self._part, "r+b") as fh:
+                fh.truncate(state["bytes"])
+            self._fh = open(self._part, "a", encoding="utf-8", newline="")
+            self._writer = csv.DictWriter(self._fh, fieldnames=self.columns, extrasaction="ignore")
+        else:
+            self._fh = open(self._part, "w", encoding="utf-8", newline="")
+            self._writer = csv.DictWriter(self._fh, fieldnames=self.columns, extrasaction="ignore")
+            self._writer.writeheader()
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._state, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("fingerprint") == self.fingerprint and self._part.stat().st_size >= int(state["bytes"]):
+                return state
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        # estado ausente, corrompido ou de outra busca: recomeça
+        for p in (self._state, self._part):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+        return None
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        n = 0
+        for row in rows:
+            self._writer.writerow(row)
+            n += 1
+        self.rows += n
+        return n
+
+    def commit(self, cursor: Any, meta: Optional[Dict[str, Any]] = None) -> None:
+        """Página gravada em disco; a próxima tentativa começa de `cursor`."""
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self.cursor = cursor
+        self.pages += 1
+        if meta:
+            self.meta.update(meta)
+        state = {"fingerprint": self.fingerprint, "cursor": cursor, "pages": self.pages,
+                 "rows": self.rows, "bytes": self._fh.tell(), "meta": self.meta}
+        tmp = self._state.with_name(self._state.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._state)
+
+    def close(self) -> None:
+        if self._fh.closed:
+            return
+        self._fh.close()
+        os.replace(self._part, self.path)
+        try:
+            os.remove(self._state)
+        except FileNotFoundError:
+            pass
+
+    def abort(self) -> None:
+        """Falhou: guarda arquivo e estado para a próxima tentativa retomar."""
+        if not self._fh.closed:
+            self._fh.close()
+
+    def __enter__(self) -> "PageCheckpoint":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
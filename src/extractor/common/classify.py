@@ -0,0 +1,128 @@
+# extractor/common/classify.py
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import yaml
+
+# ====== Tunáveis por ENV ======
+TEST_CLASSIFICATION = os.getenv("TEST_CLASSIFICATION", "config/test_classification.yaml")
+
+# Regras embutidas: usadas quando o YAML não existe ou não traz a flag.
+# Mesmo formato do YAML (ver config/test_classification.yaml).
+DEFAULT_RULES: Dict[str, List[Dict[str, Any]]] = {
+    "is_automated": [
+        {"column": "automated", "values": ["1", "true", "yes"]},
+        {"column": "testType", "pattern": "autom"},
+        {"column": "labels", "pattern": "autom"},
+    ],
+    "is_regression": [
+        {"column": "testType", "pattern": "regress"},
+        {"column": "labels", "pattern": "regress"},
+    ],
+    "is_negative": [
+        {"column": "testType", "pattern": "negative|negativo"},
+        {"column": "labels", "pattern": "negative|negativo"},
+    ],
+}
+FLAGS = list(DEFAULT_RULES)
+
+
+class Rule:
+    """
+    Regra de uma flag sobre uma coluna:
+      values  → o valor (minúsculo, sem espaços nas pontas) está na lista
+      pattern → a regex casa em algum ponto do texto (sem diferenciar caixa)
+    Cada valor distinto da coluna é avaliado uma vez (factorize) e o
+    resultado volta para as linhas pelos códigos — vetorizado, sem apply.
+    """
+    def __init__(self, spec: Dict[str, Any]):
+        self.column: str = spec["column"]
+        self.values = {str(v).strip().lower() for v in spec.get("values") or []}
+        self.regex = re.compile(spec["pattern"], re.IGNORECASE) if spec.get("pattern") else None
+
+    def _hits(self, uniques: pd.Series) -> np.ndarray:
+        txt = uniques.astype("string")
+        hit = np.zeros(len(txt), dtype=bool)
+        if self.values:
+            hit |= txt.str.strip().str.lower().isin(self.values).fillna(False).to_numpy(dtype=bool)
+        if self.regex is not None:
+            hit |= txt.str.contains(self.regex, na=False).to_numpy(dtype=bool)
+        return hit
+
+    def mask(self, s: pd.Series) -> np.ndarray:
+        codes, uniques = pd.factorize(s)
+        # código -1 (vazio) cai no False do fim
+        return np.append(self._hits(pd.Series(uniques)), False)[codes]
+
+
+class Classifier:
+    """Flags (is_automated, is_regression, is_negative...): OU das regras de cada uma."""
+    def __init__(self, spec: Dict[str, List[Dict[str, Any]]]):
+        self.rules: Dict[str, List[Rule]] = {flag: [Rule(r) for r in rules or []] for flag, rules in spec.items()}
+        self.flags: List[str] = list(self.rules)
+        self.columns: List[str] = sorted({r.column for rules in self.rules.values() for r in rules})
+
+    def masks(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Uma coluna bool por flag; regra de coluna ausente não marca nada."""
+        out = {}
+        for flag, rules in self.rules.items():
+            m = np.zeros(len(df), dtype=bool)
+            for r in rules:
+                if r.column in df.columns:
+                    m |= r.mask(df[r.column])
+            out[flag] = m
+        return pd.DataFrame(out, index=df.index)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Acrescenta (em df) as colunas de flag."""
+        for flag, m in self.masks(df).items():
+            df[flag] = m
+        return df
+
+
+def load_classifier(path: Path | str | None = None) -> Classifier:
+    """Regras embutidas + as do YAML (a flag do YAML substitui a embutida inteira)."""
+    spec = dict(DEFAULT_RULES)
+    p = Path(path or TEST_CLASSIFICATION)
+    if p.exists():
+        with open(p, "r", encoding="utf-8") as f:
+            spec.update((yaml.safe_load(f) or {}).get("flags") or {})
+    return Classifier(spec)
+
+_CACHE: Dict[str, Any] = {"mtime": None, "classifier": None}
+
+def version(path: Path | str | None = None) -> Optional[int]:
+    """mtime do YAML de regras (None sem o arquivo); o dashboard o usa na chave de cache das bases."""
+    try:
+        return Path(path or TEST_CLASSIFICATION).stat().st_mtime_ns
+    except OSError:
+        return None
+
+def get_classifier() -> Classifier:
+    """Classificador do processo (extratores e dashboard); recompilado só quando o YAML muda."""
+    mtime = version()
+    if _CACHE["classifier"] is None or _CACHE["mtime"] != mtime:
+        _CACHE.update(mtime=mtime, classifier=load_classifier())
+    return _CACHE["classifier"]
+
+# As regras leem atributos do test case (testType, labels, automated...), que
+# as execuções não trazem: a execução herda as flags do seu test case pelo testKey.
+
+def case_flags(cases: pd.DataFrame, key: str = "key") -> pd.DataFrame:
+    """Flags por test case (índice = `key`); usa as já calculadas em `cases`, se houver."""
+    clf = get_classifier()
+    flags = cases[clf.flags] if set(clf.flags) <= set(cases.columns) else clf.masks(cases)
+    flags = flags.set_axis(cases[key].to_numpy()) if key in cases.columns else flags.iloc[0:0]
+    return flags[flags.index.notna() & ~flags.index.duplicated(keep="last")]
+
+def by_test(runs: pd.DataFrame, flags: pd.DataFrame, key: str = "testKey") -> pd.DataFrame:
+    """Flags das execuções: as do test case de cada uma (test case fora da base → False)."""
+    names = get_classifier().flags
+    if key not in runs.columns or flags.empty:
+        return pd.DataFrame(False, index=runs.index, columns=names)
+    hit = flags.reindex(columns=names, fill_value=False).reindex(runs[key].to_numpy())
+    return pd.DataFrame(hit.fillna(False).to_numpy(dtype=bool), index=runs.index, columns=names)
@@ -0,0 +1,178 @@
+# extractor/common/columnar.py
+from typing import Dict, Any, Optional
+from pathlib import Path
+import os
+import shutil
+import uuid
+
+import pandas as pd
+
+from .snapshots import DATA_SNAPSHOTS, snapshot
+
+# ====== Tunáveis por ENV ======
+DATA_PARQUET = os.getenv("DATA_PARQUET", "1") not in ("0", "false", "no")          # grava config/data/parquet/
+DATA_EXPORT_CSV = os.getenv("DATA_EXPORT_CSV", "1") not in ("0", "false", "no")    # mantém os CSVs com timestamp (sem snapshots)
+PARQUET_CHUNK_ROWS = int(os.getenv("PARQUET_CHUNK_ROWS", "200000"))                 # linhas por lote na conversão
+
+PARQUET_DIR = "parquet"   # <data_dir>/parquet/<dataset>/projectKey=X/month=YYYY-MM/*.parquet
+PARTITION_COLS = ["projectKey", "month"]
+SEM_DATA = "none"         # partição das linhas sem data
+
+# Tipagem por família de dataset: datas viram timestamp (UTC), colunas de
+# baixa cardinalidade viram category (dicionário no Parquet), e `month`
+# (partição) sai da coluna de data indicada. Em `days`, coluna de data →
+# prefixo das derivadas <prefixo>_date (dia) e <prefixo>_month (AAAA-MM),
+# calculadas aqui uma vez em vez de a cada render dos dashboards.
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "jira_issues": {
+        "dates": ["created", "updated", "resolutiondate"],
+        "categories": ["status", "type", "priority"],
+        "month": "created",
+        "days": {"created": "created", "resolutiondate": "resolved"},
+        "key": "key",
+    },
+    "jira_transitions": {
+        "dates": ["timestamp"],
+        "categories": ["from", "to"],
+        "month": "timestamp",
+        "days": {},
+        "key": "key",
+    },
+    "zephyr_testcases": {
+        "dates": ["created"],
+        "categories": ["status", "folder", "automated", "testType", "environment", "wave"],
+        "month": "created",
+        "days": {"created": "created"},
+        "key": "key",
+    },
+    "zephyr_executions": {
+        "dates": ["executedOn"],
+        "categories": ["status", "automated", "environment", "wave", "cycleKey"],
+        "month": "executedOn",
+        "days": {"executedOn": "executed"},
+        "key": "testKey",
+    },
+    "zephyr_links": {
+        "dates": [],
+        "categories": ["linkType"],
+        "month": None,
+        "days": {},
+        "key": "issueKey",
+    },
+}
+
+def to_typed(df: pd.DataFrame, family: str) -> pd.DataFrame:
+    """Aplica a tipagem da família (datas, categorias) e monta as colunas derivadas e de partição."""
+    schema = SCHEMAS[family]
+    df = df.copy()
+    for col in schema["dates"]:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce", utc=True, format="ISO8601")
+    for col in schema["categories"]:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col, prefix in schema["days"].items():
+        if col in df.columns:
+            df[f"{prefix}_date"] = df[col].dt.date
+            df[f"{prefix}_month"] = df[col].dt.strftime("%Y-%m")
+    if "projectKey" not in df.columns or df["projectKey"].isna().all():
+        key = df[schema["key"]] if schema["key"] in df.columns else pd.Series("", index=df.index)
+        # "KAN-12" → "KAN"; chave vazia (NaN) ou sem "-" → "" (coluna toda NaN não tem .str)
+        df["projectKey"] = key.fillna("").astype(str).str.extract(r"^([^-]+)-", expand=False)
+    df["projectKey"] = df["projectKey"].fillna("").astype(str)
+    month_col = schema["month"]
+    if month_col and month_col in df.columns:
+        df["month"] = df[month_col].dt.strftime("%Y-%m").fillna(SEM_DATA)
+    else:
+        df["month"] = SEM_DATA
+    return df
+
+def _versions(root: Path, dataset: str) -> list:
+    """Versões do dataset (<root>/.<dataset>.<versão>.v), da mais antiga para a mais nova."""
+    return sorted(root.glob(f".{dataset}.*.v"), key=lambda d: d.stat().st_mtime_ns)
+
+def _switch(root: Path, dataset: str, target: Path) -> Optional[Path]:
+    """
+    Aponta <root>/<dataset> (symlink relativo) para `target` numa troca
+    atômica: o link novo é criado ao lado e os.replace o põe no lugar do
+    antigo. Devolve a versão para a qual o link apontava antes.
+    """
+    final = root / dataset
+    previous = None
+    if final.is_symlink():
+        previous = root / os.readlink(final)
+    elif final.exists():
+        # dataset de antes das versões (diretório comum): vira uma versão
+        # e o link passa a ocupar o lugar dele
+        previous = root / f".{dataset}.{uuid.uuid4().hex[:8]}.v"
+        os.replace(final, previous)
+        os.symlink(previous.name, final, target_is_directory=True)
+    link = root / f".{dataset}.{uuid.uuid4().hex[:8]}.lnk"
+    os.symlink(target.name, link, target_is_directory=True)
+    os.replace(link, final)
+    return previous
+
+def write_parquet(csv_path: Path | str, dataset: str, family: str, data_dir: Path | str) -> Optional[Dict[str, Any]]:
+    """
+    Converte a base CSV recém-publicada no dataset Parquet tipado
+    <data_dir>/parquet/<dataset>/, particionado por projectKey e month.
+    A leitura é em lotes (PARQUET_CHUNK_ROWS), então a memória não depende do
+    tamanho da base. Cada publicação monta uma versão nova
+    (parquet/.<dataset>.<versão>.v) e <dataset> é um symlink trocado de uma
+    vez (os.replace) para ela: o caminho nunca some, e quem resolve o link
+    vê a versão anterior ou a nova inteira. A versão anterior fica para as
+    leituras em curso; as mais antigas que ela são apagadas.
+    Retorna {"path", "rows", "partitions"} (None com DATA_PARQUET=0).
+    """
+    if not DATA_PARQUET:
+        return None
+    csv_path = Path(csv_path)
+    root = Path(data_dir) / PARQUET_DIR
+    final = root / dataset
+    version = root / f".{dataset}.{uuid.uuid4().hex[:8]}.v"
+    version.mkdir(parents=True, exist_ok=True)
+
+    rows = 0
+    try:
+        if csv_path.exists() and csv_path.stat().st_size > 0:
+            for chunk in pd.read_csv(csv_path, dtype=str, chunksize=PARQUET_CHUNK_ROWS):
+                if chunk.empty:
+                    continue
+                chunk = to_typed(chunk, family)
+                chunk.to_parquet(version, engine="pyarrow", partition_cols=PARTITION_COLS, index=False)
+                rows += len(chunk)
+        previous = _switch(root, dataset, version)
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+
+    for old in _versions(root, dataset):
+        if old not in (version, previous):
+            shutil.rmtree(old, ignore_errors=True)
+    partitions = sum(1 for _ in final.glob("projectKey=*/month=*"))
+    return {"path": str(final), "rows": rows, "partitions": partitions}
+
+def publish_typed(csv_latest: Path | str, csv_timestamped: Optional[Path | str], dataset: str, family: str,
+                  data_dir: Path | str) -> Dict[str, Any]:
+    """
+    Publica as formas tipadas da base 'latest': o dataset Parquet e a tabela
+    do banco analítico (common/store.py). A cópia CSV com timestamp vira
+    snapshot endereçado por conteúdo (common/snapshots.py); sem snapshots e
+    com DATA_EXPORT_CSV=0, é descartada. O CSV 'latest' continua: é a base
+    dos merges incrementais.
+    """
+    from .store import load_table   # store importa SCHEMAS/to_typed daqui
+
+    info = {
+        "parquet": write_parquet(csv_latest, dataset, family, data_dir),
+        "store": load_table(csv_latest, dataset, family, data_dir),
+    }
+    if csv_timestamped and Path(csv_timestamped) != Path(csv_latest):
+        if DATA_SNAPSHOTS:
+            info["snapshot"] = snapshot(csv_timestamped, dataset, data_dir)
+        elif not DATA_EXPORT_CSV:
+            try:
+                os.remove(csv_timestamped)
+            except FileNotFoundError:
+                pass
+    return info
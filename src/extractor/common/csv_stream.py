@@ -0,0 +1,164 @@
+# extractor/common/csv_stream.py
+from typing import Dict, Any, Iterable, List, Optional, Set
+from pathlib import Path
+import csv
+import io
+import os
+import shutil
+
+class CsvStreamWriter:
+    """
+    Grava linhas em CSV à medida que as páginas chegam (memória = 1 página).
+    - colunas fixas (as mesmas que o DataFrame teria); chaves extras são ignoradas
+    - escreve num arquivo .tmp e só troca pelo destino no close() (os.replace),
+      então quem lê o CSV nunca vê um arquivo pela metade
+    - se o bloco `with` falhar, o .tmp é descartado e o destino fica intacto
+    """
+    def __init__(self, path: Path | str, columns: List[str]):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.rows = 0
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._fh = open(self._tmp, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._fh, fieldnames=self.columns, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        n = 0
+        for row in rows:
+            self._writer.writerow(row)
+            n += 1
+        self.rows += n
+        return n
+
+    def close(self) -> None:
+        if self._fh.closed:
+            return
+        self._fh.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        if not self._fh.closed:
+            self._fh.close()
+        try:
+            os.remove(self._tmp)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "CsvStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def publish_copy(src: Path | str, dst: Path | str) -> None:
+    """
+    Copia `src` para `dst` de forma atômica (ex.: timestamped → latest).
+    O 'latest' ganha sempre um inode novo — por isso toda escrita de
+    <dataset>_latest.csv passa por aqui (ou por tmp + os.replace), nunca
+    por to_csv direto: as gerações (common/generation.py) são hard links do
+    inode anterior e não podem mudar depois de publicadas.
+    """
+    dst = Path(dst)
+    tmp = dst.with_name(dst.name + ".tmp")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class AppendOnlyCsv:
+    """
+    Base CSV que só cresce (ex.: histórico de execuções), sem duplicar `key`.
+    - append(rows): descarta as linhas cujo `key` já está na base (ou repetido
+      no próprio lote) e grava o resto no fim do arquivo numa única escrita
+      + fsync — nunca reescreve o que já foi gravado
+    - as chaves gravadas ficam num índice ao lado (<base>.keys), também só de
+      acréscimo: cada append soma as chaves novas e uma linha "#<tamanho>" com
+      o tamanho da base que o índice cobre. Índice ausente ou com tamanho
+      diferente (ex.: o processo morreu entre as duas escritas) é refeito
+      lendo a coluna `key` da base uma vez
+    - o cabeçalho é fixado na criação; colunas novas do perfil são ignoradas
+      e colunas que sumiram ficam vazias
+    """
+    def __init__(self, path: Path | str, columns: List[str], key: str):
+        self.path = Path(path)
+        self.key = key
+        self.index = self.path.with_name(self.path.name + ".keys")
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, encoding="utf-8", newline="") as fh:
+                self.columns = next(csv.reader(fh), None) or list(columns)
+        else:
+            self.columns = list(columns)
+
+    def _size(self) -> int:
+        return self.path.stat().st_size if self.path.exists() else 0
+
+    def _load_index(self, size: int) -> Optional[Set[str]]:
+        """Chaves do índice até o último "#<tamanho>"; None se ele não cobre `size` bytes da base."""
+        if not self.index.exists():
+            return None
+        keys: Set[str] = set()
+        pending: List[str] = []
+        covered = None
+        with open(self.index, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.rstrip("\n")
+                if line.startswith("#"):
+                    keys.update(pending)
+                    pending = []
+                    covered = line[1:]
+                elif line:
+                    pending.append(line)
+        return keys if covered == str(size) else None
+
+    def _write_index(self, keys: Iterable[str], size: int, mode: str) -> None:
+        buf = "".join(f"{k}\n" for k in keys) + f"#{size}\n"
+        if mode == "w":
+            tmp = self.index.with_name(self.index.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(buf)
+            os.replace(tmp, self.index)
+            return
+        with open(self.index, "a", encoding="utf-8") as fh:
+            fh.write(buf)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def keys(self) -> Set[str]:
+        """Chaves já gravadas: do índice ou, se ele não bate com a base, da coluna `key` (e o índice é refeito)."""
+        size = self._size()
+        if size == 0:
+            return set()
+        seen = self._load_index(size)
+        if seen is None:
+            with open(self.path, encoding="utf-8", newline="") as fh:
+                seen = {row.get(self.key) for row in csv.DictReader(fh) if row.get(self.key)}
+            self._write_index(seen, size, "w")
+        return seen
+
+    def append(self, rows: Iterable[Dict[str, Any]]) -> int:
+        seen = self.keys()
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=self.columns, extrasaction="ignore")
+        new_file = self._size() == 0
+        if new_file:
+            writer.writeheader()
+        added: List[str] = []
+        for row in rows:
+            k = row.get(self.key)
+            if k is None or str(k) in seen:
+                continue
+            seen.add(str(k))
+            added.append(str(k))
+            writer.writerow(row)
+        if added or new_file:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8", newline="") as fh:
+                fh.write(buf.getvalue())
+                fh.flush()
+                os.fsync(fh.fileno())
+            # índice só depois da base: se morrer aqui, o tamanho não bate e ele é refeito
+            self._write_index(added, self._size(), "w" if new_file else "a")
+        return len(added)
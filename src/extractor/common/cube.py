@@ -0,0 +1,158 @@
+# extractor/common/cube.py
+from typing import Dict, Any, Iterator, List, Optional
+from pathlib import Path
+import os
+import time
+
+import pandas as pd
+
+from .classify import by_test, case_flags, get_classifier
+from .columnar import to_typed
+
+# ====== Tunáveis por ENV ======
+DATA_KPI_CUBE = os.getenv("DATA_KPI_CUBE", "1") not in ("0", "false", "no")   # materializa o cubo de KPIs
+CUBE_CHUNK_ROWS = int(os.getenv("CUBE_CHUNK_ROWS", "200000"))
+
+KPI_CUBE = "kpi_cube"   # <data_dir>/kpi_cube_latest.csv (entra na geração do manifesto)
+DIMS = ["projectKey", "month", "environment", "wave"]
+NA_DIM = "*"            # medidas de issues (cobertura, bugs) não têm ambiente/wave
+
+# numeradores e denominadores de cada KPI: somar linhas do cubo e só então
+# dividir dá o KPI de qualquer recorte (projeto, mês, ambiente, wave)
+MEASURES = [
+    "issues", "issues_covered",        # cobertura: issues func+story / com test case vinculado
+    "runs", "runs_auto",               # execuções / automatizadas
+    "runs_reg", "runs_reg_auto",       # execuções de regressão / automatizadas
+    "runs_neg",                        # execuções de teste negativo
+    "runs_linked", "issues_run",       # execuções com issue / issues distintas executadas na célula
+    "cases", "cases_auto",             # test cases criados / automatizados
+    "bugs_resolved", "bug_days",       # bugs+sub-bugs resolvidos / soma dos dias até a resolução
+]
+
+def _chunks(path: Path, family: str, columns: List[str]) -> Iterator[pd.DataFrame]:
+    """Lotes tipados (columnar.to_typed) da base, só com as colunas usadas."""
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    wanted = set(columns)
+    for chunk in pd.read_csv(path, dtype=str, chunksize=CUBE_CHUNK_ROWS, usecols=lambda c: c in wanted):
+        if not chunk.empty:
+            yield to_typed(chunk, family)
+
+def _links(data_dir: Path) -> pd.DataFrame:
+    """
+    Vínculos test case → issue (zephyr_links_latest.csv), crus (sem to_typed):
+    as execuções não trazem issueKey, a issue de cada execução sai daqui pelo testKey.
+    """
+    path = data_dir / "zephyr_links_latest.csv"
+    cols = ["testCaseKey", "issueKey"]
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame(columns=cols)
+    parts = [chunk.reindex(columns=cols) for chunk in
+             pd.read_csv(path, dtype=str, chunksize=CUBE_CHUNK_ROWS, usecols=lambda c: c in cols)]
+    links = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=cols)
+    return links.dropna().drop_duplicates(ignore_index=True)
+
+def _dims(df: pd.DataFrame, na_dim: Optional[str] = None) -> pd.DataFrame:
+    for col in ("environment", "wave"):
+        if na_dim is not None or col not in df.columns:
+            df[col] = na_dim or ""
+        else:
+            df[col] = df[col].astype("string").fillna("")
+    return df
+
+def _sum(df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
+    return df.groupby(DIMS, observed=True, dropna=False)[cols].sum()
+
+def _coverage(data_dir: Path, links: pd.DataFrame) -> Optional[pd.DataFrame]:
+    parts = [c[["key", "projectKey", "month"]] for label in ("func", "story")
+             for c in _chunks(data_dir / f"jira_issues_{label}_latest.csv", "jira_issues", ["key", "projectKey", "created"])]
+    if not parts:
+        return None
+    issues = _dims(pd.concat(parts, ignore_index=True).drop_duplicates("key"), NA_DIM)
+    issues["issues"] = 1
+    issues["issues_covered"] = issues["key"].isin(links["issueKey"]).astype(int)
+    return _sum(issues, ["issues", "issues_covered"])
+
+def _bugs(data_dir: Path) -> Iterator[pd.DataFrame]:
+    for label in ("bug", "subbug"):
+        for c in _chunks(data_dir / f"jira_issues_{label}_latest.csv", "jira_issues",
+                         ["key", "projectKey", "created", "resolutiondate"]):
+            days = (c["resolutiondate"] - c["created"]).dt.total_seconds() / 86400.0
+            ok = days.notna() & (days >= 0)
+            c = _dims(c[ok].assign(bugs_resolved=1, bug_days=days[ok]), NA_DIM)
+            yield _sum(c, ["bugs_resolved", "bug_days"])
+
+def _cases(data_dir: Path, flags: List[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    clf = get_classifier()   # regras de config/test_classification.yaml, as mesmas do dashboard
+    for c in _chunks(data_dir / "zephyr_testcases_latest.csv", "zephyr_testcases",
+                     ["key", "projectKey", "created", "environment", "wave"] + clf.columns):
+        m = clf.masks(c)
+        flags.append(case_flags(pd.concat([c[["key"]], m], axis=1)))   # as execuções herdam pelo testKey (_runs)
+        c = _dims(c.assign(cases=1, cases_auto=m["is_automated"].astype(int)))
+        yield _sum(c, ["cases", "cases_auto"])
+
+def _runs(data_dir: Path, links: pd.DataFrame, cases: List[pd.DataFrame],
+          pairs: List[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    known = pd.concat(cases) if cases else pd.DataFrame()
+    known = known[~known.index.duplicated(keep="last")]
+    cols = ["testKey", "projectKey", "executedOn", "environment", "wave"]
+    for c in _chunks(data_dir / "zephyr_executions_latest.csv", "zephyr_executions", cols):
+        flags = by_test(c, known)   # flags do test case de cada execução
+        auto, reg, neg = flags["is_automated"], flags["is_regression"], flags["is_negative"]
+        # execução vinculada = o test case dela tem issue em zephyr_links
+        linked = c["testKey"].isin(links["testCaseKey"]).to_numpy(dtype=bool)
+        c = _dims(c.assign(runs=1, runs_auto=auto.astype(int), runs_reg=reg.astype(int),
+                           runs_reg_auto=(reg & auto).astype(int), runs_neg=neg.astype(int),
+                           runs_linked=linked.astype(int)))
+        if linked.any():
+            cells = c.loc[linked, DIMS + ["testKey"]].drop_duplicates()
+            pairs.append(cells.merge(links, left_on="testKey", right_on="testCaseKey")[DIMS + ["issueKey"]]
+                         .drop_duplicates())
+        yield _sum(c, ["runs", "runs_auto", "runs_reg", "runs_reg_auto", "runs_neg", "runs_linked"])
+
+def build_kpi_cube(data_dir: Path | str, stats: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """
+    Cubo projeto × mês × ambiente × wave com os numeradores/denominadores
+    dos KPIs (MEASURES), a partir das bases 'latest' lidas em lotes.
+    Medidas de issues ficam com ambiente/wave = NA_DIM; issues_run conta
+    issues distintas por célula (somar células soma issue-mês).
+    A issue de cada execução vem de zephyr_links pelo testKey; sem vínculos,
+    runs_linked/issues_run ficam 0 e `stats` (se passado) mostra "links": 0.
+    """
+    data_dir = Path(data_dir)
+    links = _links(data_dir)
+    if stats is not None:
+        stats["links"] = len(links)
+    pairs: List[pd.DataFrame] = []
+    flags: List[pd.DataFrame] = []
+    parts = [p for p in (_coverage(data_dir, links),) if p is not None]
+    parts += list(_bugs(data_dir)) + list(_cases(data_dir, flags)) + list(_runs(data_dir, links, flags, pairs))
+    if pairs:
+        parts.append(pd.concat(pairs, ignore_index=True).drop_duplicates()
+                     .groupby(DIMS, dropna=False).size().rename("issues_run").to_frame())
+    if not parts:
+        return pd.DataFrame(columns=DIMS + MEASURES)
+    cube = pd.concat(parts).groupby(level=DIMS, dropna=False).sum()
+    cube = cube.reindex(columns=MEASURES, fill_value=0).fillna(0)
+    ints = [m for m in MEASURES if m != "bug_days"]
+    cube[ints] = cube[ints].astype("int64")
+    cube["bug_days"] = cube["bug_days"].round(4)
+    return cube.reset_index().sort_values(DIMS, ignore_index=True)
+
+def publish_kpi_cube(data_dir: Path | str) -> Optional[Dict[str, Any]]:
+    """
+    Materializa o cubo de KPIs em <data_dir>/kpi_cube_latest.csv (tmp +
+    os.replace) ao fim da extração; as páginas KPI e Score leem só ele.
+    Retorna {"path", "cells", "links", "seconds"} (None com DATA_KPI_CUBE=0).
+    """
+    if not DATA_KPI_CUBE:
+        return None
+    t0 = time.perf_counter()
+    data_dir = Path(data_dir)
+    stats: Dict[str, Any] = {}
+    cube = build_kpi_cube(data_dir, stats)
+    dst = data_dir / f"{KPI_CUBE}_latest.csv"
+    tmp = dst.with_name(dst.name + ".tmp")
+    cube.to_csv(tmp, index=False)
+    os.replace(tmp, dst)
+    return {"path": str(dst), "cells": len(cube), **stats, "seconds": round(time.perf_counter() - t0, 3)}
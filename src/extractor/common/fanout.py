@@ -0,0 +1,100 @@
+# extractor/common/fanout.py
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections import deque
+import time
+
+# (shard, nome) → função sem argumentos
+Task = Tuple[str, str, Callable[[], Any]]
+
+def resolve_projects(app_cfg: Dict[str, Any], available: Optional[List[str]] = None) -> List[str]:
+    """
+    Lista de projetos do modo portfólio:
+    - app_cfg["projects"] = ["PROJ", "ABC"] (lista ou "PROJ,ABC") → usa essa lista;
+    - app_cfg["projects"] = "*" ou ausente → todos os `available` (ex.: list_projects());
+    - sem nada disso → [default_project].
+    """
+    cfg = app_cfg.get("projects")
+    if isinstance(cfg, str) and cfg.strip() != "*":
+        cfg = [p.strip() for p in cfg.split(",")]
+    if isinstance(cfg, (list, tuple)) and cfg:
+        keys = [str(p).strip() for p in cfg if str(p).strip()]
+    elif available:
+        keys = list(available)
+    else:
+        keys = [app_cfg.get("default_project", "PROJ")]
+    return list(dict.fromkeys(keys))  # sem duplicados, mantendo a ordem
+
+def run_sharded(tasks: List[Task], max_workers: int, per_shard: int = 2, thread_name_prefix: str = "fanout") -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Executa `tasks` num pool de `max_workers` threads com no máximo `per_shard`
+    tarefas do mesmo shard (projeto) em voo. O escalonador só submete uma
+    tarefa quando o shard tem vaga, então nenhuma thread fica parada esperando
+    semáforo. Os shards são servidos em rodízio para um projeto grande não
+    ocupar o pool inteiro.
+
+    Retorna {(shard, nome): {"result", "seconds", "started", "finished"}};
+    a primeira exceção é propagada depois que as tarefas em voo terminam.
+    """
+    queues: Dict[str, deque] = {}
+    for shard, name, fn in tasks:
+        queues.setdefault(shard, deque()).append((name, fn))
+    running: Dict[str, int] = {shard: 0 for shard in queues}
+    order = deque(queues)
+    per_shard = max(1, per_shard)
+    max_workers = max(1, max_workers)
+
+    def _timed(fn: Callable[[], Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = fn()
+        finished = time.perf_counter()
+        return {"result": result, "seconds": round(finished - started, 3), "started": started, "finished": finished}
+
+    out: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    error: Optional[BaseException] = None
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix) as pool:
+        inflight: Dict[Any, Tuple[str, str]] = {}
+
+        def _fill() -> None:
+            idle = 0
+            while order and len(inflight) < max_workers and idle < len(order):
+                shard = order[0]
+                order.rotate(-1)
+                if not queues[shard] or running[shard] >= per_shard:
+                    idle += 1
+                    continue
+                idle = 0
+                name, fn = queues[shard].popleft()
+                running[shard] += 1
+                inflight[pool.submit(_timed, fn)] = (shard, name)
+
+        _fill()
+        while inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                shard, name = inflight.pop(fut)
+                running[shard] -= 1
+                try:
+                    out[(shard, name)] = fut.result()
+                except BaseException as e:  # noqa: BLE001 - repassada abaixo
+                    error = error or e
+            if error is None:
+                _fill()
+    if error is not None:
+        raise error
+    return out
+
+def shard_summary(results: Dict[Tuple[str, str], Dict[str, Any]], count: Callable[[Any], int]) -> Dict[str, Dict[str, Any]]:
+    """Resumo por shard: contagem e duração de cada tarefa + tempo de parede do shard."""
+    out: Dict[str, Dict[str, Any]] = {}
+    spans: Dict[str, List[float]] = {}
+    for (shard, name), r in results.items():
+        s = out.setdefault(shard, {"counts": {}, "seconds": {}})
+        s["counts"][name] = count(r["result"])
+        s["seconds"][name] = r["seconds"]
+        span = spans.setdefault(shard, [r["started"], r["finished"]])
+        span[0], span[1] = min(span[0], r["started"]), max(span[1], r["finished"])
+    for shard, (start, end) in spans.items():
+        out[shard]["wall_seconds"] = round(end - start, 3)
+        out[shard]["total"] = sum(out[shard]["counts"].values())
+    return out
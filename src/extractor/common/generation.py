@@ -0,0 +1,149 @@
+# extractor/common/generation.py
+from typing import Dict, Any, Iterable, Optional
+from contextlib import contextmanager
+from pathlib import Path
+import datetime as dt
+import json
+import os
+import shutil
+import uuid
+
+import pandas as pd
+
+from .columnar import SCHEMAS
+
+try:  # lock entre processos (API e extractor gravam o mesmo manifesto)
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# ====== Tunáveis por ENV ======
+GENERATIONS_KEEP = int(os.getenv("GENERATIONS_KEEP", "3"))   # gerações sem dataset apontando, mantidas p/ leituras em curso
+
+GEN_DIR = "_generations"    # <data_dir>/_generations/<geração>/<dataset>.csv
+MANIFEST = "manifest.json"  # <data_dir>/manifest.json
+
+# coluna de watermark (maior valor visto na fonte) por família; a coluna de
+# data (min/max dos widgets) é a mesma que define `month` em columnar.SCHEMAS
+WATERMARK_COLS = {
+    "jira_issues": "updated",
+    "jira_transitions": "timestamp",
+    "zephyr_testcases": "created",
+    "zephyr_executions": "executedOn",
+}
+
+def _family(dataset: str) -> Optional[str]:
+    for fam in sorted(SCHEMAS, key=len, reverse=True):
+        if dataset == fam or dataset.startswith(fam + "_"):
+            return fam
+    return None
+
+def _iso(values, pick=max) -> Optional[str]:
+    values = [v for v in values if pd.notna(v)]
+    return pick(values).isoformat() if values else None
+
+def _stats(path: Path, family: Optional[str]) -> Dict[str, Any]:
+    """Linhas, min/max da coluna de data e watermark, lendo só essas colunas em lotes."""
+    date_col = SCHEMAS[family]["month"] if family else None
+    wm_col = WATERMARK_COLS.get(family) if family else None
+    wanted = {c for c in (date_col, wm_col) if c}
+    rows, mins, maxs, wms = 0, [], [], []
+    if path.stat().st_size > 0:
+        for chunk in pd.read_csv(path, dtype=str, chunksize=200000, usecols=lambda c: c in wanted or not wanted):
+            rows += len(chunk)
+            if date_col in chunk.columns:
+                d = pd.to_datetime(chunk[date_col], errors="coerce", utc=True, format="ISO8601")
+                mins.append(d.min())
+                maxs.append(d.max())
+            if wm_col in chunk.columns:
+                wms.append(pd.to_datetime(chunk[wm_col], errors="coerce", utc=True, format="ISO8601").max())
+    return {"rows": rows, "date_col": date_col, "min_date": _iso(mins, min),
+            "max_date": _iso(maxs), "watermark": _iso(wms)}
+
+@contextmanager
+def _locked(data_dir: Path):
+    lock = data_dir / GEN_DIR / ".lock"
+    lock.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock, "a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+def load_manifest(data_dir: Path | str) -> Dict[str, Any]:
+    try:
+        with open(Path(data_dir) / MANIFEST, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _coleta(data_dir: Path, manifest: Dict[str, Any]) -> int:
+    """Apaga gerações sem dataset apontando, exceto as GENERATIONS_KEEP mais novas."""
+    vivas = {e["generation"] for e in (manifest.get("datasets") or {}).values()}
+    orfas = sorted(d for d in (data_dir / GEN_DIR).iterdir() if d.is_dir() and d.name not in vivas)
+    velhas = orfas[:-GENERATIONS_KEEP] if GENERATIONS_KEEP > 0 else orfas
+    for d in velhas:
+        shutil.rmtree(d, ignore_errors=True)
+    return len(velhas)
+
+def publish_generation(data_dir: Path | str, source: str, datasets: Iterable[str], seconds: float) -> Dict[str, Any]:
+    """
+    Publica o resultado de uma extração como uma geração nova:
+    - cada <dataset>_latest.csv entra em _generations/<geração>/<dataset>.csv
+      como hard link (sem cópia). Ele só fica imutável porque os extratores
+      nunca regravam o 'latest' no lugar: toda escrita é tmp + os.replace
+      (csv_stream.publish_copy, CsvStreamWriter), que troca o inode do
+      'latest' e deixa o desta geração intacto;
+    - o manifesto (<data_dir>/manifest.json) é regravado de uma vez
+      (tmp + os.replace) com a geração, a fonte, a duração e, por dataset,
+      arquivo, linhas, min/max da coluna de data e watermark. Datasets que a
+      extração não tocou continuam apontando para a geração anterior deles.
+    Quem lê pelo manifesto vê a extração inteira ou nada dela, e usa o id da
+    geração como chave de cache.
+    """
+    data_dir = Path(data_dir)
+    now = dt.datetime.now().astimezone()
+    gen = f"{now:%Y%m%d_%H%M%S_%f}-{uuid.uuid4().hex[:6]}"
+    gdir = data_dir / GEN_DIR / gen
+    gdir.mkdir(parents=True, exist_ok=True)
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    for name in datasets:
+        latest = data_dir / f"{name}_latest.csv"
+        if not latest.exists():
+            continue
+        dst = gdir / f"{name}.csv"
+        try:
+            os.link(latest, dst)
+        except OSError:
+            shutil.copyfile(latest, dst)
+        entries[name] = {
+            "file": dst.relative_to(data_dir).as_posix(),
+            "generation": gen,
+            "source": source,
+            "published_at": now.isoformat(timespec="seconds"),
+            **_stats(dst, _family(name)),
+        }
+
+    with _locked(data_dir):
+        manifest = load_manifest(data_dir)
+        manifest["datasets"] = {**(manifest.get("datasets") or {}), **entries}
+        manifest.update({
+            "generation": gen,
+            "source": source,
+            "published_at": now.isoformat(timespec="seconds"),
+            "duration_s": round(seconds, 3),
+        })
+        tmp = data_dir / f".{MANIFEST}.{gen}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, data_dir / MANIFEST)
+        removidas = _coleta(data_dir, manifest)
+
+    return {"generation": gen, "datasets": {n: e["rows"] for n, e in entries.items()}, "removed": removidas}
@@ -0,0 +1,153 @@
+# extractor/common/http.py
+from typing import Dict, Any, Optional
+import time
+
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
+
+from .http_cache import HttpCache, get_http_cache
+from .throttle import Throttle, get_throttle
+
+POOL_SIZE = 20
+
+# repetição por status (429/5xx): feita pelo ThrottledAdapter, que vê cada resposta
+RETRY_TOTAL = 5
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_METHODS = ("GET", "POST")
+
+class ThrottledRetry(Retry):
+    """
+    Retry(total=5, backoff_factor=0.5, ...) de erros de conexão/leitura que
+    conversa com o Throttle: antes de repetir, espera o balde; sem espera
+    imposta por ele, cai no backoff exponencial padrão. Respostas 429/5xx não
+    passam por aqui — o ThrottledAdapter as repete e as entrega ao balde
+    (observe) uma vez cada.
+    """
+    def __init__(self, *args, throttle: Optional[Throttle] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.throttle = throttle
+
+    def new(self, **kw) -> "ThrottledRetry":
+        r = super().new(**kw)
+        r.throttle = self.throttle
+        return r
+
+    def sleep(self, response=None) -> None:
+        if self.throttle is None:
+            return super().sleep(response)
+        if self.throttle.acquire() <= 0:
+            self._sleep_backoff()
+
+
+def _cached_response(request, entry: Dict[str, Any], state: str) -> Response:
+    resp = Response()
+    resp.status_code = entry["status"]
+    resp.reason = "OK"
+    resp.headers = CaseInsensitiveDict(entry["headers"])
+    resp.headers["X-Cache"] = state
+    resp._content = entry["body"]
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp.url = request.url
+    resp.request = request
+    return resp
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter que reserva um token antes de cada envio e registra o tempo segurado.
+    Cada resposta alimenta o balde (observe) exatamente uma vez, aqui; 429/5xx
+    são repetidos até RETRY_TOTAL vezes, esperando o balde (que já incorpora
+    Retry-After/X-RateLimit-*) ou, sem espera imposta, o backoff exponencial.
+    Com `cache` (common/http_cache.py): resposta dentro do TTL sai do disco sem
+    rede nem token; vencida, vai com If-None-Match e um 304 reaproveita o corpo.
+    """
+    def __init__(self, throttle: Throttle, cache: Optional[HttpCache] = None, **kwargs):
+        self.throttle = throttle
+        self.cache = cache
+        self.throttled_seconds = 0.0
+        self.throttled_requests = 0
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        ttl = self.cache.ttl_for(request.url) if self.cache else 0
+        if ttl <= 0:
+            return self._send(request, **kwargs)
+
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        key = self.cache.key(request.method, request.url, body, request.headers.get("Authorization"))
+        entry = self.cache.get(key)
+        if entry and entry["fresh"]:
+            self.cache.hit()
+            return _cached_response(request, entry, "HIT")
+        if entry and entry["etag"]:
+            request.headers["If-None-Match"] = entry["etag"]
+
+        resp = self._send(request, **kwargs)
+        if resp.status_code == 304 and entry:
+            self.cache.revalidated(key, resp.headers, ttl)
+            return _cached_response(request, entry, "REVALIDATED")
+        self.cache.put(key, request.url, resp.status_code, resp.headers, resp.content, ttl)
+        return resp
+
+    def _send(self, request, **kwargs):
+        attempt = 0
+        while True:
+            waited = self.throttle.acquire()
+            if waited > 0:
+                self.throttled_seconds += waited
+                self.throttled_requests += 1
+            elif attempt > 0:
+                time.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
+            resp = super().send(request, **kwargs)
+            self.throttle.observe(resp.status_code, resp.headers)
+            if (resp.status_code not in RETRY_STATUSES or request.method not in RETRY_METHODS
+                    or attempt >= RETRY_TOTAL):
+                return resp
+            resp.close()
+            attempt += 1
+
+
+def build_retry(throttle: Optional[Throttle] = None) -> Retry:
+    # com Throttle, 429/5xx ficam com o ThrottledAdapter (observe uma vez por resposta)
+    return ThrottledRetry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=() if throttle is not None else RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False,
+        # o balde já respeita Retry-After; evita dormir duas vezes
+        respect_retry_after_header=throttle is None,
+        throttle=throttle,
+    )
+
+def mount_adapter(s: Session, throttle: Optional[Throttle] = None, cache: Optional[HttpCache] = None) -> ThrottledAdapter:
+    """
+    Monta o adapter com Retry + Throttle na sessão. Throttle e cache HTTP são,
+    por padrão, os compartilhados do processo (cache só se HTTP_CACHE_DIR).
+    """
+    throttle = throttle or get_throttle()
+    adapter = ThrottledAdapter(
+        throttle,
+        cache=cache or get_http_cache(),
+        max_retries=build_retry(throttle),
+        pool_connections=POOL_SIZE,
+        pool_maxsize=POOL_SIZE,
+    )
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return adapter
+
+def adapter_stats(adapter: ThrottledAdapter) -> Dict[str, Any]:
+    """Tempo segurado pelas requisições desta sessão + estado do balde compartilhado."""
+    out = adapter.throttle.stats()
+    out["session_throttled_seconds"] = round(adapter.throttled_seconds, 3)
+    out["session_throttled_requests"] = adapter.throttled_requests
+    return out
+
+def cache_stats(adapter: ThrottledAdapter) -> Optional[Dict[str, Any]]:
+    """Acertos/revalidações/despejos do cache HTTP (None se desligado)."""
+    return adapter.cache.stats() if adapter.cache else None
@@ -0,0 +1,182 @@
+# extractor/common/http_cache.py
+from typing import Dict, Any, List, Mapping, Optional, Tuple
+from pathlib import Path
+from urllib.parse import urlsplit
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ====== Tunáveis por ENV ======
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "")                 # vazio = cache desligado
+HTTP_CACHE_MAX_MB = float(os.getenv("HTTP_CACHE_MAX_MB", "256"))  # teto LRU
+HTTP_CACHE_TTLS = os.getenv("HTTP_CACHE_TTLS", "")                # JSON {"trecho do path": segundos}
+
+# TTL (s) por endpoint: o primeiro trecho de path que casar vence (mais longo primeiro).
+# Os endpoints POST (buscas) vêm com 0; para guardá-los, dê um TTL explícito
+# em HTTP_CACHE_TTLS (ex.: {"/search/jql": 120}) — o corpo entra na chave.
+# TTL 0 = não guarda. Vencido o TTL, a entrada é revalidada com If-None-Match.
+DEFAULT_TTLS: Dict[str, int] = {
+    "/rest/api/3/project/search": 3600,   # Jira: lista de projetos
+    "/rest/api/3/issue/": 300,            # Jira: get_issue
+    "/rest/api/3/search/jql": 0,          # buscas: watermark/incremental já cuidam disso
+    "/rest/api/3/changelog/bulkfetch": 0,
+    "/projects": 3600,                    # Zephyr: metadados
+    "/folders": 3600,
+    "/statuses": 3600,
+    "/priorities": 3600,
+    "/environments": 3600,
+    "/testcases": 600,
+    "/testcycles": 600,
+    "/testexecutions": 0,                 # resultados mudam o tempo todo
+}
+
+# cabeçalhos que não fazem sentido num corpo já decodificado/guardado
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+def basic_auth(user: str, token: str) -> str:
+    """Cabeçalho Authorization de Basic auth (o mesmo que o requests monta), para a chave do cache."""
+    return "Basic " + base64.b64encode(f"{user}:{token}".encode("utf-8")).decode("ascii")
+
+def _load_ttls() -> Dict[str, int]:
+    ttls = dict(DEFAULT_TTLS)
+    if HTTP_CACHE_TTLS:
+        try:
+            ttls.update({str(k): int(v) for k, v in json.loads(HTTP_CACHE_TTLS).items()})
+        except (ValueError, AttributeError):
+            pass
+    return ttls
+
+
+class HttpCache:
+    """
+    Cache HTTP em disco (SQLite) compartilhado pelos clientes Jira/Zephyr.
+    - chave = sha256(método + URL completa + sha256 do corpo)
+    - TTL por endpoint (DEFAULT_TTLS / HTTP_CACHE_TTLS): dentro do TTL a
+      resposta sai do disco sem rede nem token do throttle
+    - vencido o TTL, se houver ETag, a requisição vai com If-None-Match;
+      304 renova a entrada e devolve o corpo guardado
+    - teto de tamanho (max_bytes) com despejo LRU por último acesso
+    O arquivo SQLite aguenta vários processos (API + extractor) ao mesmo tempo.
+    """
+    def __init__(self, path: Path | str, max_bytes: int, ttls: Optional[Dict[str, int]] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.ttls = sorted((ttls or DEFAULT_TTLS).items(), key=lambda kv: -len(kv[0]))
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT, body BLOB,"
+            " etag TEXT, stored_at REAL, expires_at REAL, accessed_at REAL, size INTEGER)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries(accessed_at)")
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    # ------------ política ------------
+    def ttl_for(self, url: str) -> int:
+        path = urlsplit(url).path
+        for fragment, ttl in self.ttls:
+            if fragment in path:
+                return ttl
+        return 0
+
+    @staticmethod
+    def key(method: str, url: str, body: Optional[bytes] = None, credential: Optional[str] = None) -> str:
+        """
+        Chave da entrada: método, URL, corpo e a credencial (o cabeçalho
+        Authorization) — cada conta só lê o que ela mesma buscou, mesmo com o
+        banco de cache compartilhado entre processos/containers. A credencial
+        entra só como hash.
+        """
+        body_hash = hashlib.sha256(body or b"").hexdigest()
+        cred_hash = hashlib.sha256((credential or "").encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{method.upper()} {url}\n{body_hash}\n{cred_hash}".encode("utf-8")).hexdigest()
+
+    # ------------ leitura/escrita ------------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, etag, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        status, headers, body, etag, expires_at = row
+        return {"status": status, "headers": json.loads(headers), "body": body, "etag": etag,
+                "fresh": time.time() < expires_at}
+
+    def hit(self) -> None:
+        with self._lock:
+            self._stats["hits"] += 1
+
+    def put(self, key: str, url: str, status: int, headers: Mapping[str, str], body: bytes, ttl: int) -> None:
+        if ttl <= 0 or status != 200:
+            return
+        now = time.time()
+        headers = {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+        etag = headers.get("ETag") or headers.get("etag")
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(headers), body, etag, now, now + ttl, now, len(body)),
+            )
+            self._stats["stored"] += 1
+            self._evict()
+
+    def revalidated(self, key: str, headers: Mapping[str, str], ttl: int) -> None:
+        """304: o corpo guardado continua valendo por mais `ttl` segundos."""
+        now = time.time()
+        etag = headers.get("ETag") or headers.get("etag")
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET expires_at = ?, accessed_at = ?, etag = COALESCE(?, etag) WHERE key = ?",
+                (now + max(ttl, 1), now, etag, key),
+            )
+            self._stats["revalidated"] += 1
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # despeja até 90% do teto para não despejar a cada put
+        target = total - int(self.max_bytes * 0.9)
+        victims: List[Tuple[str]] = []
+        freed = 0
+        for k, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC"):
+            victims.append((k,))
+            freed += size
+            if freed >= target:
+                break
+        self._db.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self._stats["evicted"] += len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        out["entries"] = entries
+        out["mb"] = round(size / 1e6, 2)
+        return out
+
+
+# ====== instância única do processo ======
+_SHARED: Optional[HttpCache] = None
+_SHARED_LOCK = threading.Lock()
+
+def get_http_cache() -> Optional[HttpCache]:
+    """Cache compartilhado por Jira/Zephyr (sync e async); None se HTTP_CACHE_DIR não estiver definido."""
+    global _SHARED
+    if not HTTP_CACHE_DIR:
+        return None
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = HttpCache(Path(HTTP_CACHE_DIR) / "http_cache.sqlite",
+                                max_bytes=int(HTTP_CACHE_MAX_MB * 1024 * 1024), ttls=_load_ttls())
+        return _SHARED
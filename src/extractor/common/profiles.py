@@ -0,0 +1,149 @@
+# extractor/common/profiles.py
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+import os
+import re
+
+import yaml
+
+# ====== Tunáveis por ENV ======
+EXTRACTION_PROFILES = os.getenv("EXTRACTION_PROFILES", "config/extraction_profiles.yaml")
+
+# Perfis embutidos: usados quando o YAML não existe ou não traz o dataset.
+# Mesmo formato do YAML (ver config/extraction_profiles.yaml).
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "jira_issues": {
+        "required": ["key", "projectKey", "updated"],
+        "columns": {
+            "key": "key",
+            "id": "id",
+            "projectKey": {"paths": ["fields.project.key", "key"], "regex": r"^([A-Z0-9_]+)"},
+            "summary": "fields.summary",
+            "status": "fields.status.name",
+            "type": "fields.issuetype.name",
+            "priority": "fields.priority.name",
+            "created": "fields.created",
+            "updated": "fields.updated",
+            "resolutiondate": "fields.resolutiondate",
+            "assignee": "fields.assignee.displayName",
+            "reporter": "fields.reporter.displayName",
+        },
+    },
+    "zephyr_testcases": {
+        "required": ["key"],
+        "columns": {
+            "key": "key",
+            "name": "name",
+        },
+    },
+    "zephyr_executions": {
+        "required": ["executionKey", "testKey"],
+        "columns": {
+            "executionKey": "key",
+            "testKey": {"paths": ["testCase.key", "testCase.self"], "regex": r"testcases/([^/]+)|^([^/]+)$"},
+            "status": {"paths": ["testExecutionStatus.name", "testExecutionStatus.id"]},
+            "executedOn": {"paths": ["actualEndDate", "executedOn"]},
+        },
+    },
+    "zephyr_cycles": {
+        "required": ["cycleKey"],
+        "columns": {
+            "cycleKey": "key",
+            "name": "name",
+            "status": {"paths": ["status.name", "status.id"]},
+            "plannedStartDate": "plannedStartDate",
+            "plannedEndDate": "plannedEndDate",
+        },
+    },
+}
+
+def _get_path(obj: Any, path: str) -> Any:
+    """
+    "a.b.c" → obj["a"]["b"]["c"]; "a[].b" → [x["b"] for x in obj["a"]].
+    Qualquer nível ausente devolve None.
+    """
+    cur = obj
+    parts = path.split(".")
+    for i, part in enumerate(parts):
+        if cur is None:
+            return None
+        if part.endswith("[]"):
+            items = cur.get(part[:-2]) if isinstance(cur, dict) else None
+            rest = ".".join(parts[i + 1:])
+            if not isinstance(items, list):
+                return None
+            return [v for v in ((_get_path(x, rest) if rest else x) for x in items) if v is not None]
+        cur = cur.get(part) if isinstance(cur, dict) else None
+    return cur
+
+
+class Profile:
+    """
+    Perfil de extração de um dataset:
+    - columns: coluna de saída → regra de achatamento, que pode ser
+        "fields.status.name"                      (caminho; "a[].b" para listas)
+        {"paths": [...], "join": ";", "regex": "...", "default": ...}
+      paths: o primeiro valor não vazio vence; listas viram texto com `join`;
+      regex: guarda o 1º grupo que casar (ex.: key do teste a partir da URL self).
+    - fields: campos pedidos à API (Jira). Sem lista explícita, sai dos caminhos
+      "fields.<campo>..." das colunas — só o que vira coluna trafega.
+    """
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        self.name = name
+        self.rules: Dict[str, Dict[str, Any]] = {
+            col: (rule if isinstance(rule, dict) else {"paths": [rule]})
+            for col, rule in (spec.get("columns") or {}).items()
+        }
+        for rule in self.rules.values():
+            if "path" in rule:
+                rule.setdefault("paths", [rule["path"]])
+            rule["_regex"] = re.compile(rule["regex"]) if rule.get("regex") else None
+        missing = [c for c in spec.get("required") or [] if c not in self.rules]
+        if missing:
+            raise ValueError(f"[profiles] perfil '{name}' sem as colunas obrigatórias {missing}")
+        self.columns: List[str] = list(self.rules)
+        self.fields: List[str] = list(spec.get("fields") or self._derive_fields())
+
+    def _derive_fields(self) -> List[str]:
+        out: List[str] = []
+        for rule in self.rules.values():
+            for p in rule["paths"]:
+                if p.startswith("fields."):
+                    out.append(p.split(".")[1].replace("[]", ""))
+                elif "." not in p and p not in ("key", "id"):
+                    out.append(p)
+        return list(dict.fromkeys(out))
+
+    def _value(self, item: Dict[str, Any], rule: Dict[str, Any]) -> Any:
+        value = None
+        for p in rule["paths"]:
+            value = _get_path(item, p)
+            if value not in (None, "", []):
+                break
+        if isinstance(value, list):
+            value = rule.get("join", ";").join(str(v) for v in value) if value else None
+        if value is not None and rule["_regex"] is not None:
+            m = rule["_regex"].search(str(value))
+            value = next((g for g in m.groups() if g), m.group(0)) if m else None
+        return value if value not in (None, "") else rule.get("default")
+
+    def flatten(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {col: self._value(item, rule) for col, rule in self.rules.items()}
+
+
+def load_profiles(path: Path | str | None = None) -> Dict[str, Profile]:
+    """Perfis embutidos + os do YAML (o dataset do YAML substitui o embutido inteiro)."""
+    specs = dict(DEFAULT_PROFILES)
+    p = Path(path or EXTRACTION_PROFILES)
+    if p.exists():
+        with open(p, "r", encoding="utf-8") as f:
+            specs.update((yaml.safe_load(f) or {}).get("datasets") or {})
+    return {name: Profile(name, spec) for name, spec in specs.items()}
+
+_PROFILES: Optional[Dict[str, Profile]] = None
+
+def get_profile(name: str) -> Profile:
+    global _PROFILES
+    if _PROFILES is None:
+        _PROFILES = load_profiles()
+    return _PROFILES[name]
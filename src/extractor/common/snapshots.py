@@ -0,0 +1,170 @@
+# extractor/common/snapshots.py
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+import datetime as dt
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+# ====== Tunáveis por ENV ======
+DATA_SNAPSHOTS = os.getenv("DATA_SNAPSHOTS", "1") not in ("0", "false", "no")   # cópias com timestamp viram snapshots
+SNAPSHOT_KEEP_DAILY = int(os.getenv("SNAPSHOT_KEEP_DAILY", "7"))      # último snapshot de cada um dos N dias mais recentes
+SNAPSHOT_KEEP_WEEKLY = int(os.getenv("SNAPSHOT_KEEP_WEEKLY", "4"))    # último snapshot de cada uma das M semanas mais recentes
+SNAPSHOT_GC_GRACE_S = int(os.getenv("SNAPSHOT_GC_GRACE_S", "3600"))   # blob sem ponteiro só sai depois disso
+
+SNAP_DIR = "_snapshots"   # <data_dir>/_snapshots/{<dataset>.json, blobs/ab/<sha256>.csv.gz}
+TAG_RE = re.compile(r"_(\d{8}_\d{6})\.csv$")   # <dataset>_YYYYMMDD_HHMMSS.csv
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _blob_path(root: Path, digest: str) -> Path:
+    return root / "blobs" / digest[:2] / f"{digest}.csv.gz"
+
+def _load_index(path: Path) -> List[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except (OSError, ValueError):
+        return []
+
+def _save_index(path: Path, entries: List[Dict[str, Any]]) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def _retidos(entries: List[Dict[str, Any]], keep_daily: int, keep_weekly: int) -> List[Dict[str, Any]]:
+    """Último snapshot de cada dia (N dias mais recentes) e de cada semana ISO (M mais recentes)."""
+    por_dia: Dict[str, Dict[str, Any]] = {}
+    por_semana: Dict[str, Dict[str, Any]] = {}
+    for e in sorted(entries, key=lambda e: e["saved_at"]):
+        d = dt.datetime.fromisoformat(e["saved_at"]).date()
+        iso = d.isocalendar()
+        por_dia[d.isoformat()] = e
+        por_semana[f"{iso[0]}-W{iso[1]:02d}"] = e
+    keep = set()
+    if keep_daily > 0:
+        keep |= {id(por_dia[k]) for k in sorted(por_dia)[-keep_daily:]}
+    if keep_weekly > 0:
+        keep |= {id(por_semana[k]) for k in sorted(por_semana)[-keep_weekly:]}
+    return [e for e in entries if id(e) in keep]
+
+def _coleta_blobs(root: Path) -> int:
+    """Apaga blobs que nenhum índice referencia (respeitando a carência de quem acabou de gravar)."""
+    vivos = {e["sha256"] for idx in root.glob("*.json") for e in _load_index(idx)}
+    limite = time.time() - SNAPSHOT_GC_GRACE_S
+    removidos = 0
+    for blob in (root / "blobs").glob("*/*.csv.gz"):
+        if blob.name[:-len(".csv.gz")] not in vivos and blob.stat().st_mtime < limite:
+            blob.unlink(missing_ok=True)
+            removidos += 1
+    return removidos
+
+def _saved_at(csv_path: Path) -> str:
+    """Hora da extração: a do tag no nome (<dataset>_YYYYMMDD_HHMMSS.csv) ou agora."""
+    m = TAG_RE.search(csv_path.name)
+    d = dt.datetime.strptime(m.group(1), "%Y%m%d_%H%M%S") if m else dt.datetime.now()
+    return d.astimezone().isoformat(timespec="seconds")
+
+def _guarda(root: Path, csv_path: Path) -> Dict[str, Any]:
+    """Grava o blob (se o conteúdo ainda não existe) e devolve o ponteiro; remove o CSV."""
+    digest = _sha256(csv_path)
+    blob = _blob_path(root, digest)
+    reused = blob.exists()
+    if reused:
+        os.utime(blob)   # protege da coleta de blobs enquanto o ponteiro é gravado
+    else:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        # tmp próprio de cada thread/processo: tipos extraídos em paralelo com o
+        # mesmo conteúdo (ex.: CSVs vazios) gravam o mesmo blob ao mesmo tempo
+        tmp = blob.with_name(f"{blob.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(csv_path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            if blob.exists():
+                reused = True   # outro gravou o mesmo conteúdo antes: o blob dele serve
+            else:
+                os.replace(tmp, blob)
+        finally:
+            tmp.unlink(missing_ok=True)
+    entry = {"file": csv_path.name, "saved_at": _saved_at(csv_path), "sha256": digest,
+             "bytes": csv_path.stat().st_size, "reused": reused}
+    csv_path.unlink()
+    return entry
+
+def snapshot(csv_path: Path | str, dataset: str, data_dir: Path | str) -> Optional[Dict[str, Any]]:
+    """
+    Guarda a cópia com timestamp `csv_path` como snapshot endereçado por conteúdo:
+    - o blob é o CSV comprimido (gzip) em _snapshots/blobs/, nomeado pelo sha256;
+      conteúdo igual ao de uma rodada anterior só ganha um ponteiro novo no
+      índice do dataset (_snapshots/<dataset>.json), sem gravar nada de novo;
+    - o CSV com timestamp é removido (o 'latest' continua sendo a base viva),
+      assim como as cópias <dataset>_<tag>.csv de rodadas antigas, que entram
+      no índice do mesmo jeito;
+    - aplica a retenção (SNAPSHOT_KEEP_DAILY / SNAPSHOT_KEEP_WEEKLY) e apaga os
+      blobs que ficaram sem ponteiro.
+    Disco e escrita crescem com o volume de mudança, não com o número de rodadas.
+    Retorna {"sha256", "blob", "reused", "kept", "pruned", "adopted", "blobs_removed"}
+    (None com DATA_SNAPSHOTS=0).
+    """
+    csv_path = Path(csv_path)
+    if not DATA_SNAPSHOTS or not csv_path.exists():
+        return None
+    data_dir = Path(data_dir)
+    root = data_dir / SNAP_DIR
+    legado = sorted(f for f in data_dir.glob(f"{dataset}_*.csv")
+                    if f != csv_path and re.fullmatch(re.escape(dataset) + TAG_RE.pattern, f.name))
+
+    index = root / f"{dataset}.json"
+    entries = _load_index(index)
+    novos = [_guarda(root, f) for f in legado] + [_guarda(root, csv_path)]
+    atual = novos[-1]
+    reused = atual["reused"]
+    for e in novos:
+        e.pop("reused")
+    entries += novos
+    kept = _retidos(entries, SNAPSHOT_KEEP_DAILY, SNAPSHOT_KEEP_WEEKLY)
+    _save_index(index, kept)
+
+    return {
+        "sha256": atual["sha256"],
+        "blob": str(_blob_path(root, atual["sha256"])),
+        "reused": reused,
+        "kept": len(kept),
+        "pruned": len(entries) - len(kept),
+        "adopted": len(legado),
+        "blobs_removed": _coleta_blobs(root),
+    }
+
+def location(csv_path: Path | str, snap: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Onde ficou a cópia com timestamp depois do snapshot (para os resumos):
+    o próprio CSV se ele continua em disco, senão o blob que o substituiu
+    (None se a cópia foi descartada).
+    """
+    csv_path = Path(csv_path)
+    if csv_path.exists():
+        return str(csv_path)
+    return (snap or {}).get("blob")
+
+def restore_snapshot(data_dir: Path | str, dataset: str, file: str, dst: Path | str) -> Path:
+    """Descomprime o snapshot `file` (nome do CSV com timestamp) do dataset em `dst`."""
+    root = Path(data_dir) / SNAP_DIR
+    entry = next((e for e in _load_index(root / f"{dataset}.json") if e["file"] == file), None)
+    if entry is None:
+        raise FileNotFoundError(f"[snapshots] {dataset}: snapshot {file} não está retido")
+    dst = Path(dst)
+    with gzip.open(_blob_path(root, entry["sha256"]), "rb") as src, open(dst, "wb") as out:
+        shutil.copyfileobj(src, out, 1 << 20)
+    return dst
@@ -0,0 +1,100 @@
+# extractor/common/store.py
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+import os
+import sqlite3
+
+import pandas as pd
+
+from .columnar import SCHEMAS, to_typed
+
+# ====== Tunáveis por ENV ======
+DATA_STORE = os.getenv("DATA_STORE", "1") not in ("0", "false", "no")     # popula o banco analítico local
+DATA_STORE_FILE = os.getenv("DATA_STORE_FILE", "coeqa.sqlite")            # relativo ao data_dir
+STORE_CHUNK_ROWS = int(os.getenv("STORE_CHUNK_ROWS", "100000"))
+
+# Índices por família: as colunas que os filtros dos dashboards usam
+# (Domain, período, Environment/Wave) e as chaves de junção.
+INDEXES: Dict[str, List[List[str]]] = {
+    "jira_issues": [["projectKey", "created"], ["created"], ["key"]],
+    "jira_transitions": [["key"], ["timestamp"]],
+    "zephyr_testcases": [["projectKey", "created"], ["created"], ["key"]],
+    "zephyr_executions": [["projectKey", "executedOn"], ["executedOn"], ["testKey"], ["issueKey"],
+                          ["environment"], ["wave"]],
+    "zephyr_links": [["issueKey"], ["testCaseKey"]],
+}
+
+DATE_FMT = "%Y-%m-%dT%H:%M:%S+00:00"   # ISO em UTC: comparação por texto == comparação por data
+
+def store_path(data_dir: Path | str) -> Path:
+    return Path(data_dir) / DATA_STORE_FILE
+
+def _connect(path: Path) -> sqlite3.Connection:
+    con = sqlite3.connect(path, timeout=60, isolation_level=None)
+    con.execute("PRAGMA journal_mode=WAL")   # leitores (dashboards) não travam durante a carga
+    con.execute("PRAGMA synchronous=NORMAL")
+    return con
+
+def _for_sql(df: pd.DataFrame, family: str) -> pd.DataFrame:
+    """Tipagem da família, com datas em texto ISO/UTC e categorias como texto (o SQLite não tem os dois tipos)."""
+    df = to_typed(df, family)
+    for prefix in SCHEMAS[family]["days"].values():
+        if f"{prefix}_date" in df.columns:
+            df[f"{prefix}_date"] = df[f"{prefix}_date"].astype("string")
+    for col in SCHEMAS[family]["dates"]:
+        if col in df.columns:
+            df[col] = df[col].dt.strftime(DATE_FMT)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    return df
+
+def load_table(csv_path: Path | str, table: str, family: str, data_dir: Path | str) -> Optional[Dict[str, Any]]:
+    """
+    Carrega a base CSV recém-publicada na tabela `table` do banco analítico
+    (<data_dir>/coeqa.sqlite), com os índices da família.
+    A carga vai para uma tabela auxiliar; a troca (drop + rename + índices)
+    acontece numa única transação, então quem consulta vê a tabela anterior
+    ou a nova, nunca metade.
+    Retorna {"path", "table", "rows"} (None com DATA_STORE=0).
+    """
+    if not DATA_STORE:
+        return None
+    csv_path = Path(csv_path)
+    path = store_path(data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = f"{table}__load"
+
+    con = _connect(path)
+    try:
+        con.execute(f'DROP TABLE IF EXISTS "{staging}"')
+        rows = 0
+        columns: List[str] = []
+        if csv_path.exists() and csv_path.stat().st_size > 0:
+            for chunk in pd.read_csv(csv_path, dtype=str, chunksize=STORE_CHUNK_ROWS):
+                chunk = _for_sql(chunk, family)
+                chunk.to_sql(staging, con, if_exists="append", index=False)
+                columns = list(chunk.columns)
+                rows += len(chunk)
+        if not columns:
+            # base vazia: a tabela existe (consultas devolvem 0 linhas em vez de cair no CSV)
+            columns = ["projectKey", "month"]
+            con.execute(f'CREATE TABLE "{staging}" ("projectKey" TEXT, "month" TEXT)')
+
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.execute(f'DROP TABLE IF EXISTS "{table}"')
+            con.execute(f'ALTER TABLE "{staging}" RENAME TO "{table}"')
+            for cols in INDEXES.get(family, []):
+                if all(c in columns for c in cols):
+                    name = f"ix_{table}_{'_'.join(cols)}"
+                    collist = ", ".join(f'"{c}"' for c in cols)
+                    con.execute(f'CREATE INDEX "{name}" ON "{table}" ({collist})')
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        con.execute(f'ANALYZE "{table}"')
+    finally:
+        con.close()
+    return {"path": str(path), "table": table, "rows": rows}
@@ -0,0 +1,195 @@
+# extractor/common/throttle.py
+from typing import Dict, Any, Optional, Mapping
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+import datetime as dt
+import json
+import os
+import threading
+import time
+
+try:  # lock entre processos (containers Linux); sem fcntl o balde fica só no processo
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# ====== Tunáveis por ENV ======
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "10"))         # requisições/s em regime
+THROTTLE_BURST = float(os.getenv("THROTTLE_BURST", "20"))       # tamanho do balde
+THROTTLE_MIN_RATE = float(os.getenv("THROTTLE_MIN_RATE", "0.5"))
+THROTTLE_STATE_FILE = os.getenv("THROTTLE_STATE_FILE", "")      # vazio = só neste processo
+
+THROTTLE_STATUS = (429, 503)
+
+def _seconds_until(value: str, now: float) -> Optional[float]:
+    """
+    Interpreta cabeçalhos de espera/reset:
+    - segundos ("30", "1.5")
+    - epoch em segundos (X-RateLimit-Reset do Zephyr/SmartBear)
+    - data ISO 8601 (X-RateLimit-Reset do Atlassian) ou HTTP-date (Retry-After)
+    """
+    if value is None:
+        return None
+    s = str(value).strip()
+    if not s:
+        return None
+    try:
+        n = float(s)
+        return max(0.0, n - now) if n > 1e9 else max(0.0, n)
+    except ValueError:
+        pass
+    for parse in (lambda v: dt.datetime.fromisoformat(v.replace("Z", "+00:00")), parsedate_to_datetime):
+        try:
+            d = parse(s)
+        except (TypeError, ValueError):
+            continue
+        if d.tzinfo is None:
+            d = d.replace(tzinfo=dt.timezone.utc)
+        return max(0.0, d.timestamp() - now)
+    return None
+
+def _header(headers: Mapping[str, str], *names: str) -> Optional[str]:
+    for n in names:
+        v = headers.get(n)
+        if v is not None:
+            return v
+    return None
+
+
+class Throttle:
+    """
+    Token bucket adaptativo para as APIs Atlassian/SmartBear.
+    - reserve(): reserva 1 token e devolve quantos segundos esperar (não dorme);
+      acquire() é a versão que dorme (clientes síncronos).
+    - observe(status, headers): adapta a taxa —
+        429/503 ou Retry-After → corta a taxa pela metade e bloqueia até o prazo;
+        X-RateLimit-Remaining baixo → limita a taxa ao que resta até o reset;
+        X-RateLimit-NearLimit → reduz 20%;
+        sucesso sem sinal → aumento aditivo até a taxa máxima.
+    - state_file: se informado, o balde vive num JSON protegido por flock,
+      dividindo um único orçamento entre processos/containers.
+    - stats(): tempo total que as requisições deste processo ficaram seguradas.
+    """
+    def __init__(
+        self,
+        rate: float = THROTTLE_RATE,
+        burst: float = THROTTLE_BURST,
+        min_rate: float = THROTTLE_MIN_RATE,
+        state_file: Path | str | None = None,
+    ):
+        self.max_rate = float(rate)
+        self.burst = float(burst)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.state_file = Path(state_file) if state_file else None
+        self._lock = threading.Lock()
+        self._mem: Dict[str, Any] = self._initial()
+        self._stats = {"requests": 0, "throttled_requests": 0, "throttled_seconds": 0.0, "rate_limited": 0}
+
+    def _initial(self) -> Dict[str, Any]:
+        return {"tokens": self.burst, "updated_at": time.time(), "rate": self.max_rate, "blocked_until": 0.0}
+
+    @contextmanager
+    def _state(self):
+        with self._lock:
+            if self.state_file is None or fcntl is None:
+                yield self._mem
+                return
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.state_file, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    try:
+                        st = json.loads(raw) if raw.strip() else self._initial()
+                    except ValueError:
+                        st = self._initial()
+                    yield st
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(st, f)
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # ------------ balde ------------
+    def reserve(self) -> float:
+        with self._state() as st:
+            now = time.time()
+            rate = max(self.min_rate, float(st["rate"]))
+            st["tokens"] = min(self.burst, st["tokens"] + (now - st["updated_at"]) * rate)
+            st["updated_at"] = now
+            st["tokens"] -= 1.0
+            wait = 0.0 if st["tokens"] >= 0 else -st["tokens"] / rate
+            wait = max(wait, st["blocked_until"] - now)
+        with self._lock:
+            self._stats["requests"] += 1
+            if wait > 0:
+                self._stats["throttled_requests"] += 1
+                self._stats["throttled_seconds"] += wait
+        return wait
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    # ------------ adaptação ------------
+    def observe(self, status: int, headers: Mapping[str, str]) -> None:
+        now = time.time()
+        retry_after = _seconds_until(_header(headers, "Retry-After", "Beta-Retry-After"), now)
+        remaining = _header(headers, "X-RateLimit-Remaining", "RateLimit-Remaining")
+        limit = _header(headers, "X-RateLimit-Limit", "RateLimit-Limit")
+        reset = _seconds_until(_header(headers, "X-RateLimit-Reset", "RateLimit-Reset"), now)
+        near_limit = str(_header(headers, "X-RateLimit-NearLimit") or "").lower() == "true"
+
+        with self._state() as st:
+            rate = float(st["rate"])
+            if status in THROTTLE_STATUS or retry_after is not None:
+                rate = rate * 0.5
+                pause = retry_after if retry_after is not None else 1.0 / max(rate, self.min_rate)
+                st["blocked_until"] = max(st["blocked_until"], now + pause)
+                st["tokens"] = min(st["tokens"], 0.0)
+            elif remaining is not None:
+                try:
+                    rem, lim = float(remaining), float(limit) if limit is not None else None
+                except ValueError:
+                    rem, lim = None, None
+                if rem is not None and (lim is None or rem <= 0.1 * lim):
+                    rate = min(rate, rem / max(reset or 1.0, 1.0))
+                elif not near_limit:
+                    rate = rate + 0.05 * self.max_rate
+            elif not near_limit and status < 400:
+                rate = rate + 0.05 * self.max_rate
+            if near_limit:
+                rate = rate * 0.8
+            st["rate"] = min(self.max_rate, max(self.min_rate, rate))
+
+        if status in THROTTLE_STATUS:
+            with self._lock:
+                self._stats["rate_limited"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._state() as st:
+            rate = float(st["rate"])
+        with self._lock:
+            out = dict(self._stats)
+        out["throttled_seconds"] = round(out["throttled_seconds"], 3)
+        out["rate"] = round(rate, 3)
+        out["shared"] = bool(self.state_file and fcntl is not None)
+        return out
+
+
+# ====== instância única do processo ======
+_SHARED: Optional[Throttle] = None
+_SHARED_LOCK = threading.Lock()
+
+def get_throttle() -> Throttle:
+    """Throttle compartilhado por todos os clientes (Jira, Zephyr, sync e async) do processo."""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = Throttle(state_file=THROTTLE_STATE_FILE or None)
+        return _SHARED
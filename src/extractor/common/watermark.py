@@ -0,0 +1,92 @@
+# extractor/common/watermark.py
+from typing import Dict, Any, Optional
+from pathlib import Path
+from zoneinfo import ZoneInfo
+import datetime as dt
+import json
+import os
+
+def _parse_iso(value: str) -> Optional[dt.datetime]:
+    """Aceita o formato do Jira (2025-09-25T19:24:53.989-0300) e ISO 8601 padrão."""
+    if not value:
+        return None
+    s = str(value).strip()
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z"):
+        try:
+            return dt.datetime.strptime(s, fmt)
+        except ValueError:
+            pass
+    try:
+        d = dt.datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return d if d.tzinfo else d.replace(tzinfo=dt.timezone.utc)
+
+def max_timestamp(values) -> Optional[str]:
+    """Maior timestamp (em UTC, ISO 8601) de uma lista de strings; None se nenhuma for válida."""
+    parsed = [d for d in (_parse_iso(v) for v in values) if d is not None]
+    if not parsed:
+        return None
+    return max(parsed).astimezone(dt.timezone.utc).isoformat()
+
+def to_jql_datetime(value: str, timezone: str = "UTC", overlap_minutes: int = 5) -> Optional[str]:
+    """
+    Converte o watermark (ISO/UTC) para o formato aceito pelo JQL ("yyyy/MM/dd HH:mm").
+    O JQL só tem precisão de minutos e usa o fuso do usuário da API, por isso
+    recuamos `overlap_minutes` — as linhas repetidas são descartadas no merge por `key`.
+    """
+    d = _parse_iso(value)
+    if d is None:
+        return None
+    try:
+        tz = ZoneInfo(timezone or "UTC")
+    except Exception:
+        tz = dt.timezone.utc
+    d = d.astimezone(tz) - dt.timedelta(minutes=max(0, overlap_minutes))
+    return d.strftime("%Y/%m/%d %H:%M")
+
+def to_iso_param(value: str, overlap_minutes: int = 5) -> Optional[str]:
+    """Watermark (ISO/UTC) recuado `overlap_minutes`, no formato de filtro das APIs REST (2025-09-25T19:19:53Z)."""
+    d = _parse_iso(value)
+    if d is None:
+        return None
+    d = d.astimezone(dt.timezone.utc) - dt.timedelta(minutes=max(0, overlap_minutes))
+    return d.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class WatermarkStore:
+    """
+    Guarda o último watermark visto por chave (ex.: "KAN:bug") num JSON em disco.
+    A gravação é atômica (arquivo temporário + os.replace) para não corromper
+    o estado se o processo morrer no meio.
+    """
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._data: Dict[str, Any] = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key) or {}
+        return entry.get("watermark")
+
+    def set(self, key: str, watermark: str) -> None:
+        self._data[key] = {
+            "watermark": watermark,
+            "saved_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        }
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,492 @@
+# extractor/jira/async_jira_client.py
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from pathlib import Path
+import asyncio
+import shutil
+import time
+import httpx
+
+from .jira_client import (
+    ISSUE_FIELDS,
+    BASES_DATASETS,
+    TIPOS_BASES,
+    TIPOS_SPRINT,
+    _IssueStream,
+    _checkpoint,
+    _chunk_keys,
+    _jql_keys,
+    _normaliza_keys,
+    _resultado_keys,
+    _aplica_watermarks,
+    _check_jira_cfg,
+    _clean_base_url,
+    _info_stream,
+    _jql_tipos,
+    _now_tag,
+    _parte_path,
+    _resumo_portfolio,
+    _resumo_sprint,
+    _salva_projetos,
+    _salva_tipo,
+)
+from ..common.columnar import publish_typed
+from ..common.generation import publish_generation
+from ..common.cube import KPI_CUBE, publish_kpi_cube
+from ..common.csv_stream import publish_copy
+from ..common.fanout import resolve_projects
+from ..common.http import POOL_SIZE
+from ..common.http_cache import HttpCache, basic_auth, get_http_cache
+from ..common.throttle import Throttle, get_throttle
+from ..common.watermark import WatermarkStore, to_jql_datetime
+
+# Mesma política do Retry(...) usado em JiraClient._build_session
+RETRY_TOTAL = 5
+RETRY_BACKOFF = 0.5
+RETRY_STATUS = (429, 500, 502, 503, 504)
+RETRY_AFTER_STATUS = (413, 429, 503)   # statuses em que o urllib3 respeita Retry-After
+RETRY_BACKOFF_MAX = 120.0
+
+def _backoff(attempt: int) -> float:
+    """Mesma curva do urllib3: 0, 2*b, 4*b, ... (a primeira repetição é imediata)."""
+    if attempt <= 1:
+        return 0.0
+    return min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * (2 ** (attempt - 1)))
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+def _cached_response(req: httpx.Request, entry: Dict[str, Any], state: str) -> httpx.Response:
+    headers = dict(entry["headers"], **{"X-Cache": state})
+    return httpx.Response(entry["status"], headers=headers, content=entry["body"], request=req)
+
+
+class AsyncJiraClient:
+    """
+    Contraparte asyncio do JiraClient (httpx.AsyncClient).
+    - mesma superfície: list_projects / search / get_issue / get_issues
+    - keep-alive: um único AsyncClient com pool de POOL_SIZE conexões
+    - max_concurrency: requisições simultâneas em voo (asyncio.Semaphore)
+    - retry: mesma política de JiraClient._build_session (5 tentativas,
+      backoff 0.5, 429/5xx, Retry-After) e, ao esgotar, devolve a última
+      resposta para o chamador gerar o erro explicativo
+    - throttle: o mesmo balde adaptativo dos clientes síncronos (get_throttle())
+    - cache: o mesmo cache HTTP em disco (get_http_cache(), se HTTP_CACHE_DIR)
+    Use como `async with AsyncJiraClient(...) as jc:` para fechar o pool.
+    """
+    def __init__(self, base_url: str, email: str, api_token: str, timeout: int = 30, max_concurrency: int = 10,
+                 throttle: Optional[Throttle] = None, cache: Optional[HttpCache] = None):
+        self.base_url = _clean_base_url(base_url)
+        self.auth = (email, api_token)
+        self.timeout = timeout
+        self.throttle = throttle or get_throttle()
+        self.cache = cache or get_http_cache()
+        self.throttled_seconds = 0.0
+        self.throttled_requests = 0
+        self._sem = asyncio.Semaphore(max(1, max_concurrency))
+        self._client = self._build_client()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            auth=self.auth,
+            headers={"Accept": "application/json"},
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncJiraClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    def throttle_stats(self) -> Dict[str, Any]:
+        out = self.throttle.stats()
+        out["session_throttled_seconds"] = round(self.throttled_seconds, 3)
+        out["session_throttled_requests"] = self.throttled_requests
+        return out
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self.cache.stats() if self.cache else None
+
+    async def _wait_throttle(self) -> float:
+        # com THROTTLE_STATE_FILE o balde faz flock + E/S no JSON: fora do event loop
+        wait = await asyncio.to_thread(self.throttle.reserve)
+        if wait > 0:
+            self.throttled_seconds += wait
+            self.throttled_requests += 1
+            await asyncio.sleep(wait)
+        return wait
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """_send com o cache HTTP na frente (mesma política do ThrottledAdapter)."""
+        ttl = self.cache.ttl_for(url) if self.cache else 0
+        if ttl <= 0:
+            return await self._send(method, url, **kwargs)
+
+        req = self._client.build_request(method, url, **kwargs)
+        # o httpx só aplica `auth` no envio: a credencial da chave é montada aqui
+        key = self.cache.key(method, str(req.url), req.content, basic_auth(*self.auth))
+        entry = await asyncio.to_thread(self.cache.get, key)
+        if entry and entry["fresh"]:
+            self.cache.hit()
+            return _cached_response(req, entry, "HIT")
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+
+        resp = await self._send(method, url, headers=headers, **kwargs)
+        if resp.status_code == 304 and entry:
+            await asyncio.to_thread(self.cache.revalidated, key, resp.headers, ttl)
+            return _cached_response(req, entry, "REVALIDATED")
+        await asyncio.to_thread(self.cache.put, key, str(req.url), resp.status_code, resp.headers, resp.content, ttl)
+        return resp
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            attempt += 1
+            await self._wait_throttle()
+            try:
+                # o semáforo só segura a requisição em voo, não o tempo de backoff
+                async with self._sem:
+                    resp = await self._client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if attempt > RETRY_TOTAL:
+                    raise
+                await asyncio.sleep(_backoff(attempt))
+                continue
+
+            await asyncio.to_thread(self.throttle.observe, resp.status_code, resp.headers)
+            if resp.status_code not in RETRY_STATUS or attempt > RETRY_TOTAL:
+                return resp
+            # Retry-After já virou bloqueio no balde (próximo _wait_throttle);
+            # sem ele, segue o backoff exponencial do urllib3
+            if resp.status_code in RETRY_AFTER_STATUS and _retry_after(resp) is not None:
+                continue
+            await asyncio.sleep(_backoff(attempt))
+
+    @staticmethod
+    def _raise_for(resp: httpx.Response, what: str) -> None:
+        if resp.status_code >= 400:
+            raise httpx.HTTPStatusError(
+                f"{what} {resp.status_code} {resp.reason_phrase} | {resp.text[:800]}",
+                request=resp.request,
+                response=resp,
+            )
+
+    # ------------ Projetos ------------
+    async def list_projects(self, max_page: int = 1000) -> List[Dict[str, Any]]:
+        """GET /rest/api/3/project/search com paginação por startAt/maxResults."""
+        url = f"{self.base_url}/rest/api/3/project/search"
+        start_at = 0
+        page_size = 50
+        out: List[Dict[str, Any]] = []
+
+        while True:
+            params = {"startAt": start_at, "maxResults": page_size}
+            resp = await self._request("GET", url, params=params)
+            self._raise_for(resp, "/project/search")
+            data = resp.json() or {}
+            values = data.get("values") or data.get("projects") or []
+            out.extend(values)
+
+            if data.get("isLast", None) is True:
+                break
+            if len(values) < page_size or len(out) >= max_page:
+                break
+            start_at += page_size
+
+        return out
+
+    # ------------ Search (novo endpoint /search/jql) ------------
+    async def iter_search(self, jql: str, fields: List[str], max_results: Optional[int] = 1000, batch: int = 100) -> AsyncIterator[List[Dict[str, Any]]]:
+        """POST /rest/api/3/search/jql: gera uma página por vez (ver JiraClient.iter_search)."""
+        async for issues, _ in self.iter_search_pages(jql, fields, max_results=max_results, batch=batch):
+            yield issues
+
+    async def iter_search_pages(
+        self,
+        jql: str,
+        fields: List[str],
+        max_results: Optional[int] = 1000,
+        batch: int = 100,
+        cursor: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        """Gera (issues, cursor da página seguinte); `cursor` retoma uma busca salva (ver JiraClient.iter_search_pages)."""
+        url = f"{self.base_url}/rest/api/3/search/jql"
+        seen = int(cursor["seen"]) if cursor else 0
+        next_token = cursor.get("token") if cursor else None
+        if cursor and not next_token:
+            return
+        limit = max_results if max_results is not None else float("inf")
+
+        while True:
+            page_size = int(min(batch, limit - seen))
+            if page_size <= 0:
+                break
+
+            payload: Dict[str, Any] = {"jql": jql, "maxResults": page_size}
+            if fields:
+                payload["fields"] = fields
+            if next_token:
+                payload["nextPageToken"] = next_token
+
+            resp = await self._request("POST", url, json=payload)
+            self._raise_for(resp, "/search/jql")
+            data = resp.json() or {}
+
+            # Formato A: top-level / Formato B: aninhado em results[0]
+            issues = data.get("issues")
+            next_token = data.get("nextPageToken")
+            if issues is None:
+                results = data.get("results") or []
+                if results:
+                    issues = results[0].get("issues") or []
+                    next_token = results[0].get("nextPageToken")
+
+            issues = (issues or [])[:page_size]
+            seen += len(issues)
+            if issues:
+                yield issues, {"token": next_token if seen < limit else None, "seen": seen}
+            if not next_token or seen >= limit:
+                break
+
+    async def search(self, jql: str, fields: List[str], max_results: Optional[int] = 1000, batch: int = 100) -> List[Dict[str, Any]]:
+        """Mesma busca de iter_search, acumulando todas as páginas numa lista."""
+        out: List[Dict[str, Any]] = []
+        async for page in self.iter_search(jql, fields, max_results=max_results, batch=batch):
+            out.extend(page)
+        return out
+
+    # ------------ Issues por lista de keys ------------
+    async def _search_keys(self, keys: List[str], fields: List[str]) -> List[Dict[str, Any]]:
+        """Um lote `key in (...)`; em 400 divide ao meio até isolar as keys inválidas."""
+        try:
+            return await self.search(_jql_keys(keys), fields=fields, max_results=len(keys))
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 400:
+                raise
+            if len(keys) == 1:
+                return []
+        mid = len(keys) // 2
+        left, right = await asyncio.gather(self._search_keys(keys[:mid], fields), self._search_keys(keys[mid:], fields))
+        return left + right
+
+    async def get_issues(self, keys: List[str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Versão async de JiraClient.get_issues (lotes em paralelo até max_concurrency)."""
+        keys = _normaliza_keys(keys)
+        fields = fields or ISSUE_FIELDS
+        parts = await asyncio.gather(*[self._search_keys(c, fields) for c in _chunk_keys(keys)])
+        return _resultado_keys(keys, [it for part in parts for it in part])
+
+    # ------------ Issue by key ------------
+    async def get_issue(self, issue_key: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        url = f"{self.base_url}/rest/api/3/issue/{issue_key}"
+        params = {}
+        if fields:
+            params["fields"] = ",".join(fields)
+        resp = await self._request("GET", url, params=params)
+        self._raise_for(resp, "/issue")
+        return resp.json()
+
+
+# ================= Helpers de extração assíncronos (usados pelo FastAPI) =================
+
+def _async_client(jira_cfg: Dict[str, Any], app_cfg: Dict[str, Any]) -> AsyncJiraClient:
+    _check_jira_cfg(jira_cfg)
+    return AsyncJiraClient(
+        base_url=jira_cfg["base_url"],
+        email=jira_cfg["email"],
+        api_token=jira_cfg["api_token"],
+        max_concurrency=int(app_cfg.get("max_concurrency", 10)),
+    )
+
+async def run_extracao_jira_sprint_async(
+    jira_cfg: Dict[str, Any],
+    app_cfg: Dict[str, Any],
+    quantidade: int = 1,
+    data_dir: Path | str = "config/data",
+) -> Dict[str, Any]:
+    """Versão async de run_extracao_jira_sprint (mesmos arquivos e resumo)."""
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    project = app_cfg.get("default_project", "PROJ")
+    out_csv = data_dir / f"jira_issues_{_now_tag()}.csv"
+    jql, limit = _jql_tipos(project, TIPOS_SPRINT), max(100, quantidade * 200)
+    async with _async_client(jira_cfg, app_cfg) as jc:
+        with _IssueStream(out_csv, _checkpoint(out_csv, data_dir, f"jira_sprint_{project}", jql, limit)) as st:
+            async for page, cursor in jc.iter_search_pages(jql, fields=ISSUE_FIELDS, max_results=limit, cursor=st.cursor):
+                # escrita em disco é bloqueante: vai para uma thread para não travar o event loop
+                await asyncio.to_thread(st.write_page, page, cursor)
+    await asyncio.to_thread(publish_copy, out_csv, data_dir / "jira_issues_latest.csv")
+    typed = await asyncio.to_thread(publish_typed, data_dir / "jira_issues_latest.csv", out_csv,
+                                    "jira_issues", "jira_issues", data_dir)
+    resumo = _resumo_sprint(out_csv, st.rows, typed)
+    resumo["generation"] = await asyncio.to_thread(publish_generation, data_dir, "jira_sprint", ["jira_issues"],
+                                                   time.perf_counter() - t0)
+    return resumo
+
+async def run_extracao_jira_bases_async(
+    jira_cfg: Dict[str, Any],
+    app_cfg: Dict[str, Any],
+    quantidade: int = 1,
+    data_dir: Path | str = "config/data",
+    incremental: bool = False,
+    full_history: bool = False,
+) -> Dict[str, Any]:
+    """
+    Versão async de run_extracao_jira_bases: projetos + 5 tipos via asyncio.gather,
+    limitados por app_cfg["max_concurrency"] requisições simultâneas.
+    Sem merge a fazer, as páginas vão direto para o CSV (memória = 1 página).
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    tag = _now_tag()
+    t_total = time.perf_counter()
+
+    project = app_cfg.get("default_project", "PROJ")
+    timezone = app_cfg.get("timezone", "UTC")
+    watermarks = WatermarkStore(data_dir / "_state" / "watermarks.json")
+
+    async with _async_client(jira_cfg, app_cfg) as jc:
+
+        async def _extrai_projetos() -> Dict[str, Any]:
+            t0 = time.perf_counter()
+            projetos = await jc.list_projects()
+            out = await asyncio.to_thread(_salva_projetos, projetos, data_dir, tag)
+            out["seconds"] = round(time.perf_counter() - t0, 3)
+            return out
+
+        async def _extrai_tipo(label: str, tipolist: List[str]) -> Dict[str, Any]:
+            t0 = time.perf_counter()
+            since = to_jql_datetime(watermarks.get(f"{project}:{label}"), timezone) if incremental else None
+            limit = None if (incremental or full_history) else max(100, quantidade * 300)
+            jql = _jql_tipos(project, tipolist, incremental, since)
+            if incremental and since:
+                issues = await jc.search(jql, fields=ISSUE_FIELDS, max_results=limit)
+                out = await asyncio.to_thread(_salva_tipo, issues, label, data_dir, tag, incremental, since)
+            else:
+                ts_path = data_dir / f"jira_issues_{label}_{tag}.csv"
+                with _IssueStream(ts_path, _checkpoint(ts_path, data_dir, f"jira_bases_{project}_{label}", jql, limit)) as st:
+                    async for page, cursor in jc.iter_search_pages(jql, fields=ISSUE_FIELDS, max_results=limit, cursor=st.cursor):
+                        await asyncio.to_thread(st.write_page, page, cursor)
+                out = await asyncio.to_thread(_info_stream, st, label, data_dir, tag, incremental)
+            out["seconds"] = round(time.perf_counter() - t0, 3)
+            return out
+
+        labels = ["projetos"] + list(TIPOS_BASES)
+        results = await asyncio.gather(
+            _extrai_projetos(),
+            *[_extrai_tipo(label, tipolist) for label, tipolist in TIPOS_BASES.items()],
+        )
+        saved = dict(zip(labels, results))
+        throttle = jc.throttle_stats()
+        cache = jc.cache_stats()
+
+    if incremental:
+        _aplica_watermarks(saved, watermarks, project)
+
+    timings = {label: info["seconds"] for label, info in saved.items()}
+    timings["total"] = round(time.perf_counter() - t_total, 3)
+    kpi_cube = await asyncio.to_thread(publish_kpi_cube, data_dir)
+    generation = await asyncio.to_thread(publish_generation, data_dir, "jira_bases", BASES_DATASETS + [KPI_CUBE],
+                                         time.perf_counter() - t_total)
+
+    return {
+        "ok": True,
+        "source": "jira",
+        "mode": "incremental" if incremental else "full",
+        "kpi_cube": kpi_cube,
+        "generation": generation,
+        "saved": saved,
+        "timings": timings,
+        "throttle": throttle,
+        "cache": cache,
+    }
+
+async def run_extracao_jira_portfolio_async(
+    jira_cfg: Dict[str, Any],
+    app_cfg: Dict[str, Any],
+    quantidade: int = 1,
+    data_dir: Path | str = "config/data",
+    incremental: bool = False,
+    per_project: Optional[int] = None,
+    full_history: bool = False,
+) -> Dict[str, Any]:
+    """
+    Versão async de run_extracao_jira_portfolio: as tarefas (projeto, tipo) vão
+    todas para o asyncio.gather; um Semaphore por projeto limita quantas do
+    mesmo projeto ficam em voo, e max_concurrency limita o total de requisições.
+    Mesmos arquivos e mesmo resumo por projeto da versão síncrona.
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    tag = _now_tag()
+    t_total = time.perf_counter()
+    timezone = app_cfg.get("timezone", "UTC")
+    watermarks = WatermarkStore(data_dir / "_state" / "watermarks.json")
+    per_project = per_project or int(app_cfg.get("max_per_project", 2))
+
+    async with _async_client(jira_cfg, app_cfg) as jc:
+        lista = await jc.list_projects()
+        projetos = await asyncio.to_thread(_salva_projetos, lista, data_dir, tag)
+        projects = resolve_projects(app_cfg, [p.get("key") for p in lista if p.get("key")])
+        slots = {project: asyncio.Semaphore(per_project) for project in projects}
+
+        async def _extrai(project: str, label: str, tipolist: List[str]) -> Dict[str, Any]:
+            async with slots[project]:
+                started = time.perf_counter()
+                since = to_jql_datetime(watermarks.get(f"{project}:{label}"), timezone) if incremental else None
+                limit = None if (incremental or full_history) else max(100, quantidade * 300)
+                jql = _jql_tipos(project, tipolist, incremental, since)
+                part = _parte_path(data_dir, tag, label, project)
+                with _IssueStream(part, _checkpoint(part, data_dir, f"jira_portfolio_{project}_{label}", jql, limit)) as st:
+                    async for page, cursor in jc.iter_search_pages(jql, fields=ISSUE_FIELDS, max_results=limit, cursor=st.cursor):
+                        await asyncio.to_thread(st.write_page, page, cursor)
+                finished = time.perf_counter()
+            result = {"path": st.writer.path, "rows": st.rows, "since": since, "max_updated": st.max_updated,
+                      "resumed_pages": st.resumed_pages}
+            return {"result": result, "seconds": round(finished - started, 3), "started": started, "finished": finished}
+
+        keys = [(project, label) for label in TIPOS_BASES for project in projects]
+        try:
+            outs = await asyncio.gather(*[_extrai(p, l, TIPOS_BASES[l]) for p, l in keys])
+        except BaseException:
+            shutil.rmtree(data_dir / "_parts" / tag, ignore_errors=True)
+            raise
+        throttle = jc.throttle_stats()
+        cache = jc.cache_stats()
+
+    out = await asyncio.to_thread(_resumo_portfolio, projetos, dict(zip(keys, outs)), projects,
+                                  data_dir, tag, incremental, watermarks)
+    kpi_cube = await asyncio.to_thread(publish_kpi_cube, data_dir)
+    generation = await asyncio.to_thread(publish_generation, data_dir, "jira_portfolio", BASES_DATASETS + [KPI_CUBE],
+                                         time.perf_counter() - t_total)
+
+    return {
+        "ok": True,
+        "source": "jira",
+        "mode": "incremental" if incremental else "full",
+        "kpi_cube": kpi_cube,
+        "generation": generation,
+        "portfolio": projects,
+        "per_project": per_project,
+        "saved": out["saved"],
+        "projects": out["projects"],
+        "timings": {"total": round(time.perf_counter() - t_total, 3)},
+        "throttle": throttle,
+        "cache": cache,
+    }
@@ -1,12 +1,25 @@
 # extractor/jira/jira_client.py
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import requests
 from requests import Session
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import datetime as dt
+import csv
+import shutil
+import time
+
+from ..common.checkpoint import PageCheckpoint
+from ..common.columnar import publish_typed
+from ..common.snapshots import location, snapshot
+from ..common.generation import publish_generation
+from ..common.cube import KPI_CUBE, publish_kpi_cube
+from ..common.csv_stream import CsvStreamWriter, publish_copy
+from ..common.fanout import resolve_projects, run_sharded, shard_summary
+from ..common.http import POOL_SIZE, adapter_stats, cache_stats, mount_adapter
+from ..common.profiles import get_profile
+from ..common.watermark import WatermarkStore, max_timestamp, to_jql_datetime
 
 def _now_tag() -> str:
     return dt.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -17,9 +30,92 @@ def _clean_base_url(url: str) -> str:
         url = url[:-5]
     return url
 
+# Campos pedidos e colunas das bases de issues vêm do perfil "jira_issues"
+# (config/extraction_profiles.yaml): só o que vira coluna trafega.
+ISSUE_PROFILE = get_profile("jira_issues")
+ISSUE_FIELDS = ISSUE_PROFILE.fields
+ISSUE_COLUMNS = ISSUE_PROFILE.columns
+
+def _issue_row(it: Dict[str, Any]) -> Dict[str, Any]:
+    return ISSUE_PROFILE.flatten(it)
+
+# Tabela de transições de status (changelog): uma linha por mudança
+TRANSITION_COLUMNS = ["key","from","to","timestamp"]
+CHANGELOG_BATCH = 100   # issues por POST /changelog/bulkfetch (a API aceita até 1000)
+
+def _changelog_ts(value: Any) -> Optional[str]:
+    """`created` do changelog vem em epoch ms no bulkfetch e em ISO no expand=changelog."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return dt.datetime.fromtimestamp(int(value) / 1000, tz=dt.timezone.utc).isoformat()
+    return max_timestamp([value])
+
+def _transition_rows(key: str, histories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = []
+    for h in histories or []:
+        ts = _changelog_ts(h.get("created"))
+        for item in h.get("items") or []:
+            if (item.get("fieldId") or item.get("field")) != "status":
+                continue
+            rows.append({"key": key, "from": item.get("fromString"), "to": item.get("toString"), "timestamp": ts})
+    return rows
+
+# get_issues: chaves por `key in (...)` — cabe numa página de /search/jql e
+# fica bem abaixo do limite de tamanho da JQL
+KEYS_BATCH = 100
+JQL_MAX_CHARS = 6000
+
+def _normaliza_keys(keys: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(str(k).strip().upper() for k in keys if k and str(k).strip()))
+
+def _chunk_keys(keys: List[str], size: int = KEYS_BATCH, max_chars: int = JQL_MAX_CHARS) -> List[List[str]]:
+    """Quebra a lista em lotes de até `size` chaves e até `max_chars` caracteres de JQL."""
+    chunks: List[List[str]] = []
+    cur: List[str] = []
+    chars = 0
+    for k in keys:
+        piece = len(k) + 3   # "k",
+        if cur and (len(cur) >= size or chars + piece > max_chars):
+            chunks.append(cur)
+            cur, chars = [], 0
+        cur.append(k)
+        chars += piece
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+def _jql_keys(keys: List[str]) -> str:
+    return "key in (" + ",".join(f'"{k}"' for k in keys) + ")"
+
+def _resultado_keys(keys: List[str], found: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """{"issues": {key: issue}, "missing": [keys pedidas que não voltaram]}."""
+    issues = {it.get("key"): it for it in found if it.get("key")}
+    return {"issues": issues, "missing": [k for k in keys if k not in issues]}
+
+def _merge_by_key(base_path: Path, df_new: pd.DataFrame) -> pd.DataFrame:
+    """Aplica as linhas alteradas sobre a base gravada (a versão nova de cada `key` vence)."""
+    if not base_path.exists() or base_path.stat().st_size == 0:
+        return df_new
+    try:
+        df_old = pd.read_csv(base_path)
+    except Exception:
+        return df_new
+    if df_new.empty:
+        return df_old
+    df = pd.concat([df_old, df_new], ignore_index=True)
+    df = df.drop_duplicates(subset=["key"], keep="last")
+    if "created" in df.columns:
+        order = pd.to_datetime(df["created"], errors="coerce", utc=True)
+        df = df.assign(_order=order).sort_values("_order", ascending=False).drop(columns="_order")
+    return df.reset_index(drop=True)
+
 class JiraClient:
     """
     Cliente Jira usando requests + Retry.
+    - throttle adaptativo compartilhado (common/throttle.py) em todas as chamadas
+    - cache HTTP opcional em disco (common/http_cache.py): list_projects/get_issue
+      dentro do TTL não vão à rede; vencidos, revalidam com If-None-Match
     - /project/search com paginação
     - /search/jql (endpoint novo) com paginação via nextPageToken
     - Autenticação Basic (email + API token)
@@ -32,20 +128,17 @@ class JiraClient:
 
     def _build_session(self) -> Session:
         s = requests.Session()
-        retries = Retry(
-            total=5,
-            backoff_factor=0.5,
-            status_forcelist=(429, 500, 502, 503, 504),
-            allowed_methods=("GET", "POST"),
-            raise_on_status=False,
-        )
-        adapter = HTTPAdapter(max_retries=retries, pool_connections=20, pool_maxsize=20)
-        s.mount("http://", adapter)
-        s.mount("https://", adapter)
+        self._adapter = mount_adapter(s)
         s.auth = self.auth
         s.headers.update({"Accept": "application/json"})
         return s
 
+    def throttle_stats(self) -> Dict[str, Any]:
+        return adapter_stats(self._adapter)
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return cache_stats(self._adapter)
+
     # ------------ Projetos ------------
     def list_projects(self, max_page: int = 1000) -> List[Dict[str, Any]]:
         """GET /rest/api/3/project/search com paginação por startAt/maxResults."""
@@ -80,18 +173,39 @@ class JiraClient:
     def _jql_search_url(self) -> str:
         return f"{self.base_url}/rest/api/3/search/jql"
 
-    def search(self, jql: str, fields: List[str], max_results: int = 1000, batch: int = 100) -> List[Dict[str, Any]]:
+    def iter_search(self, jql: str, fields: List[str], max_results: Optional[int] = 1000, batch: int = 100) -> Iterator[List[Dict[str, Any]]]:
         """
         Usa o endpoint novo: POST /rest/api/3/search/jql (payload top-level).
-        Faz paginação por nextPageToken. Aceita tanto resposta top-level
-        quanto resposta aninhada em 'results[0]'.
+        Gera uma página (lista de issues) por vez, seguindo o nextPageToken;
+        quem consome decide o que guardar — a memória fica limitada a `batch`.
+        Aceita tanto resposta top-level quanto resposta aninhada em 'results[0]'.
+        max_results=None → sem teto (segue o nextPageToken até o fim).
         """
-        url = f"{self.base_url}/rest/api/3/search/jql"
-        out: List[Dict[str, Any]] = []
-        next_token = None
+        for issues, _ in self.iter_search_pages(jql, fields, max_results=max_results, batch=batch):
+            yield issues
+
+    def iter_search_pages(
+        self,
+        jql: str,
+        fields: List[str],
+        max_results: Optional[int] = 1000,
+        batch: int = 100,
+        cursor: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        """
+        iter_search com o cursor de cada página: gera (issues, {"token", "seen"}),
+        o cursor apontando para a página seguinte. Um cursor salvo (PageCheckpoint)
+        em `cursor` retoma a busca dali.
+        """
+        url = self._jql_search_url()
+        seen = int(cursor["seen"]) if cursor else 0
+        next_token = cursor.get("token") if cursor else None
+        if cursor and not next_token:
+            return  # a busca salva já tinha chegado ao fim
+        limit = max_results if max_results is not None else float("inf")
 
         while True:
-            page_size = min(batch, max_results - len(out))
+            page_size = int(min(batch, limit - seen))
             if page_size <= 0:
                 break
 
@@ -125,15 +239,104 @@ class JiraClient:
                     issues = results[0].get("issues") or []
                     next_token = results[0].get("nextPageToken")
 
-            issues = issues or []
-            out.extend(issues)
+            issues = (issues or [])[:page_size]
+            seen += len(issues)
+            if issues:
+                yield issues, {"token": next_token if seen < limit else None, "seen": seen}
 
-            if not next_token or len(out) >= max_results:
+            if not next_token or seen >= limit:
                 break
 
+    def search(self, jql: str, fields: List[str], max_results: Optional[int] = 1000, batch: int = 100) -> List[Dict[str, Any]]:
+        """Mesma busca de iter_search, acumulando todas as páginas numa lista."""
+        out: List[Dict[str, Any]] = []
+        for page in self.iter_search(jql, fields, max_results=max_results, batch=batch):
+            out.extend(page)
         return out
 
 
+    # ------------ Changelog em lote ------------
+    def iter_changelog_bulk(self, issue_ids: List[str], field_ids: Optional[List[str]] = None, max_results: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        POST /rest/api/3/changelog/bulkfetch: changelogs de até 1000 issues numa
+        chamada (em vez de um get_issue com expand=changelog por issue).
+        Gera um item {"issueId", "changeHistories"} por issue, seguindo o nextPageToken.
+        """
+        url = f"{self.base_url}/rest/api/3/changelog/bulkfetch"
+        next_token = None
+        while True:
+            payload: Dict[str, Any] = {"issueIdsOrKeys": list(issue_ids), "maxResults": max_results}
+            if field_ids:
+                payload["fieldIds"] = list(field_ids)
+            if next_token:
+                payload["nextPageToken"] = next_token
+            resp = self._session.post(url, json=payload, timeout=self.timeout)
+            if resp.status_code >= 400:
+                raise requests.HTTPError(
+                    f"/changelog/bulkfetch {resp.status_code} {resp.reason} | {resp.text[:800]}",
+                    response=resp
+                )
+            data = resp.json() or {}
+            yield from data.get("issueChangeLogs") or []
+            next_token = data.get("nextPageToken")
+            if not next_token:
+                break
+
+    def bulk_transitions(self, issues: Dict[str, str], batch: int = CHANGELOG_BATCH, max_workers: int = 4) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Transições de status (key, from, to, timestamp) de `issues` ({id: key}),
+        em lotes de `batch` ids por chamada, com até `max_workers` lotes em paralelo.
+        Gera uma lista de linhas por lote, na ordem em que os lotes terminam.
+        """
+        ids = list(issues)
+        chunks = [ids[i:i + batch] for i in range(0, len(ids), batch)]
+
+        def _lote(chunk: List[str]) -> List[Dict[str, Any]]:
+            rows: List[Dict[str, Any]] = []
+            for log in self.iter_changelog_bulk(chunk, field_ids=["status"]):
+                key = issues.get(str(log.get("issueId"))) or log.get("issueId")
+                rows.extend(_transition_rows(key, log.get("changeHistories")))
+            return rows
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, POOL_SIZE)), thread_name_prefix="jira-changelog") as pool:
+            for fut in as_completed([pool.submit(_lote, c) for c in chunks]):
+                yield fut.result()
+
+    # ------------ Issues por lista de keys ------------
+    def _search_keys(self, keys: List[str], fields: List[str]) -> List[Dict[str, Any]]:
+        """
+        Um lote `key in (...)`. Se o Jira recusar a JQL (400: key inexistente ou
+        de projeto apagado), divide o lote ao meio até isolar as keys inválidas,
+        que ficam de fora (→ "missing").
+        """
+        try:
+            return self.search(_jql_keys(keys), fields=fields, max_results=len(keys))
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 400:
+                raise
+            if len(keys) == 1:
+                return []
+        mid = len(keys) // 2
+        return self._search_keys(keys[:mid], fields) + self._search_keys(keys[mid:], fields)
+
+    def get_issues(self, keys: Iterable[str], fields: Optional[List[str]] = None, max_workers: int = 4) -> Dict[str, Any]:
+        """
+        Versão em lote de get_issue: quebra as keys em lotes `key in (...)`
+        (KEYS_BATCH chaves / JQL_MAX_CHARS caracteres) e busca os lotes em
+        paralelo. Retorna {"issues": {key: issue}, "missing": [...]}; issues
+        movidas voltam com a key nova, e a antiga aparece em "missing".
+        """
+        keys = _normaliza_keys(keys)
+        fields = fields or ISSUE_FIELDS
+        chunks = _chunk_keys(keys)
+        found: List[Dict[str, Any]] = []
+        if chunks:
+            workers = max(1, min(max_workers, len(chunks), POOL_SIZE))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jira-keys") as pool:
+                for part in pool.map(lambda c: self._search_keys(c, fields), chunks):
+                    found.extend(part)
+        return _resultado_keys(keys, found)
+
     # ------------ Issue by key (ainda útil) ------------
     def get_issue(self, issue_key: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
         url = f"{self.base_url}/rest/api/3/issue/{issue_key}"
@@ -147,6 +350,248 @@ class JiraClient:
 
 
 # ================= Helpers de extração (usados pelo FastAPI) =================
+# As funções _jql_* / _salva_* não fazem I/O de rede: são compartilhadas entre
+# os extratores síncronos (abaixo) e os assíncronos (async_jira_client.py).
+
+# Mantive os tipos que você já usava, incluindo customizados "Func"/"Sub-Bug"
+TIPOS_SPRINT = ['Func','Fun','Epic','Story','Bug','Sub-Bug']
+
+TIPOS_BASES = {
+    "func": ["Func", "Fun"],  # aceita as duas grafias
+    "epic": ["Epic"],
+    "story": ["Story"],
+    "bug": ["Bug"],
+    "subbug": ["Sub-Bug"],
+}
+
+# datasets publicados juntos (uma geração do manifesto) pelas extrações de bases
+BASES_DATASETS = ["jira_projetos"] + [f"jira_issues_{label}" for label in TIPOS_BASES]
+
+def _check_jira_cfg(jira_cfg: Dict[str, Any]) -> None:
+    for k in ("base_url", "email", "api_token"):
+        if not jira_cfg.get(k):
+            raise ValueError(f"[jira] faltando chave '{k}' no secrets")
+
+def _jql_tipos(project: str, tipolist: List[str], incremental: bool = False, since: Optional[str] = None) -> str:
+    tipos_str = ",".join([f'"{t}"' for t in tipolist])   # ex.: "Func","Bug","Story"
+    if not incremental:
+        return f'project = "{project}" AND issuetype in ({tipos_str}) ORDER BY created DESC'
+    jql = f'project = "{project}" AND issuetype in ({tipos_str})'
+    if since:
+        jql += f' AND updated >= "{since}"'
+    return jql + " ORDER BY updated ASC"
+
+def _checkpoint(path: Path, data_dir: Path, name: str, jql: str, limit: Optional[int]) -> PageCheckpoint:
+    """Gravação retomável de uma busca (ver PageCheckpoint): estado em _state/checkpoints/."""
+    return PageCheckpoint(path, ISSUE_COLUMNS, name, data_dir / "_state" / "checkpoints",
+                          fingerprint={"jql": jql, "fields": ISSUE_FIELDS, "limit": limit})
+
+class _IssueStream:
+    """
+    Consome páginas de issues e grava cada uma direto no CSV (sem DataFrame),
+    acompanhando o maior `updated` para o watermark. Uso:
+        with _IssueStream(ts_path) as st:
+            for page in jc.iter_search(...): st.write_page(page)
+    Com um PageCheckpoint como writer, cada página é commitada com o cursor
+    da busca e uma nova tentativa retoma do último commit:
+        with _IssueStream(ts_path, _checkpoint(...)) as st:
+            for page, cursor in jc.iter_search_pages(..., cursor=st.cursor): st.write_page(page, cursor)
+    """
+    def __init__(self, path: Path, writer: Optional[PageCheckpoint] = None):
+        self.writer = writer or CsvStreamWriter(path, ISSUE_COLUMNS)
+        self._checkpoint = writer
+        self.max_updated: Optional[str] = writer.meta.get("max_updated") if writer else None
+        self.resumed_pages = writer.pages if writer else 0
+
+    @property
+    def cursor(self) -> Optional[Dict[str, Any]]:
+        return self._checkpoint.cursor if self._checkpoint else None
+
+    def write_page(self, issues: List[Dict[str, Any]], cursor: Optional[Dict[str, Any]] = None) -> None:
+        rows = [_issue_row(it) for it in issues]
+        self.writer.write_rows(rows)
+        page_max = max_timestamp([r["updated"] for r in rows])
+        if page_max and (self.max_updated is None or page_max > self.max_updated):
+            self.max_updated = page_max
+        if self._checkpoint and cursor is not None:
+            self._checkpoint.commit(cursor, {"max_updated": self.max_updated})
+
+    @property
+    def rows(self) -> int:
+        return self.writer.rows
+
+    def __enter__(self) -> "_IssueStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.writer.__exit__(*exc)
+
+def _resumo_sprint(out_csv: Path, count: int, typed: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ok": True,
+        "source": "jira",
+        "count": count,
+        "saved": location(out_csv, typed.get("snapshot")),
+        "latest": "config/data/jira_issues_latest.csv",
+        "typed": typed,
+    }
+
+def _grava_sprint(jc: JiraClient, jql: str, limit: int, data_dir: Path, project: str) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    out_csv = data_dir / f"jira_issues_{_now_tag()}.csv"
+    with _IssueStream(out_csv, _checkpoint(out_csv, data_dir, f"jira_sprint_{project}", jql, limit)) as st:
+        for page, cursor in jc.iter_search_pages(jql, fields=ISSUE_FIELDS, max_results=limit, cursor=st.cursor):
+            st.write_page(page, cursor)
+    publish_copy(out_csv, data_dir / "jira_issues_latest.csv")
+    typed = publish_typed(data_dir / "jira_issues_latest.csv", out_csv, "jira_issues", "jira_issues", data_dir)
+    resumo = _resumo_sprint(out_csv, st.rows, typed)
+    resumo["generation"] = publish_generation(data_dir, "jira_sprint", ["jira_issues"], time.perf_counter() - t0)
+    return resumo
+
+def _salva_projetos(projetos: List[Dict[str, Any]], data_dir: Path, tag: str) -> Dict[str, Any]:
+    proj_rows = []
+    for p in projetos:
+        lead = (p.get("lead") or {})
+        proj_rows.append({
+            "id": p.get("id"),
+            "key": p.get("key"),
+            "name": p.get("name"),
+            "projectTypeKey": p.get("projectTypeKey"),
+            "lead": lead.get("displayName"),
+        })
+    df_proj = pd.DataFrame(proj_rows)
+    proj_ts = data_dir / f"jira_projetos_{tag}.csv"
+    df_proj.to_csv(proj_ts, index=False)
+    publish_copy(proj_ts, data_dir / "jira_projetos_latest.csv")
+    snap = snapshot(proj_ts, "jira_projetos", data_dir)
+    return {
+        "latest": "config/data/jira_projetos_latest.csv",
+        "timestamped": location(proj_ts, snap),
+        "count": int(len(df_proj)),
+        "snapshot": snap,
+    }
+
+def _salva_tipo(
+    issues: List[Dict[str, Any]],
+    label: str,
+    data_dir: Path,
+    tag: str,
+    incremental: bool = False,
+    since: Optional[str] = None,
+) -> Dict[str, Any]:
+    ts_path = data_dir / f"jira_issues_{label}_{tag}.csv"
+    latest_path = data_dir / f"jira_issues_{label}_latest.csv"
+
+    df_changed = pd.DataFrame([_issue_row(it) for it in issues])
+    df = _merge_by_key(latest_path, df_changed) if (incremental and since) else df_changed
+    df.to_csv(ts_path, index=False)
+    publish_copy(ts_path, latest_path)
+
+    typed = publish_typed(latest_path, ts_path, f"jira_issues_{label}", "jira_issues", data_dir)
+    info: Dict[str, Any] = {
+        "latest": str(latest_path),
+        "timestamped": location(ts_path, typed.get("snapshot")),
+        "count": int(len(df)),
+        "typed": typed,
+    }
+    if incremental:
+        info["changed"] = int(len(df_changed))
+        info["since"] = since
+        info["_watermark"] = max_timestamp(df_changed["updated"].tolist()) if not df_changed.empty else None
+    return info
+
+def _info_stream(st: _IssueStream, label: str, data_dir: Path, tag: str, incremental: bool = False) -> Dict[str, Any]:
+    """Publica o CSV gravado por streaming como 'latest' e monta o resumo do tipo."""
+    ts_path = st.writer.path
+    latest_path = data_dir / f"jira_issues_{label}_latest.csv"
+    publish_copy(ts_path, latest_path)
+    typed = publish_typed(latest_path, ts_path, f"jira_issues_{label}", "jira_issues", data_dir)
+    info: Dict[str, Any] = {
+        "latest": str(latest_path),
+        "timestamped": location(ts_path, typed.get("snapshot")),
+        "count": st.rows,
+        "typed": typed,
+    }
+    if st.resumed_pages:
+        info["resumed_pages"] = st.resumed_pages
+    if incremental:
+        info["changed"] = st.rows
+        info["since"] = None
+        info["_watermark"] = st.max_updated
+    return info
+
+def _aplica_watermarks(saved: Dict[str, Any], watermarks: WatermarkStore, project: str) -> None:
+    """Grava os novos watermarks só depois que todos os tipos foram persistidos."""
+    for label in TIPOS_BASES:
+        new_wm = saved[label].pop("_watermark", None)
+        if new_wm:
+            watermarks.set(f"{project}:{label}", new_wm)
+        saved[label]["watermark"] = watermarks.get(f"{project}:{label}")
+    watermarks.save()
+
+# ---------- modo portfólio (vários projetos, uma base combinada por tipo) ----------
+def _parte_path(data_dir: Path, tag: str, label: str, project: str) -> Path:
+    d = data_dir / "_parts" / tag
+    d.mkdir(parents=True, exist_ok=True)
+    return d / f"jira_issues_{label}_{project}.csv"
+
+def _combina_partes(parts: List[Path], label: str, data_dir: Path, tag: str, incremental: bool = False) -> Dict[str, Any]:
+    """
+    Junta os CSVs de cada projeto na base do tipo (todas as linhas já trazem projectKey).
+    Carga completa: cópia linha a linha (memória constante).
+    Incremental: as partes são só o delta → merge por key sobre a base 'latest'.
+    """
+    ts_path = data_dir / f"jira_issues_{label}_{tag}.csv"
+    latest_path = data_dir / f"jira_issues_{label}_latest.csv"
+    if incremental:
+        frames = [pd.read_csv(p) for p in parts if p.stat().st_size > 0]
+        frames = [f for f in frames if not f.empty]
+        df_changed = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ISSUE_COLUMNS)
+        df = _merge_by_key(latest_path, df_changed)
+        df.to_csv(ts_path, index=False)
+        publish_copy(ts_path, latest_path)
+        typed = publish_typed(latest_path, ts_path, f"jira_issues_{label}", "jira_issues", data_dir)
+        return {"latest": str(latest_path), "timestamped": location(ts_path, typed.get("snapshot")), "count": int(len(df)),
+                "changed": int(len(df_changed)), "typed": typed}
+
+    with CsvStreamWriter(ts_path, ISSUE_COLUMNS) as w:
+        for p in parts:
+            with open(p, encoding="utf-8", newline="") as fh:
+                w.write_rows(csv.DictReader(fh))
+    publish_copy(ts_path, latest_path)
+    typed = publish_typed(latest_path, ts_path, f"jira_issues_{label}", "jira_issues", data_dir)
+    return {"latest": str(latest_path), "timestamped": location(ts_path, typed.get("snapshot")), "count": w.rows,
+            "typed": typed}
+
+def _resumo_portfolio(
+    projetos: Dict[str, Any],
+    results: Dict[Any, Dict[str, Any]],
+    projects: List[str],
+    data_dir: Path,
+    tag: str,
+    incremental: bool,
+    watermarks: WatermarkStore,
+) -> Dict[str, Any]:
+    """Combina as partes por tipo, grava os watermarks por projeto e monta o resumo por projeto."""
+    saved: Dict[str, Any] = {"projetos": projetos}
+    for label in TIPOS_BASES:
+        parts = [results[(p, label)]["result"]["path"] for p in projects]
+        saved[label] = _combina_partes(parts, label, data_dir, tag, incremental)
+    shutil.rmtree(data_dir / "_parts" / tag, ignore_errors=True)
+
+    if incremental:
+        for (project, label), r in results.items():
+            wm = r["result"].pop("max_updated", None)
+            if wm:
+                watermarks.set(f"{project}:{label}", wm)
+        watermarks.save()
+
+    por_projeto = shard_summary(results, count=lambda info: info["rows"])
+    if incremental:
+        for project in projects:
+            por_projeto[project]["watermarks"] = {label: watermarks.get(f"{project}:{label}") for label in TIPOS_BASES}
+    return {"saved": saved, "projects": por_projeto}
+
 
 def run_extracao_jira_sprint(
     jira_cfg: Dict[str, Any],
@@ -160,10 +605,7 @@ def run_extracao_jira_sprint(
     """
     data_dir = Path(data_dir)
     data_dir.mkdir(parents=True, exist_ok=True)
-
-    for k in ("base_url", "email", "api_token"):
-        if not jira_cfg.get(k):
-            raise ValueError(f"[jira] faltando chave '{k}' no secrets")
+    _check_jira_cfg(jira_cfg)
 
     jc = JiraClient(
         base_url=jira_cfg["base_url"],
@@ -172,41 +614,8 @@ def run_extracao_jira_sprint(
     )
 
     project = app_cfg.get("default_project", "PROJ")
-    # Mantive os tipos que você já usava, incluindo customizados "Func"/"Sub-Bug"
-    tipo_lista = ['Func','Fun','Epic','Story','Bug','Sub-Bug']
-    tipos_str = ",".join([f'"{t}"' for t in tipo_lista])   # ex.: "Func","Bug","Story"
-    jql = f'project = "{project}" AND issuetype in ({tipos_str}) ORDER BY created DESC'
-    fields = ["key","summary","status","issuetype","priority","created","resolutiondate","assignee","reporter"]
-
-    issues = jc.search(jql, fields=fields, max_results=max(100, quantidade * 200))
-    rows = []
-    for it in issues:
-        f = it.get("fields", {}) or {}
-        rows.append({
-            "key": it.get("key"),
-            "summary": f.get("summary"),
-            "status": (f.get("status") or {}).get("name"),
-            "type": (f.get("issuetype") or {}).get("name"),
-            "priority": (f.get("priority") or {}).get("name"),
-            "created": f.get("created"),
-            "resolutiondate": f.get("resolutiondate"),
-            "assignee": ((f.get("assignee") or {}).get("displayName")),
-            "reporter": ((f.get("reporter") or {}).get("displayName")),
-        })
-    df = pd.DataFrame(rows)
-
-    tag = _now_tag()
-    out_csv = data_dir / f"jira_issues_{tag}.csv"
-    df.to_csv(out_csv, index=False)
-    df.to_csv(data_dir / "jira_issues_latest.csv", index=False)
-
-    return {
-        "ok": True,
-        "source": "jira",
-        "count": len(df),
-        "saved": str(out_csv),
-        "latest": "config/data/jira_issues_latest.csv",
-    }
+    jql = _jql_tipos(project, TIPOS_SPRINT)
+    return _grava_sprint(jc, jql, max(100, quantidade * 200), data_dir, project)
 
 
 def run_extracao_jira_bases(
@@ -214,19 +623,34 @@ def run_extracao_jira_bases(
     app_cfg: Dict[str, Any],
     quantidade: int = 1,
     data_dir: Path | str = "config/data",
+    incremental: bool = False,
+    max_workers: Optional[int] = None,
+    full_history: bool = False,
 ) -> Dict[str, Any]:
     """
     NOVO EXTRATOR:
     1) Extrai Projetos → jira_projetos_latest.csv
     2) Extrai issues do projeto padrão e grava bases separadas por tipo:
        Func/Fun, Epic, Story, Bug, Sub-Bug → 5 CSVs (cada um com 'latest' + timestamp)
+
+    Projetos e os 5 tipos rodam ao mesmo tempo num pool de threads limitado
+    (max_workers, ou app_cfg["max_workers"]; teto = POOL_SIZE) que compartilha
+    a mesma sessão com Retry. O resumo traz o tempo de cada etapa em "timings".
+
+    Quando não há merge a fazer (carga completa), as páginas são achatadas e
+    gravadas no CSV conforme chegam (iter_search): a memória fica limitada ao
+    tamanho da página, não ao tamanho do projeto. full_history=True remove o
+    teto de quantidade*300 (backfill de todo o histórico).
+
+    Modo incremental (incremental=True):
+    - guarda o maior `updated` visto por projeto/tipo em _state/watermarks.json;
+    - pede ao Jira só `updated >= watermark` (sem o teto de quantidade*300);
+    - aplica as linhas alteradas sobre a base 'latest' por `key`.
+    Sem watermark salvo, a primeira execução faz a carga completa (backfill).
     """
     data_dir = Path(data_dir)
     data_dir.mkdir(parents=True, exist_ok=True)
-
-    for k in ("base_url", "email", "api_token"):
-        if not jira_cfg.get(k):
-            raise ValueError(f"[jira] faltando chave '{k}' no secrets")
+    _check_jira_cfg(jira_cfg)
 
     jc = JiraClient(
         base_url=jira_cfg["base_url"],
@@ -235,75 +659,211 @@ def run_extracao_jira_bases(
     )
 
     tag = _now_tag()
+    t_total = time.perf_counter()
+
+    project = app_cfg.get("default_project", "PROJ")
+    timezone = app_cfg.get("timezone", "UTC")
+    watermarks = WatermarkStore(data_dir / "_state" / "watermarks.json")
 
     # --------- 1) Projetos ----------
-    projetos = jc.list_projects()
-    proj_rows = []
-    for p in projetos:
-        lead = (p.get("lead") or {})
-        proj_rows.append({
-            "id": p.get("id"),
-            "key": p.get("key"),
-            "name": p.get("name"),
-            "projectTypeKey": p.get("projectTypeKey"),
-            "lead": lead.get("displayName"),
-        })
-    df_proj = pd.DataFrame(proj_rows)
-    proj_ts = data_dir / f"jira_projetos_{tag}.csv"
-    df_proj.to_csv(proj_ts, index=False)
-    df_proj.to_csv(data_dir / "jira_projetos_latest.csv", index=False)
+    def _extrai_projetos() -> Dict[str, Any]:
+        return _salva_projetos(jc.list_projects(), data_dir, tag)
 
     # --------- 2) Issues por tipo ----------
-    project = app_cfg.get("default_project", "PROJ")
-    tipos = {
-        "func": ["Func", "Fun"],  # aceita as duas grafias
-        "epic": ["Epic"],
-        "story": ["Story"],
-        "bug": ["Bug"],
-        "subbug": ["Sub-Bug"],
+    def _extrai_tipo(label: str, tipolist: List[str]) -> Dict[str, Any]:
+        since = to_jql_datetime(watermarks.get(f"{project}:{label}"), timezone) if incremental else None
+        jql = _jql_tipos(project, tipolist, incremental, since)
+        # incremental não tem teto: o volume já é limitado pelo watermark
+        limit = None if (incremental or full_history) else max(100, quantidade * 300)
+        if incremental and since:
+            # merge por key: as linhas alteradas costumam ser poucas
+            issues = jc.search(jql, fields=ISSUE_FIELDS, max_results=limit)
+            return _salva_tipo(issues, label, data_dir, tag, incremental, since)
+        ts_path = data_dir / f"jira_issues_{label}_{tag}.csv"
+        with _IssueStream(ts_path, _checkpoint(ts_path, data_dir, f"jira_bases_{project}_{label}", jql, limit)) as st:
+            for page, cursor in jc.iter_search_pages(jql, fields=ISSUE_FIELDS, max_results=limit, cursor=st.cursor):
+                st.write_page(page, cursor)
+        return _info_stream(st, label, data_dir, tag, incremental)
+
+    def _cronometra(fn, *args) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        out = fn(*args)
+        out["seconds"] = round(time.perf_counter() - t0, 3)
+        return out
+
+    workers = max_workers or int(app_cfg.get("max_workers", len(TIPOS_BASES) + 1))
+    workers = max(1, min(workers, POOL_SIZE))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jira-bases") as pool:
+        futures = {"projetos": pool.submit(_cronometra, _extrai_projetos)}
+        for label, tipolist in TIPOS_BASES.items():
+            futures[label] = pool.submit(_cronometra, _extrai_tipo, label, tipolist)
+        # .result() propaga a primeira exceção (mesmo comportamento da versão sequencial)
+        saved = {label: fut.result() for label, fut in futures.items()}
+
+    if incremental:
+        _aplica_watermarks(saved, watermarks, project)
+
+    timings = {label: info["seconds"] for label, info in saved.items()}
+    timings["total"] = round(time.perf_counter() - t_total, 3)
+
+    return {
+        "ok": True,
+        "source": "jira",
+        "mode": "incremental" if incremental else "full",
+        "kpi_cube": publish_kpi_cube(data_dir),
+        "generation": publish_generation(data_dir, "jira_bases", BASES_DATASETS + [KPI_CUBE], time.perf_counter() - t_total),
+        "workers": workers,
+        "saved": saved,
+        "timings": timings,
+        "throttle": jc.throttle_stats(),
+        "cache": jc.cache_stats(),
     }
-    fields = ["key","summary","status","issuetype","priority","created","resolutiondate","assignee","reporter"]
-
-    saved = {
-        "projetos": {
-            "latest": "config/data/jira_projetos_latest.csv",
-            "timestamped": str(proj_ts),
-            "count": int(len(df_proj)),
-        }
+
+
+def run_extracao_jira_portfolio(
+    jira_cfg: Dict[str, Any],
+    app_cfg: Dict[str, Any],
+    quantidade: int = 1,
+    data_dir: Path | str = "config/data",
+    incremental: bool = False,
+    max_workers: Optional[int] = None,
+    per_project: Optional[int] = None,
+    full_history: bool = False,
+) -> Dict[str, Any]:
+    """
+    MODO PORTFÓLIO de run_extracao_jira_bases: em vez de só o default_project,
+    extrai os 5 tipos de cada projeto (app_cfg["projects"], ou todos os de
+    list_projects() quando ausente/"*").
+
+    - cada (projeto, tipo) é uma tarefa num pool de max_workers threads, com
+      no máximo per_project (app_cfg["max_per_project"], padrão 2) tarefas do
+      mesmo projeto em voo;
+    - cada tarefa grava sua parte em _parts/<tag>/ por streaming; ao final as
+      partes viram uma base única por tipo (mesmos arquivos do extrator normal),
+      com a coluna projectKey;
+    - o resumo traz, por projeto, contagens e duração de cada tipo ("projects").
+    Incremental usa os mesmos watermarks "<projeto>:<tipo>" do extrator normal.
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    _check_jira_cfg(jira_cfg)
+
+    jc = JiraClient(
+        base_url=jira_cfg["base_url"],
+        email=jira_cfg["email"],
+        api_token=jira_cfg["api_token"],
+    )
+
+    tag = _now_tag()
+    t_total = time.perf_counter()
+    timezone = app_cfg.get("timezone", "UTC")
+    watermarks = WatermarkStore(data_dir / "_state" / "watermarks.json")
+
+    lista = jc.list_projects()
+    projetos = _salva_projetos(lista, data_dir, tag)
+    projects = resolve_projects(app_cfg, [p.get("key") for p in lista if p.get("key")])
+
+    def _extrai(project: str, label: str, tipolist: List[str]) -> Dict[str, Any]:
+        since = to_jql_datetime(watermarks.get(f"{project}:{label}"), timezone) if incremental else None
+        limit = None if (incremental or full_history) else max(100, quantidade * 300)
+        jql = _jql_tipos(project, tipolist, incremental, since)
+        part = _parte_path(data_dir, tag, label, project)
+        with _IssueStream(part, _checkpoint(part, data_dir, f"jira_portfolio_{project}_{label}", jql, limit)) as st:
+            for page, cursor in jc.iter_search_pages(jql, fields=ISSUE_FIELDS, max_results=limit, cursor=st.cursor):
+                st.write_page(page, cursor)
+        return {"path": st.writer.path, "rows": st.rows, "since": since, "max_updated": st.max_updated,
+                "resumed_pages": st.resumed_pages}
+
+    tasks = [
+        (project, label, lambda p=project, l=label, t=tipolist: _extrai(p, l, t))
+        for label, tipolist in TIPOS_BASES.items()
+        for project in projects
+    ]
+    workers = max_workers or int(app_cfg.get("max_workers", len(TIPOS_BASES) + 1))
+    workers = max(1, min(workers, POOL_SIZE))
+    per_project = per_project or int(app_cfg.get("max_per_project", 2))
+
+    try:
+        results = run_sharded(tasks, max_workers=workers, per_shard=per_project, thread_name_prefix="jira-portfolio")
+    except BaseException:
+        shutil.rmtree(data_dir / "_parts" / tag, ignore_errors=True)
+        raise
+    out = _resumo_portfolio(projetos, results, projects, data_dir, tag, incremental, watermarks)
+
+    return {
+        "ok": True,
+        "source": "jira",
+        "mode": "incremental" if incremental else "full",
+        "kpi_cube": publish_kpi_cube(data_dir),
+        "generation": publish_generation(data_dir, "jira_portfolio", BASES_DATASETS + [KPI_CUBE],
+                                         time.perf_counter() - t_total),
+        "portfolio": projects,
+        "workers": workers,
+        "per_project": per_project,
+        "saved": out["saved"],
+        "projects": out["projects"],
+        "timings": {"total": round(time.perf_counter() - t_total, 3)},
+        "throttle": jc.throttle_stats(),
+        "cache": jc.cache_stats(),
     }
 
-    for label, tipolist in tipos.items():
-        tipos_str = ",".join([f'"{t}"' for t in tipolist])   # ex.: "Func","Bug","Story"
-        jql = f'project = "{project}" AND issuetype in ({tipos_str}) ORDER BY created DESC'
-        issues = jc.search(jql, fields=fields, max_results=max(100, quantidade * 300))
-        rows = []
-        for it in issues:
-            f = it.get("fields", {}) or {}
-            rows.append({
-                "key": it.get("key"),
-                "summary": f.get("summary"),
-                "status": (f.get("status") or {}).get("name"),
-                "type": (f.get("issuetype") or {}).get("name"),
-                "priority": (f.get("priority") or {}).get("name"),
-                "created": f.get("created"),
-                "resolutiondate": f.get("resolutiondate"),
-                "assignee": ((f.get("assignee") or {}).get("displayName")),
-                "reporter": ((f.get("reporter") or {}).get("displayName")),
-            })
-        df = pd.DataFrame(rows)
-        ts_path = data_dir / f"jira_issues_{label}_{tag}.csv"
-        latest_path = data_dir / f"jira_issues_{label}_latest.csv"
-        df.to_csv(ts_path, index=False)
-        df.to_csv(latest_path, index=False)
 
-        saved[label] = {
-            "latest": str(latest_path),
-            "timestamped": str(ts_path),
-            "count": int(len(df)),
-        }
+def run_extracao_jira_transitions(
+    jira_cfg: Dict[str, Any],
+    app_cfg: Dict[str, Any],
+    data_dir: Path | str = "config/data",
+    labels: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Extrai as transições de status (changelog) das issues dos tipos `labels`
+    (padrão: bug + subbug) e grava jira_transitions_latest.csv (key, from, to,
+    timestamp) — base para tempo em cada status / cycle time nos dashboards.
+
+    1) /search/jql só com ids (sem campos) para os projetos configurados;
+    2) /changelog/bulkfetch em lotes de CHANGELOG_BATCH ids, lotes em paralelo;
+    3) as linhas vão direto para o CSV conforme cada lote termina.
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    _check_jira_cfg(jira_cfg)
+
+    jc = JiraClient(
+        base_url=jira_cfg["base_url"],
+        email=jira_cfg["email"],
+        api_token=jira_cfg["api_token"],
+    )
+
+    t0 = time.perf_counter()
+    labels = labels or ["bug", "subbug"]
+    tipolist = [t for label in labels for t in TIPOS_BASES[label]]
+    projects = resolve_projects(app_cfg)
+
+    issues: Dict[str, str] = {}
+    for project in projects:
+        for page in jc.iter_search(_jql_tipos(project, tipolist), fields=["key"], max_results=None):
+            issues.update({str(it.get("id")): it.get("key") for it in page if it.get("id")})
+
+    workers = max_workers or int(app_cfg.get("max_workers", 4))
+    out_ts = data_dir / f"jira_transitions_{_now_tag()}.csv"
+    with CsvStreamWriter(out_ts, TRANSITION_COLUMNS) as w:
+        for rows in jc.bulk_transitions(issues, max_workers=workers):
+            w.write_rows(rows)
+    latest = data_dir / "jira_transitions_latest.csv"
+    publish_copy(out_ts, latest)
+    typed = publish_typed(latest, out_ts, "jira_transitions", "jira_transitions", data_dir)
 
     return {
         "ok": True,
         "source": "jira",
-        "saved": saved,
+        "issues": len(issues),
+        "transitions": w.rows,
+        "saved": location(out_ts, typed.get("snapshot")),
+        "latest": str(latest),
+        "typed": typed,
+        "generation": publish_generation(data_dir, "jira_transitions", ["jira_transitions"], time.perf_counter() - t0),
+        "timings": {"total": round(time.perf_counter() - t0, 3)},
+        "throttle": jc.throttle_stats(),
+        "cache": jc.cache_stats(),
     }
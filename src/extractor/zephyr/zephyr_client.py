@@ -1,61 +1,135 @@
 # extractor/zephyr/zephyr_client.py
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import requests
 from requests import Session
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import pandas as pd
 import datetime as dt
+import os
+import re
+import time
+
+from ..common.checkpoint import PageCheckpoint
+from ..common.columnar import publish_typed
+from ..common.snapshots import location, snapshot
+from ..common.generation import publish_generation
+from ..common.cube import KPI_CUBE, publish_kpi_cube
+from ..common.fanout import resolve_projects, run_sharded, shard_summary
+from ..common.http import POOL_SIZE, adapter_stats, cache_stats, mount_adapter
+from ..common.profiles import get_profile
+from ..common.csv_stream import AppendOnlyCsv, publish_copy
+from ..common.watermark import WatermarkStore, max_timestamp, to_iso_param
+
+# páginas de /testcases, /testexecutions... buscadas em paralelo por listagem
+ZEPHYR_PAGE_WORKERS = int(os.getenv("ZEPHYR_PAGE_WORKERS", "4"))
 
 class ZephyrClient:
     """
     Cliente Zephyr Scale (Cloud) usando requests + Retry.
-    - Paginação via startAt/maxResults
+    - throttle adaptativo compartilhado com o JiraClient (common/throttle.py)
+    - cache HTTP opcional em disco, com TTL por endpoint e ETag (common/http_cache.py)
+    - Paginação via startAt/maxResults, com páginas em paralelo quando a
+      resposta traz `total` (page_workers, ou ZEPHYR_PAGE_WORKERS)
     - Bearer token no header
     """
-    def __init__(self, base_url: str, api_token: str, timeout: int = 30):
+    PAGE_SIZE = 100
+
+    def __init__(self, base_url: str, api_token: str, timeout: int = 30, page_workers: Optional[int] = None):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        self.page_workers = max(1, min(page_workers or ZEPHYR_PAGE_WORKERS, POOL_SIZE))
         self._session = self._build_session(api_token)
 
     def _build_session(self, api_token: str) -> Session:
         s = requests.Session()
-        retries = Retry(
-            total=5,
-            backoff_factor=0.5,
-            status_forcelist=(429, 500, 502, 503, 504),
-            allowed_methods=("GET", "POST"),
-            raise_on_status=False,
-        )
-        adapter = HTTPAdapter(max_retries=retries, pool_connections=20, pool_maxsize=20)
-        s.mount("http://", adapter)
-        s.mount("https://", adapter)
+        self._adapter = mount_adapter(s)
         s.headers.update({"Authorization": f"Bearer {api_token}"})
         return s
 
-    def _get_paged(self, path: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        items: List[Dict[str, Any]] = []
-        start_at, page_size = 0, 100
+    def throttle_stats(self) -> Dict[str, Any]:
+        return adapter_stats(self._adapter)
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return cache_stats(self._adapter)
+
+    def _get_page(self, url: str, params: Optional[Dict[str, Any]], start_at: int, page_size: int) -> Dict[str, Any]:
+        p = dict(params or {})
+        p.update({"startAt": start_at, "maxResults": page_size})
+        resp = self._session.get(url, params=p, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        # Zephyr varia entre "values", "items" ou "results"
+        data["_chunk"] = data.get("values") or data.get("items") or data.get("results") or []
+        return data
+
+    def _iter_paged(self, path: str, params: Optional[Dict[str, Any]] = None, start_at: int = 0) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Gera uma página (lista de itens) por vez, seguindo startAt/maxResults.
+        Se a 1ª resposta traz `total`, os offsets restantes já são conhecidos:
+        até page_workers páginas são buscadas em paralelo (janela limitada,
+        memória = page_workers*2 páginas) e entregues na ordem de startAt.
+        Sem `total` (ou page_workers=1), segue página a página.
+        """
+        for chunk, _ in self._iter_paged_cursor(path, params, start_at):
+            yield chunk
+
+    def _iter_paged_cursor(self, path: str, params: Optional[Dict[str, Any]] = None, start_at: int = 0) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+        """
+        _iter_paged com o cursor de cada página: gera (itens, startAt da página
+        seguinte). Um startAt salvo (PageCheckpoint) retoma a listagem dali.
+        """
+        page_size = self.PAGE_SIZE
         url = f"{self.base_url.rstrip('/')}/{path.lstrip('/')}"
 
-        while True:
-            p = dict(params or {})
-            p.update({"startAt": start_at, "maxResults": page_size})
-            resp = self._session.get(url, params=p, timeout=self.timeout)
-            resp.raise_for_status()
-            data = resp.json()
-            # Zephyr varia entre "values", "items" ou "results"
-            chunk = data.get("values") or data.get("items") or data.get("results") or []
-            items.extend(chunk)
+        data = self._get_page(url, params, start_at, page_size)
+        chunk = data["_chunk"]
+        start_at += page_size
+        if chunk:
+            yield chunk, start_at
+        if len(chunk) < page_size:
+            return
 
+        total = data.get("total")
+        if isinstance(total, int) and total > start_at and self.page_workers > 1:
+            offsets = iter(range(start_at, total, page_size))
+            window: deque = deque()
+            with ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix="zephyr-pages") as pool:
+                for off in islice(offsets, self.page_workers * 2):
+                    window.append((off, pool.submit(self._get_page, url, params, off, page_size)))
+                while window:
+                    off, fut = window.popleft()
+                    chunk = fut.result()["_chunk"]
+                    for nxt in islice(offsets, 1):
+                        window.append((nxt, pool.submit(self._get_page, url, params, nxt, page_size)))
+                    if chunk:
+                        yield chunk, off + page_size
             if len(chunk) < page_size:
-                break
+                return
+            # o total cresceu durante a leitura: o resto vai no modo sequencial
+            start_at = max(start_at, total)
+
+        while True:
+            chunk = self._get_page(url, params, start_at, page_size)["_chunk"]
             start_at += page_size
+            if chunk:
+                yield chunk, start_at
+            if len(chunk) < page_size:
+                break
 
+    def _get_paged(self, path: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        items: List[Dict[str, Any]] = []
+        for chunk in self._iter_paged(path, params):
+            items.extend(chunk)
         return items
 
     # ===== Endpoints utilitários =====
+    def list_projects(self) -> List[Dict[str, Any]]:
+        # GET /projects
+        return self._get_paged("/projects")
+
     def testcases_by_issue(self, issue_key: str) -> List[Dict[str, Any]]:
         # GET /testcases?issueKey=PROJ-123
         return self._get_paged("/testcases", params={"issueKey": issue_key})
@@ -64,10 +138,91 @@ class ZephyrClient:
         # GET /testcases?projectKey=PROJ
         return self._get_paged("/testcases", params={"projectKey": project_key})
 
+    def cycles_by_project(self, project_key: str) -> List[Dict[str, Any]]:
+        # GET /testcycles?projectKey=PROJ
+        return self._get_paged("/testcycles", params={"projectKey": project_key})
+
     def executions_by_cycle(self, cycle_key: str) -> List[Dict[str, Any]]:
         # GET /testexecutions?testCycleKey=CYCLE-1
         return self._get_paged("/testexecutions", params={"testCycleKey": cycle_key})
 
+    def iter_executions_by_cycle(self, cycle_key: str, since: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        # GET /testexecutions?testCycleKey=CYCLE-1[&actualEndDateAfter=...] (página a página)
+        params: Dict[str, Any] = {"testCycleKey": cycle_key}
+        if since:
+            params["actualEndDateAfter"] = since
+        return self._iter_paged("/testexecutions", params=params)
+
+    def iter_executions_by_cycle_from(self, cycle_key: str, start_at: int = 0) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+        # idem, gerando (página, startAt seguinte) a partir de `start_at` — extração retomável
+        return self._iter_paged_cursor("/testexecutions", params={"testCycleKey": cycle_key}, start_at=start_at)
+
+    def iter_executions_by_project(self, project_key: str, since: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        # GET /testexecutions?projectKey=PROJ[&actualEndDateAfter=...] (página a página)
+        params: Dict[str, Any] = {"projectKey": project_key}
+        if since:
+            params["actualEndDateAfter"] = since
+        return self._iter_paged("/testexecutions", params=params)
+
+    def latest_executions_by_project(self, project_key: str, since: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Última execução de cada test case do projeto numa passada só:
+        pagina /testexecutions do projeto (opcionalmente a partir de `since`)
+        e guarda, por testCaseKey, a execução com maior data — em vez de uma
+        chamada por test case (latest_execution_by_testcase).
+        Retorna {testCaseKey: execução achatada pelo perfil "zephyr_executions"}.
+        """
+        profile = get_profile("zephyr_executions")
+        latest: Dict[str, Dict[str, Any]] = {}
+        stamps: Dict[str, str] = {}
+        for page in self.iter_executions_by_project(project_key, since):
+            for e in page:
+                row = profile.flatten(e)
+                key = row.get("testKey")
+                if not key:
+                    continue
+                ts = max_timestamp([row.get("executedOn")]) or ""
+                if key not in latest or ts >= stamps[key]:
+                    latest[key], stamps[key] = row, ts
+        return latest
+
+    def testcase_links(self, test_case_key: str) -> Dict[str, Any]:
+        # GET /testcases/TC-1/links → {"issues": [{"issueId", "type", ...}], "webLinks": [...]}
+        resp = self._session.get(f"{self.base_url}/testcases/{test_case_key}/links", timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def links_by_project(self, project_key: str) -> List[Dict[str, Any]]:
+        """
+        Vínculos test case ↔ issue do projeto inteiro, sem uma busca por issue:
+        pagina /testcases do projeto e lê `links.issues` de cada test case; só
+        os test cases que vêm sem o bloco `links` vão a /testcases/{key}/links,
+        em paralelo (page_workers threads).
+        Retorna [{"testCaseKey", "issueId", "linkType"}] (o Zephyr só devolve o id da issue).
+        """
+        rows: List[Dict[str, Any]] = []
+        pending: List[str] = []
+
+        def _add(tc_key: str, links: Dict[str, Any]) -> None:
+            for link in links.get("issues") or []:
+                if link.get("issueId") is not None:
+                    rows.append({"testCaseKey": tc_key, "issueId": str(link["issueId"]), "linkType": link.get("type")})
+
+        for page in self._iter_paged("/testcases", params={"projectKey": project_key}):
+            for tc in page:
+                if not tc.get("key"):
+                    continue
+                if isinstance(tc.get("links"), dict) and "issues" in tc["links"]:
+                    _add(tc["key"], tc["links"])
+                else:
+                    pending.append(tc["key"])
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix="zephyr-links") as pool:
+                for tc_key, links in zip(pending, pool.map(self.testcase_links, pending)):
+                    _add(tc_key, links)
+        return rows
+
     def latest_execution_by_testcase(self, test_case_key: str) -> Optional[Dict[str, Any]]:
         # GET /testexecutions?testCaseKey=TC-1&orderBy=executedOn DESC&maxResults=1
         url = f"{self.base_url}/testexecutions"
@@ -84,38 +239,141 @@ class ZephyrClient:
 def _now_tag() -> str:
     return dt.datetime.now().strftime("%Y%m%d_%H%M%S")
 
+def _colunas(dataset: str) -> List[str]:
+    """Colunas do perfil + projectKey (marcado pelo extrator, não vem da API)."""
+    return [c for c in get_profile(dataset).columns if c != "projectKey"] + ["projectKey"]
+
+def _extrai_testcases(zc: ZephyrClient, project: str) -> List[Dict[str, Any]]:
+    """Test cases do projeto, achatados pelo perfil "zephyr_testcases" e marcados com projectKey."""
+    profile = get_profile("zephyr_testcases")
+    return [dict(profile.flatten(t), projectKey=project) for t in zc.testcases_by_project(project_key=project)]
+
+def _extrai_ultimas(zc: ZephyrClient, project: str, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Última execução de cada test case do projeto, em lote (latest_executions_by_project):
+    algumas dezenas de páginas cobrem todos os test cases, em vez de uma chamada por test case.
+    """
+    return [dict(row, projectKey=project) for row in zc.latest_executions_by_project(project, since=since).values()]
+
+def _extrai_novas(zc: ZephyrClient, scope: str, key: str, since: Optional[str]) -> Dict[str, Any]:
+    """
+    Execuções de um projeto (scope="project") ou ciclo (scope="cycle") com
+    data após `since`, achatadas e marcadas com projectKey; devolve também o
+    maior executedOn visto (novo watermark).
+    """
+    profile = get_profile("zephyr_executions")
+    pages = zc.iter_executions_by_cycle(key, since) if scope == "cycle" else zc.iter_executions_by_project(key, since)
+    project = key.split("-")[0] if scope == "cycle" else key
+    rows: List[Dict[str, Any]] = []
+    for page in pages:
+        rows.extend(dict(profile.flatten(e), projectKey=project) for e in page)
+    return {"rows": rows, "since": since, "max_executed": max_timestamp([r.get("executedOn") for r in rows])}
+
+def _ultimas_por_teste(latest: Path, delta: pd.DataFrame) -> pd.DataFrame:
+    """
+    Última execução de cada test case: o 'latest' anterior (uma linha por
+    testKey) + as execuções novas, ficando a de maior executedOn; no empate,
+    a nova (mesma regra de latest_executions_by_project).
+    """
+    cols = _colunas("zephyr_executions")
+    prev = pd.read_csv(latest, dtype=str) if latest.exists() and latest.stat().st_size > 0 else pd.DataFrame(columns=cols)
+    df = pd.concat([prev.reindex(columns=cols), delta.reindex(columns=cols).astype(object)], ignore_index=True)
+    ts = pd.to_datetime(df["executedOn"], errors="coerce", utc=True, format="ISO8601")
+    order = ts.sort_values(kind="stable", na_position="first").index
+    return df.loc[order].dropna(subset=["testKey"]).drop_duplicates("testKey", keep="last").sort_index()
+
+def _since(since_days: Optional[int]) -> Optional[str]:
+    if not since_days:
+        return None
+    d = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=int(since_days))
+    return d.strftime("%Y-%m-%dT%H:%M:%SZ")
+
 def run_extracao_zephyr_diaria(
     zephyr_cfg: Dict[str, Any],
     app_cfg: Dict[str, Any],
     quantidade: int = 1,
     data_dir: Path | str = "config/data",
+    portfolio: bool = False,
+    max_workers: Optional[int] = None,
+    per_project: Optional[int] = None,
+    since_days: Optional[int] = None,
+    incremental: bool = False,
 ) -> Dict[str, Any]:
     """
     Executa a extração no Zephyr Scale (test cases + últimas execuções) e grava CSVs.
     Retorna um resumo p/ a API responder ao scheduler.
+
+    A última execução de cada test case sai de /testexecutions do projeto,
+    reduzido localmente por testCaseKey (todos os test cases, sem o antigo
+    teto de quantidade*50). since_days (ou app_cfg["zephyr_since_days"])
+    limita as execuções lidas às dos últimos N dias.
+
+    portfolio=True: extrai cada projeto de app_cfg["projects"] (ou todos os de
+    GET /projects quando ausente/"*") num pool de max_workers threads; cada
+    projeto tem até per_project (app_cfg["max_per_project"], padrão 2) tarefas em voo.
+    As bases continuam sendo uma só (coluna projectKey), e o resumo traz
+    contagens/duração por projeto em "projects".
+
+    incremental=True: histórico de execuções só de acréscimo.
+    - watermark = maior executedOn já visto, por projeto ou, se houver
+      app_cfg["zephyr_cycles"], por ciclo (_state/zephyr_watermarks.json);
+    - pede só execuções após o watermark (5 min de sobreposição) e acrescenta
+      as que ainda não existem (por executionKey) em zephyr_executions_history.csv;
+    - zephyr_executions_latest.csv continua sendo a última execução de cada
+      test case: a versão anterior + o delta, ficando por testKey a de maior
+      executedOn (sem reler o histórico);
+    - o arquivo com timestamp guarda só o delta.
+    Sem watermark, a primeira execução lê tudo (ou since_days).
     """
     data_dir = Path(data_dir)
     data_dir.mkdir(parents=True, exist_ok=True)
+    t_total = time.perf_counter()
 
     zc = ZephyrClient(
         base_url=zephyr_cfg["base_url"],
         api_token=zephyr_cfg["api_token"],
     )
 
-    project = app_cfg.get("default_project", "PROJ")
-    tcs = zc.testcases_by_project(project_key=project)
-    tc_rows = [{"testCaseKey": t.get("key"), "name": t.get("name")} for t in tcs]
+    per_project = per_project or int(app_cfg.get("max_per_project", 2))
+    if portfolio:
+        projects = resolve_projects(app_cfg, [p.get("key") for p in zc.list_projects() if p.get("key")])
+    else:
+        projects = [app_cfg.get("default_project", "PROJ")]
+
+    workers = max_workers or int(app_cfg.get("max_workers", 4))
+    workers = max(1, min(workers, POOL_SIZE))
+    since = _since(since_days or app_cfg.get("zephyr_since_days"))
+    watermarks = WatermarkStore(data_dir / "_state" / "zephyr_watermarks.json")
+    cycles = list(app_cfg.get("zephyr_cycles") or []) if incremental else []
+    # escopo dos watermarks: ciclos configurados ou, sem eles, os projetos
+    scopes = [("cycle", c) for c in cycles] or [("project", p) for p in projects]
+
+    def _desde(scope: str, key: str) -> Optional[str]:
+        return to_iso_param(watermarks.get(f"{scope}:{key}")) or since
+
+    # test cases e execuções de cada projeto correm em paralelo (até per_project por projeto)
+    tasks = []
+    for p in projects:
+        tasks.append((p, "testcases", lambda p=p: _extrai_testcases(zc, p)))
+        if not incremental:
+            tasks.append((p, "executions", lambda p=p: _extrai_ultimas(zc, p, since)))
+    for scope, key in (scopes if incremental else []):
+        shard = key.split("-")[0] if scope == "cycle" else key
+        tasks.append((shard, f"executions:{key}", lambda s=scope, k=key: _extrai_novas(zc, s, k, _desde(s, k))))
+    results = run_sharded(tasks, max_workers=workers, per_shard=per_project, thread_name_prefix="zephyr")
 
-    # pega últimas execuções dos primeiros N*50 testes (heurística simples)
-    exec_rows = []
-    limit = max(1, quantidade * 50)
-    for row in tc_rows[:limit]:
-        last = zc.latest_execution_by_testcase(row["testCaseKey"])
-        if last:
-            exec_rows.append(last)
+    tc_rows: List[Dict[str, Any]] = []
+    exec_rows: List[Dict[str, Any]] = []
+    for (shard, name), r in results.items():
+        if name == "testcases":
+            tc_rows.extend(r["result"])
+        elif incremental:
+            exec_rows.extend(r["result"]["rows"])
+        else:
+            exec_rows.extend(r["result"])
 
-    df_tcs = pd.DataFrame(tc_rows)
-    df_exec = pd.DataFrame(exec_rows)
+    df_tcs = pd.DataFrame(tc_rows, columns=_colunas("zephyr_testcases"))
+    df_exec = pd.DataFrame(exec_rows, columns=_colunas("zephyr_executions"))
 
     tag = _now_tag()
     out_tc = data_dir / f"zephyr_testcases_{tag}.csv"
@@ -124,17 +382,279 @@ def run_extracao_zephyr_diaria(
     df_exec.to_csv(out_ex, index=False)
 
     # versões "latest" para o dashboard
-    df_tcs.to_csv(data_dir / "zephyr_testcases_latest.csv", index=False)
-    df_exec.to_csv(data_dir / "zephyr_executions_latest.csv", index=False)
+    publish_copy(out_tc, data_dir / "zephyr_testcases_latest.csv")
+    # execuções: o latest é sempre uma linha por test case (a última execução);
+    # o histórico de todas as execuções fica só em zephyr_executions_history.csv
+    latest_ex = data_dir / "zephyr_executions_latest.csv"
+    if incremental:
+        history = AppendOnlyCsv(data_dir / "zephyr_executions_history.csv", _colunas("zephyr_executions"), key="executionKey")
+        ordered = df_exec.sort_values("executedOn", kind="stable") if not df_exec.empty else df_exec
+        appended = history.append(ordered.astype(object).where(ordered.notna(), None).to_dict("records"))
+        tmp = latest_ex.with_name(latest_ex.name + ".tmp")
+        _ultimas_por_teste(latest_ex, df_exec).to_csv(tmp, index=False)
+        os.replace(tmp, latest_ex)
+        # watermarks só depois que o histórico e o latest foram gravados
+        for scope, key in scopes:
+            r = results[(key.split("-")[0] if scope == "cycle" else key, f"executions:{key}")]["result"]
+            if r["max_executed"]:
+                watermarks.set(f"{scope}:{key}", max(r["max_executed"], watermarks.get(f"{scope}:{key}") or ""))
+        watermarks.save()
+    else:
+        publish_copy(out_ex, latest_ex)
 
-    return {
+    # datasets tipados (Parquet por projeto/mês) para os dashboards
+    typed = {
+        "zephyr_testcases": publish_typed(data_dir / "zephyr_testcases_latest.csv", out_tc,
+                                          "zephyr_testcases", "zephyr_testcases", data_dir),
+        "zephyr_executions": publish_typed(data_dir / "zephyr_executions_latest.csv", out_ex,
+                                           "zephyr_executions", "zephyr_executions", data_dir),
+    }
+
+    resumo = {
         "ok": True,
         "source": "zephyr",
         "testcases": len(df_tcs),
         "executions": len(df_exec),
-        "saved": [str(out_tc), str(out_ex)],
+        "mode": "incremental" if incremental else "full",
+        "throttle": zc.throttle_stats(),
+        "cache": zc.cache_stats(),
+        "typed": typed,
+        "kpi_cube": publish_kpi_cube(data_dir),
+        "generation": publish_generation(data_dir, "zephyr", ["zephyr_testcases", "zephyr_executions", KPI_CUBE],
+                                         time.perf_counter() - t_total),
+        "saved": [location(out_tc, typed["zephyr_testcases"].get("snapshot")),
+                  location(out_ex, typed["zephyr_executions"].get("snapshot"))],
         "latest": [
             "config/data/zephyr_testcases_latest.csv",
             "config/data/zephyr_executions_latest.csv",
         ],
     }
+    if incremental:
+        resumo["appended"] = appended
+        resumo["history"] = "config/data/zephyr_executions_history.csv"
+        resumo["watermarks"] = {f"{scope}:{key}": watermarks.get(f"{scope}:{key}") for scope, key in scopes}
+    if portfolio:
+        por_projeto = shard_summary(results, count=lambda r: len(r["rows"]) if isinstance(r, dict) else len(r))
+        resumo.update({"portfolio": projects, "workers": workers, "per_project": per_project,
+                       "projects": por_projeto, "timings": {"total": round(time.perf_counter() - t_total, 3)}})
+    return resumo
+
+
+# ================= Vínculos test case ↔ issue (rastreabilidade) =================
+
+LINK_COLUMNS = ["issueKey", "testCaseKey", "issueId", "projectKey", "linkType"]
+
+def _mapa_issue_ids(data_dir: Path) -> Dict[str, str]:
+    """id → key das issues já extraídas (coluna "id" das bases jira_issues_*_latest.csv)."""
+    mapa: Dict[str, str] = {}
+    for p in sorted(data_dir.glob("jira_issues_*_latest.csv")):
+        try:
+            df = pd.read_csv(p, usecols=lambda c: c in ("key", "id"), dtype=str)
+        except (ValueError, pd.errors.EmptyDataError):
+            continue
+        if {"key", "id"}.issubset(df.columns):
+            df = df.dropna(subset=["key", "id"])
+            mapa.update(zip(df["id"], df["key"]))
+    return mapa
+
+def run_extracao_zephyr_links(
+    zephyr_cfg: Dict[str, Any],
+    app_cfg: Dict[str, Any],
+    data_dir: Path | str = "config/data",
+    portfolio: bool = False,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Tabela de vínculos test case ↔ issue (zephyr_links_latest.csv) para a
+    cobertura real de rastreabilidade: metrics.etl.join_issue_testcases e
+    metrics.kpis.automation_coverage a consomem direto (issueKey, testCaseKey).
+
+    Cada projeto (portfolio=True: os de app_cfg["projects"]/GET /projects)
+    corre no pool de max_workers threads via links_by_project. O Zephyr só
+    devolve o id da issue; a key sai das bases Jira já extraídas (coluna "id"
+    do perfil jira_issues) — rode jira_bases antes. Ids sem base ficam com
+    issueKey vazio e entram em "unresolved" no resumo.
+    A tabela sai sem duplicados e ordenada por issueKey, testCaseKey (índice
+    de leitura dos dashboards).
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    t_total = time.perf_counter()
+
+    zc = ZephyrClient(
+        base_url=zephyr_cfg["base_url"],
+        api_token=zephyr_cfg["api_token"],
+    )
+    if portfolio:
+        projects = resolve_projects(app_cfg, [p.get("key") for p in zc.list_projects() if p.get("key")])
+    else:
+        projects = [app_cfg.get("default_project", "PROJ")]
+
+    workers = max_workers or int(app_cfg.get("max_workers", 4))
+    workers = max(1, min(workers, POOL_SIZE))
+    tasks = [(p, "links", lambda p=p: [dict(r, projectKey=p) for r in zc.links_by_project(p)]) for p in projects]
+    results = run_sharded(tasks, max_workers=workers, per_shard=1, thread_name_prefix="zephyr-links")
+
+    df_links = pd.DataFrame([row for r in results.values() for row in r["result"]], columns=LINK_COLUMNS)
+    df_links["issueKey"] = df_links["issueId"].map(_mapa_issue_ids(data_dir))
+    df_links = (df_links.drop_duplicates(subset=["issueId", "testCaseKey"])
+                        .sort_values(["issueKey", "testCaseKey"], na_position="last", ignore_index=True))
+
+    tag = _now_tag()
+    out = data_dir / f"zephyr_links_{tag}.csv"
+    df_links.to_csv(out, index=False)
+    publish_copy(out, data_dir / "zephyr_links_latest.csv")
+    typed = publish_typed(data_dir / "zephyr_links_latest.csv", out, "zephyr_links", "zephyr_links", data_dir)
+
+    return {
+        "ok": True,
+        "source": "zephyr_links",
+        "links": len(df_links),
+        "issues": int(df_links["issueKey"].nunique()),
+        "testcases": int(df_links["testCaseKey"].nunique()),
+        "unresolved": int(df_links["issueKey"].isna().sum()),
+        "throttle": zc.throttle_stats(),
+        "cache": zc.cache_stats(),
+        "projects": shard_summary(results, count=len),
+        "timings": {"total": round(time.perf_counter() - t_total, 3)},
+        "typed": typed,
+        "kpi_cube": publish_kpi_cube(data_dir),
+        "generation": publish_generation(data_dir, "zephyr_links", ["zephyr_links", KPI_CUBE],
+                                         time.perf_counter() - t_total),
+        "saved": [location(out, typed.get("snapshot"))],
+        "latest": ["config/data/zephyr_links_latest.csv"],
+    }
+
+
+# ================= Execuções por ciclo (dataset particionado) =================
+
+CYCLES_DIR = "zephyr_cycles"   # <data_dir>/zephyr_cycles/<projeto>/<ciclo>.csv
+
+def _colunas_ciclos() -> List[str]:
+    return _colunas("zephyr_cycles") + ["executions", "lastExecutedOn", "partition"]
+
+def _nome_arquivo(value: Any) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(value))
+
+def _particao(project: str, cycle_key: str) -> str:
+    """Caminho da partição relativo ao data_dir (é o que o índice guarda)."""
+    return f"{CYCLES_DIR}/{_nome_arquivo(project)}/{_nome_arquivo(cycle_key)}.csv"
+
+def _extrai_ciclo(zc: ZephyrClient, project: str, cycle: Dict[str, Any], data_dir: Path) -> Dict[str, Any]:
+    """
+    Execuções de um ciclo, gravadas página a página na partição do ciclo
+    (troca atômica no fim). cycleKey/wave vazios herdam os do ciclo.
+    Cada página é commitada com o startAt seguinte (PageCheckpoint): se a
+    extração cair, a próxima rodada retoma o ciclo do último commit.
+    """
+    profile = get_profile("zephyr_executions")
+    part = _particao(project, cycle["cycleKey"])
+    (data_dir / part).parent.mkdir(parents=True, exist_ok=True)
+    herda = {"cycleKey": cycle["cycleKey"], "wave": cycle.get("wave")}
+    columns = _colunas("zephyr_executions")
+    ck = PageCheckpoint(data_dir / part, columns, f"zephyr_cycle_{project}_{cycle['cycleKey']}",
+                        data_dir / "_state" / "checkpoints", fingerprint={"cycle": cycle["cycleKey"], "wave": herda["wave"]})
+    resumed_pages = ck.pages
+    last = ck.meta.get("lastExecutedOn")
+    with ck:
+        for page, next_start in zc.iter_executions_by_cycle_from(cycle["cycleKey"], start_at=ck.cursor or 0):
+            rows = []
+            for e in page:
+                row = dict(profile.flatten(e), projectKey=project)
+                for col, v in herda.items():
+                    if row.get(col) in (None, "") and v not in (None, ""):
+                        row[col] = v
+                rows.append(row)
+            ck.write_rows(rows)
+            last = max_timestamp([last] + [r.get("executedOn") for r in rows])
+            ck.commit(next_start, {"lastExecutedOn": last})
+    out = dict(cycle, executions=ck.rows, lastExecutedOn=last, partition=part)
+    if resumed_pages:
+        out["resumed_pages"] = resumed_pages
+    return out
+
+def run_extracao_zephyr_ciclos(
+    zephyr_cfg: Dict[str, Any],
+    app_cfg: Dict[str, Any],
+    data_dir: Path | str = "config/data",
+    portfolio: bool = False,
+    max_workers: Optional[int] = None,
+    per_project: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Execuções por ciclo de teste (regressão/waves são análises por ciclo):
+    - lista os ciclos de cada projeto (GET /testcycles, perfil "zephyr_cycles");
+    - busca as execuções de cada ciclo em paralelo (run_sharded: max_workers
+      threads, até per_project ciclos do mesmo projeto em voo);
+    - grava um CSV por ciclo em zephyr_cycles/<projeto>/<ciclo>.csv e o índice
+      zephyr_cycles_latest.csv (ciclo, wave, datas, nº de execuções, partição).
+    Quem filtra por wave/ciclo lê o índice e só as partições que casam.
+    Projetos fora desta rodada continuam no índice; partições de ciclos que
+    sumiram dos projetos extraídos são apagadas.
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    t_total = time.perf_counter()
+
+    zc = ZephyrClient(
+        base_url=zephyr_cfg["base_url"],
+        api_token=zephyr_cfg["api_token"],
+    )
+    if portfolio:
+        projects = resolve_projects(app_cfg, [p.get("key") for p in zc.list_projects() if p.get("key")])
+    else:
+        projects = [app_cfg.get("default_project", "PROJ")]
+
+    per_project = per_project or int(app_cfg.get("max_per_project", 2))
+    workers = max_workers or int(app_cfg.get("max_workers", 4))
+    workers = max(1, min(workers, POOL_SIZE))
+
+    # 1) ciclos de cada projeto
+    profile = get_profile("zephyr_cycles")
+    listed = run_sharded(
+        [(p, "cycles", lambda p=p: [dict(profile.flatten(c), projectKey=p) for c in zc.cycles_by_project(p)])
+         for p in projects],
+        max_workers=workers, per_shard=1, thread_name_prefix="zephyr-cycles",
+    )
+    # 2) execuções de cada ciclo, em paralelo
+    tasks = [(p, c["cycleKey"], lambda p=p, c=c: _extrai_ciclo(zc, p, c, data_dir))
+             for (p, _), r in listed.items() for c in r["result"] if c.get("cycleKey")]
+    results = run_sharded(tasks, max_workers=workers, per_shard=per_project, thread_name_prefix="zephyr-cycles")
+
+    df_cycles = pd.DataFrame([r["result"] for r in results.values()], columns=_colunas_ciclos())
+    index_path = data_dir / "zephyr_cycles_latest.csv"
+    if index_path.exists() and index_path.stat().st_size > 0:
+        antigo = pd.read_csv(index_path, dtype=str)
+        df_cycles = pd.concat([antigo[~antigo["projectKey"].isin(projects)], df_cycles], ignore_index=True)
+    df_cycles = df_cycles.reindex(columns=_colunas_ciclos()).sort_values(["projectKey", "cycleKey"], ignore_index=True)
+
+    tag = _now_tag()
+    out = data_dir / f"zephyr_cycles_{tag}.csv"
+    df_cycles.to_csv(out, index=False)
+    publish_copy(out, index_path)
+    snap = snapshot(out, "zephyr_cycles", data_dir)
+
+    # partições órfãs (ciclos apagados/renomeados) dos projetos desta rodada
+    vivas = set(df_cycles["partition"].dropna())
+    for p in projects:
+        for f in (data_dir / CYCLES_DIR / _nome_arquivo(p)).glob("*.csv"):
+            if f.relative_to(data_dir).as_posix() not in vivas:
+                f.unlink()
+
+    return {
+        "ok": True,
+        "source": "zephyr_cycles",
+        "cycles": len(results),
+        "executions": int(sum(r["result"]["executions"] for r in results.values())),
+        "resumed_pages": {c: r["result"]["resumed_pages"] for (_, c), r in results.items() if r["result"].get("resumed_pages")},
+        "workers": workers,
+        "per_project": per_project,
+        "throttle": zc.throttle_stats(),
+        "cache": zc.cache_stats(),
+        "projects": shard_summary(results, count=lambda r: r["executions"]),
+        "timings": {"total": round(time.perf_counter() - t_total, 3)},
+        "saved": [location(out, snap)],
+        "snapshot": snap,
+        "generation": publish_generation(data_dir, "zephyr_cycles", ["zephyr_cycles"], time.perf_counter() - t_total),
+        "latest": ["config/data/zephyr_cycles_latest.csv", f"config/data/{CYCLES_DIR}/"],
+    }
@@ -8,9 +8,11 @@ def pass_rate(execs_df: pd.DataFrame) -> float:
 
 def automation_coverage(issues_df: pd.DataFrame, link_df: pd.DataFrame) -> float:
     # % de stories com pelo menos 1 test case
+    # link_df: issueKey, testCaseKey (zephyr_links_latest.csv); só conta vínculo de issue que está em issues_df
     if issues_df.empty: return 0.0
-    covered = link_df["issueKey"].nunique()
-    total   = issues_df["key"].nunique()
+    keys    = issues_df["key"].dropna().drop_duplicates()
+    covered = keys.isin(link_df["issueKey"]).sum()
+    total   = len(keys)
     return round(100*covered/total, 2)
 
 def defect_escape_rate(prod_bugs: int, total_bugs: int) -> float:
@@ -29,3 +31,32 @@ def mttr(incidents_df: pd.DataFrame) -> float:
     df["created"]  = pd.to_datetime(df["created"])
     df["resolved"] = pd.to_datetime(df["resolved"])
     return round((df["resolved"] - df["created"]).dt.total_seconds().mean()/3600, 2)
+
+def time_in_status(transitions_df: pd.DataFrame, issues_df: pd.DataFrame = None, now=None) -> pd.DataFrame:
+    # transitions_df: key, from, to, timestamp (jira_transitions_latest.csv)
+    # devolve uma linha por período: key, status, hours (vetorizado, sem apply)
+    if transitions_df.empty: return pd.DataFrame(columns=["key","status","hours"])
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now(tz="UTC")
+    if now.tzinfo is None: now = now.tz_localize("UTC")
+    tr = transitions_df.assign(ts=pd.to_datetime(transitions_df["timestamp"], errors="coerce", utc=True))
+    tr = tr.dropna(subset=["ts"]).sort_values(["key","ts"])
+    end = tr.groupby("key")["ts"].shift(-1).fillna(now)
+    periods = pd.DataFrame({"key": tr["key"], "status": tr["to"], "hours": (end - tr["ts"]).dt.total_seconds()/3600})
+    if issues_df is not None and not issues_df.empty:
+        # período inicial: created → primeira transição, no status "from" da primeira transição
+        first = tr.drop_duplicates("key")[["key","from","ts"]]
+        created = pd.to_datetime(issues_df.set_index("key")["created"], errors="coerce", utc=True)
+        first = first.assign(created=first["key"].map(created)).dropna(subset=["created"])
+        periods = pd.concat([periods, pd.DataFrame({
+            "key": first["key"], "status": first["from"],
+            "hours": (first["ts"] - first["created"]).dt.total_seconds()/3600,
+        })], ignore_index=True)
+    return periods[periods["hours"] >= 0].reset_index(drop=True)
+
+def status_cycle_times(transitions_df: pd.DataFrame, issues_df: pd.DataFrame = None, now=None) -> pd.DataFrame:
+    # horas por status (soma por issue, depois média/mediana entre issues)
+    periods = time_in_status(transitions_df, issues_df, now)
+    if periods.empty: return pd.DataFrame(columns=["status","issues","mean_hours","median_hours"])
+    per_issue = periods.groupby(["status","key"], as_index=False)["hours"].sum()
+    out = per_issue.groupby("status")["hours"].agg(issues="count", mean_hours="mean", median_hours="median")
+    return out.round(2).reset_index().sort_values("mean_hours", ascending=False, ignore_index=True)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from typing import Sequence, Tuple
+
+# ========= Alvos e pesos para conversão em nota (0–4) =========
+TARGETS = {
+    "coverage_pct_best": 100.0,   # 100% coverage -> nota 4 (linear)
+    "test_avg_best":     10.0,    # 10 execuções/issue -> nota 4 (linear, cap)
+    "auto_runs_best":    80.0,    # 80% -> 4
+    "auto_reg_best":     80.0,    # 80% -> 4
+    "test_reg_best":     0.0,     # quanto MENOR melhor: 0% -> 4, 50% -> 0
+    "test_reg_worst":    50.0,
+    "negative_best":     50.0,    # 50% -> 4 (linear até 0)
+    "bug_days_best":     2.0,     # 2 dias -> 4 (quanto MENOR, melhor; 30d -> 0)
+    "bug_days_worst":    30.0,
+}
+
+WEIGHTS = {
+    "coverage": 2.0,
+    "test_avg": 1.0,
+    "created_auto": 1.0,
+    "auto_runs": 1.0,
+    "test_reg": 1.0,
+    "negative": 1.0,
+    "bug_days": 1.0,
+}
+
+# métrica (KPI de coeqa.kpi_cube) -> (melhor, pior); pior None = linear 0..melhor,
+# senão menor é melhor: melhor -> 4, pior -> 0
+SCALES = {
+    "coverage":     (TARGETS["coverage_pct_best"], None),
+    "test_avg":     (TARGETS["test_avg_best"],     None),
+    "created_auto": (TARGETS["auto_runs_best"],    None),
+    "auto_runs":    (TARGETS["auto_runs_best"],    None),
+    "auto_reg":     (TARGETS["auto_reg_best"],     None),
+    "test_reg":     (TARGETS["test_reg_best"],     TARGETS["test_reg_worst"]),
+    "negative":     (TARGETS["negative_best"],     None),
+    "bug_days":     (TARGETS["bug_days_best"],     TARGETS["bug_days_worst"]),
+}
+METRICS = list(SCALES)
+
+# faixas do Score Qualidade (maior primeiro)
+TIERS = [(3.5, "Diamond 💎"), (3.0, "Gold 🥇"), (2.0, "Silver 🥈")]
+TIER_FLOOR = "Bronze 🥉"
+
+def score_matrix(values: np.ndarray, metrics: Sequence[str] = METRICS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # values: linhas (domínio, domínio × mês...) × métricas, na ordem de `metrics`
+    # devolve (notas 0–4 da mesma forma, Score Qualidade por linha, faixa por linha)
+    v = np.atleast_2d(np.asarray(values, dtype=float))
+    best = np.array([SCALES[m][0] for m in metrics], dtype=float)
+    worst = np.array([np.nan if SCALES[m][1] is None else SCALES[m][1] for m in metrics], dtype=float)
+    inverse = ~np.isnan(worst)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        linear = np.where(best > 0, 4.0 * np.maximum(v, 0.0) / best, 0.0)
+        inv = 4.0 * (worst - v) / (worst - best)
+    notes = np.clip(np.where(inverse, inv, linear), 0.0, 4.0)
+    notes = np.where(np.isnan(v), 0.0, notes)   # sem dado -> 0
+
+    w = np.array([WEIGHTS.get(m, 0.0) for m in metrics], dtype=float)
+    quality = notes @ w / w.sum() if w.sum() else np.zeros(len(notes))
+    q = np.round(quality, 2)   # a faixa segue o Score exibido
+    tier = np.select([q >= t for t, _ in TIERS], [name for _, name in TIERS], default=TIER_FLOOR)
+    return notes, quality, tier
+
+def score_frame(kpis: pd.DataFrame, metrics: Sequence[str] = METRICS) -> pd.DataFrame:
+    # kpis: uma linha por domínio (e mês), colunas = métricas (coeqa.kpi_cube.ratios);
+    # devolve as notas por métrica + quality + tier, com o mesmo índice
+    cols = [m for m in metrics if m in kpis.columns]
+    notes, quality, tier = score_matrix(kpis[cols].to_numpy(dtype=float), cols)
+    out = pd.DataFrame(notes.round(2), index=kpis.index, columns=cols)
+    out["quality"] = quality.round(2)
+    out["tier"] = tier
+    return out